@@ -0,0 +1,147 @@
+"""
+Migration script to add the audio retention columns
+Run this once to update your existing database
+
+Adds per-plan retention settings, size and last access tracking on
+audio_files with their eviction indexes, then backfills the new audio_files
+columns in batches (last_accessed_at from created_at, size from the file on
+disk). Re-running the script only does what is still missing.
+"""
+
+import os
+import pymysql
+
+# Database configuration (update if needed)
+DB_HOST = 'localhost'
+DB_USER = 'root'
+DB_PASSWORD = ''  # Update if you have a password
+DB_NAME = 'tts_saas'
+
+BATCH_SIZE = 1000
+
+# (table, column, definition) - match app/models/*.py
+COLUMNS = [
+    ('plans', 'audio_retention_days', 'INT NULL'),
+    ('plans', 'audio_storage_bytes', 'BIGINT NULL'),
+    ('audio_files', 'size', 'BIGINT NULL'),
+    ('audio_files', 'last_accessed_at', 'DATETIME NULL'),
+]
+
+# (table, index name, columns)
+INDEXES = [
+    ('audio_files', 'ix_audio_files_user_id_last_accessed_at', ['user_id', 'last_accessed_at']),
+    ('audio_files', 'ix_audio_files_last_accessed_at', ['last_accessed_at']),
+]
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = %s
+        AND table_name = %s
+        AND column_name = %s
+    """, (DB_NAME, table, column))
+    return cursor.fetchone() is not None
+
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+        SELECT index_name
+        FROM information_schema.statistics
+        WHERE table_schema = %s
+        AND table_name = %s
+        AND index_name = %s
+        LIMIT 1
+    """, (DB_NAME, table, index_name))
+    return cursor.fetchone() is not None
+
+def backfill_last_accessed_at(cursor, connection):
+    total = 0
+    while True:
+        cursor.execute("""
+            UPDATE audio_files
+            SET last_accessed_at = COALESCE(created_at, UTC_TIMESTAMP())
+            WHERE last_accessed_at IS NULL
+            LIMIT %s
+        """, (BATCH_SIZE,))
+        connection.commit()
+        total += cursor.rowcount
+        if cursor.rowcount < BATCH_SIZE:
+            return total
+
+def backfill_size(cursor, connection):
+    total, missing, last_id = 0, 0, 0
+    while True:
+        cursor.execute("""
+            SELECT id, file_path FROM audio_files
+            WHERE size IS NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            return total, missing
+        last_id = rows[-1]['id']
+
+        sizes = []
+        for row in rows:
+            try:
+                sizes.append((os.path.getsize(row['file_path']), row['id']))
+            except OSError:
+                missing += 1  # Left NULL, the reaper removes the row when it expires
+        if sizes:
+            cursor.executemany("UPDATE audio_files SET size = %s WHERE id = %s", sizes)
+            connection.commit()
+            total += len(sizes)
+
+# Connect to database
+try:
+    connection = pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+    print(f"Connected to database: {DB_NAME}")
+
+    with connection.cursor() as cursor:
+        for table, column, definition in COLUMNS:
+            if column_exists(cursor, table, column):
+                print(f"✓ {table}.{column} already exists")
+                continue
+            print(f"Adding {table}.{column}...")
+            cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+            connection.commit()
+            print(f"✓ Successfully added {table}.{column}")
+
+        print("Backfilling audio_files.last_accessed_at...")
+        print(f"✓ {backfill_last_accessed_at(cursor, connection)} rows updated")
+
+        print("Backfilling audio_files.size from disk...")
+        sized, missing = backfill_size(cursor, connection)
+        print(f"✓ {sized} rows updated, {missing} files not found on disk")
+
+        for table, index_name, columns in INDEXES:
+            if index_exists(cursor, table, index_name):
+                print(f"✓ {index_name} already exists")
+                continue
+            cols = ', '.join(f"`{c}`" for c in columns)
+            print(f"Adding {index_name} on {table}({', '.join(columns)})...")
+            cursor.execute(f"""
+                ALTER TABLE `{table}`
+                ADD INDEX `{index_name}` ({cols}),
+                ALGORITHM=INPLACE, LOCK=NONE
+            """)
+            connection.commit()
+            print(f"✓ Successfully added {index_name}")
+
+except pymysql.Error as e:
+    print(f"✗ Database error: {str(e)}")
+except Exception as e:
+    print(f"✗ Error during migration: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+        print("Database connection closed")
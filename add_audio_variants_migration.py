@@ -0,0 +1,62 @@
+"""
+Migration script to add audio_files.variants_size
+Run this once to update your existing database
+
+Tracks the bytes of the transcoded variants (mp3/ogg/opus) stored next
+to each generated file. Existing rows start at 0; variants created before
+the migration do not exist yet, so nothing needs backfilling.
+"""
+
+import pymysql
+
+# Database configuration (update if needed)
+DB_HOST = 'localhost'
+DB_USER = 'root'
+DB_PASSWORD = ''  # Update if you have a password
+DB_NAME = 'tts_saas'
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = %s
+        AND table_name = %s
+        AND column_name = %s
+    """, (DB_NAME, table, column))
+    return cursor.fetchone() is not None
+
+# Connect to database
+try:
+    connection = pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+    print(f"Connected to database: {DB_NAME}")
+
+    with connection.cursor() as cursor:
+        if column_exists(cursor, 'audio_files', 'variants_size'):
+            print("✓ audio_files.variants_size already exists")
+        else:
+            print("Adding audio_files.variants_size...")
+            # INSTANT: no table rebuild on MySQL 8.0.12+
+            cursor.execute("""
+                ALTER TABLE `audio_files`
+                ADD COLUMN `variants_size` BIGINT NOT NULL DEFAULT 0,
+                ALGORITHM=INSTANT
+            """)
+            connection.commit()
+            print("✓ Successfully added audio_files.variants_size")
+
+except pymysql.Error as e:
+    print(f"✗ Database error: {str(e)}")
+except Exception as e:
+    print(f"✗ Error during migration: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+        print("Database connection closed")
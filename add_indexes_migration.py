@@ -0,0 +1,96 @@
+"""
+Migration script to add the lookup indexes declared on the models
+Run this once to update your existing database
+
+Indexes are built with ALGORITHM=INPLACE, LOCK=NONE so reads and writes
+keep working while they are created (MySQL 5.6+ online DDL).
+Re-running the script skips indexes that already exist.
+"""
+
+import pymysql
+
+# Database configuration (update if needed)
+DB_HOST = 'localhost'
+DB_USER = 'root'
+DB_PASSWORD = ''  # Update if you have a password
+DB_NAME = 'tts_saas'
+
+# (table, index name, columns, unique) - names match app/models/*.py
+INDEXES = [
+    ('usage', 'uq_usage_user_id', ['user_id'], True),
+    ('audio_files', 'ix_audio_files_user_id_created_at', ['user_id', 'created_at'], False),
+    ('audio_files', 'ix_audio_files_expire_at', ['expire_at'], False),
+    ('cloned_voices', 'ix_cloned_voices_user_id_speaker_id', ['user_id', 'speaker_id'], False),
+    ('subscriptions', 'ix_subscriptions_user_id_status', ['user_id', 'status'], False),
+    ('users', 'ix_users_plan_id', ['plan_id'], False),
+    ('users', 'ix_users_user_type_created_at', ['user_type', 'created_at'], False),
+    ('contact_messages', 'ix_contact_messages_created_at', ['created_at'], False),
+]
+
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+        SELECT index_name
+        FROM information_schema.statistics
+        WHERE table_schema = %s
+        AND table_name = %s
+        AND index_name = %s
+        LIMIT 1
+    """, (DB_NAME, table, index_name))
+    return cursor.fetchone() is not None
+
+def duplicate_count(cursor, table, columns):
+    cols = ', '.join(f"`{c}`" for c in columns)
+    cursor.execute(f"""
+        SELECT COUNT(*) AS duplicates FROM (
+            SELECT {cols} FROM `{table}` GROUP BY {cols} HAVING COUNT(*) > 1
+        ) AS d
+    """)
+    return cursor.fetchone()['duplicates']
+
+# Connect to database
+try:
+    connection = pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+    print(f"Connected to database: {DB_NAME}")
+
+    with connection.cursor() as cursor:
+        for table, index_name, columns, unique in INDEXES:
+            if index_exists(cursor, table, index_name):
+                print(f"✓ {index_name} already exists")
+                continue
+
+            if unique:
+                duplicates = duplicate_count(cursor, table, columns)
+                if duplicates:
+                    print(f"✗ Skipping {index_name}: {duplicates} duplicate {'/'.join(columns)} values in {table}, "
+                          f"merge them first")
+                    continue
+
+            kind = 'UNIQUE INDEX' if unique else 'INDEX'
+            cols = ', '.join(f"`{c}`" for c in columns)
+            print(f"Adding {index_name} on {table}({', '.join(columns)})...")
+            cursor.execute(f"""
+                ALTER TABLE `{table}`
+                ADD {kind} `{index_name}` ({cols}),
+                ALGORITHM=INPLACE, LOCK=NONE
+            """)
+            connection.commit()
+            print(f"✓ Successfully added {index_name}")
+
+    print("\nRun `python check_query_plans.py` to confirm the hot queries use these indexes")
+
+except pymysql.Error as e:
+    print(f"✗ Database error: {str(e)}")
+except Exception as e:
+    print(f"✗ Error during migration: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+        print("Database connection closed")
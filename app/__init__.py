@@ -49,8 +49,37 @@ def create_app():
     app.register_blueprint(tokens_bp, url_prefix='/api/tokens')
     app.register_blueprint(files_bp, url_prefix='/api/files')
 
+    # Request ids and structured logging, then request counts and latencies
+    # (GET /metrics); registered first so they cover the other hooks
+    from app.utils import log, metrics
+    log.init_app(app)
+    metrics.init_app(app)
+
+    from app.utils.tts_client import check_bulkhead
+    check_bulkhead()
+
+    # Start background generation workers lazily, so each (forked) worker
+    # process gets its own threads once it serves its first request
+    from app.utils.job_worker import start_job_workers, requeue_stale_jobs
+    from app.utils.scheduler import schedule
+    from app.utils import admin_stats, reaper, retention, synth_cache, voice_catalog
+
+    @app.before_request
+    def _start_job_workers():
+        start_job_workers(app)
+
+    @app.before_request
+    def _start_periodic_tasks():
+        schedule(app, 'admin-stats-recount', Config.ADMIN_STATS_RECOUNT_INTERVAL, admin_stats.recount_if_due)
+        schedule(app, 'audio-reaper', Config.AUDIO_REAPER_INTERVAL, reaper.reap_expired_audio, cluster=True)
+        schedule(app, 'audio-disk-pressure', Config.AUDIO_DISK_CHECK_INTERVAL, retention.relieve_disk_pressure, cluster=True)
+        schedule(app, 'voice-catalog-refresh', Config.VOICE_CATALOG_REFRESH_INTERVAL, voice_catalog.refresh)
+        schedule(app, 'synth-cache-recount', Config.SYNTH_CACHE_RECOUNT_INTERVAL, synth_cache.recount, cluster=True)
+        schedule(app, 'stale-job-sweep', Config.TTS_JOB_STALE_CHECK_INTERVAL, requeue_stale_jobs)
+
     # Create tables if not exist
     with app.app_context():
+        metrics.instrument_engine(db.engine)
         db.create_all()
 
     return app
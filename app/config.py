@@ -17,7 +17,132 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
     CLONED_VOICE_FOLDER = os.path.join(UPLOAD_FOLDER, 'cloned_voices')
     GENERATED_AUDIO_FOLDER = os.path.join(UPLOAD_FOLDER, 'generated_audio')
+    SYNTH_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'synth_cache')
+    TTS_WORK_FOLDER = os.path.join(UPLOAD_FOLDER, 'tmp')  # Chunk renders being stitched, same disk as the cache
+    STORAGE_SHARD_LEVELS = int(os.environ.get('STORAGE_SHARD_LEVELS', 2))  # Hashed subdirectory levels, 0 = flat
+
+    # Storage backend for generated audio, voice samples and uploads: 'local' or 's3'
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local').lower()
+    STORAGE_S3_BUCKET = os.environ.get('STORAGE_S3_BUCKET', 'tts-saas')
+    STORAGE_S3_ENDPOINT_URL = os.environ.get('STORAGE_S3_ENDPOINT_URL')  # e.g. http://minio:9000, unset for AWS
+    STORAGE_S3_PUBLIC_ENDPOINT_URL = os.environ.get('STORAGE_S3_PUBLIC_ENDPOINT_URL')  # Host used in presigned URLs
+    STORAGE_S3_REGION = os.environ.get('STORAGE_S3_REGION', 'us-east-1')
+    STORAGE_S3_ACCESS_KEY = os.environ.get('STORAGE_S3_ACCESS_KEY')
+    STORAGE_S3_SECRET_KEY = os.environ.get('STORAGE_S3_SECRET_KEY')
+    STORAGE_S3_PREFIX = os.environ.get('STORAGE_S3_PREFIX', '')
+    STORAGE_S3_POOL_SIZE = int(os.environ.get('STORAGE_S3_POOL_SIZE', 16))
+    STORAGE_PRESIGN_EXPIRES = int(os.environ.get('STORAGE_PRESIGN_EXPIRES', 300))  # Seconds a presigned URL stays valid
+    STORAGE_REDIRECT_MIN_BYTES = int(os.environ.get('STORAGE_REDIRECT_MIN_BYTES', 1024 * 1024))  # Redirect larger files to a presigned URL
+
+    # Who sends local files: 'app' (the worker streams them), 'x-accel' (nginx) or 'x-sendfile' (Apache/lighttpd)
+    FILE_SERVING_MODE = os.environ.get('FILE_SERVING_MODE', 'app').lower()
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '/_protected')  # Internal nginx location mapped to UPLOAD_FOLDER
+
+    # Generated audio never changes once written, so clients may cache it
+    AUDIO_CACHE_MAX_AGE = int(os.environ.get('AUDIO_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+    # Compressed variants for ?format=mp3|ogg|opus on stream/download, stored next to the original
+    AUDIO_DEFAULT_BITRATE = os.environ.get('AUDIO_DEFAULT_BITRATE', '64k')
+    AUDIO_BITRATES = [b.strip().lower() for b in os.environ.get('AUDIO_BITRATES', '32k,48k,64k,96k,128k,192k').split(',') if b.strip()]  # Accepted ?bitrate values
+    TRANSCODE_WORKERS = int(os.environ.get('TRANSCODE_WORKERS', 2))  # ffmpeg worker processes per app process
+    TRANSCODE_TIMEOUT = int(os.environ.get('TRANSCODE_TIMEOUT', 120))  # Seconds
+    FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY')  # Defaults to ffmpeg on PATH
+
+    # Voice clone samples are normalized before they reach the backend
+    CLONE_SAMPLE_RATE = int(os.environ.get('CLONE_SAMPLE_RATE', 22050))  # Rate the cloning model expects
+    CLONE_MAX_SECONDS = float(os.environ.get('CLONE_MAX_SECONDS', 30))  # Longer samples are cut after trimming
+    CLONE_MIN_SPEECH_SECONDS = float(os.environ.get('CLONE_MIN_SPEECH_SECONDS', 3))  # Less speech than this is rejected
+    CLONE_SILENCE_DB = float(os.environ.get('CLONE_SILENCE_DB', -40))  # Frames quieter than this (dBFS) count as silence
+
+    # Structured JSON logs, written by a background thread (app/utils/log.py)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')  # Per-logger overrides: app.routes.tts_routes=DEBUG,app.utils.storage=WARNING
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()  # 'json' or 'text'
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))  # Share of DEBUG records kept
+    LOG_MAX_FIELD_CHARS = int(os.environ.get('LOG_MAX_FIELD_CHARS', 200))  # Longer field values are truncated and hashed
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))  # Records waiting for the writer, more are dropped
+    REQUEST_ID_HEADER = os.environ.get('REQUEST_ID_HEADER', 'X-Request-ID')  # Accepted from the proxy, echoed back
+
+    # Prometheus metrics at GET /metrics
+    PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')  # Shared by gunicorn workers, read by prometheus_client at import
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # When set, scrapes must send "Authorization: Bearer <token>"
 
     # Other configs
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # Max 50 MB uploads
-    ALLOWED_EXTENSIONS = {'wav', 'mp3', 'flac'}
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {'wav', 'mp3', 'flac'}
+
+    # Cursor pagination for list endpoints (?limit=N&cursor=...)
+    DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 20))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
+    # Admin dashboard counters (/api/admin/stats)
+    ADMIN_STATS_CACHE_TTL = float(os.environ.get('ADMIN_STATS_CACHE_TTL', 30))  # Seconds a process reuses its snapshot
+    ADMIN_STATS_RECOUNT_INTERVAL = int(os.environ.get('ADMIN_STATS_RECOUNT_INTERVAL', 300))  # Full recount period, 0 disables
+
+    # Periodic tasks scheduled with cluster=True (app/utils/scheduler.py)
+    PERIODIC_TASK_LEASE_SECONDS = int(os.environ.get('PERIODIC_TASK_LEASE_SECONDS', 900))  # A run claimed by a process that died is retried after this
+
+    # Expired audio reaper (app/utils/reaper.py, or `python reap_expired_audio.py` from cron)
+    AUDIO_REAPER_INTERVAL = int(os.environ.get('AUDIO_REAPER_INTERVAL', 600))  # Seconds between runs, one process per cluster runs each; 0 disables
+    AUDIO_REAPER_BATCH_SIZE = int(os.environ.get('AUDIO_REAPER_BATCH_SIZE', 500))  # Rows deleted per commit
+    AUDIO_REAPER_MAX_SECONDS = float(os.environ.get('AUDIO_REAPER_MAX_SECONDS', 60))  # Runtime budget per run
+    AUDIO_REAPER_DELETE_THREADS = int(os.environ.get('AUDIO_REAPER_DELETE_THREADS', 4))
+
+    # Generated audio retention, Plan.audio_retention_days / audio_storage_bytes override these
+    AUDIO_RETENTION_DAYS = int(os.environ.get('AUDIO_RETENTION_DAYS', 7))
+    AUDIO_STORAGE_BYTES = int(os.environ.get('AUDIO_STORAGE_BYTES', 0))  # Per-user budget, 0 = unlimited
+    AUDIO_DISK_HIGH_WATER = float(os.environ.get('AUDIO_DISK_HIGH_WATER', 0.90))  # Start evicting above this disk usage
+    AUDIO_DISK_LOW_WATER = float(os.environ.get('AUDIO_DISK_LOW_WATER', 0.80))  # ...until usage is back under this
+    AUDIO_DISK_CHECK_INTERVAL = int(os.environ.get('AUDIO_DISK_CHECK_INTERVAL', 60))  # 0 disables
+    AUDIO_ACCESS_TOUCH_SECONDS = int(os.environ.get('AUDIO_ACCESS_TOUCH_SECONDS', 3600))  # Min seconds between last_accessed_at writes
+
+    # External TTS backend client
+    TTS_POOL_CONNECTIONS = int(os.environ.get('TTS_POOL_CONNECTIONS', 4))  # Host pools kept per process
+    TTS_POOL_MAXSIZE = int(os.environ.get('TTS_POOL_MAXSIZE', 16))  # Keep-alive connections per host
+    TTS_MAX_RETRIES = int(os.environ.get('TTS_MAX_RETRIES', 3))  # Retries for idempotent calls only
+    TTS_RETRY_BACKOFF = float(os.environ.get('TTS_RETRY_BACKOFF', 0.5))
+    TTS_CONNECT_TIMEOUT = float(os.environ.get('TTS_CONNECT_TIMEOUT', 5))
+    TTS_READ_TIMEOUT = float(os.environ.get('TTS_READ_TIMEOUT', 60))
+    TTS_DOWNLOAD_CHUNK_SIZE = int(os.environ.get('TTS_DOWNLOAD_CHUNK_SIZE', 64 * 1024))
+    TTS_DOWNLOAD_MAX_BYTES = int(os.environ.get('TTS_DOWNLOAD_MAX_BYTES', 500 * 1024 * 1024))  # Max 500 MB per generated file
+
+    # Backend circuit breakers (one per operation) and bulkhead, per process
+    TTS_BREAKER_FAILURE_RATE = float(os.environ.get('TTS_BREAKER_FAILURE_RATE', 0.5))  # Share of failed calls that opens it
+    TTS_BREAKER_WINDOW = int(os.environ.get('TTS_BREAKER_WINDOW', 20))  # Last calls the failure rate is taken over
+    TTS_BREAKER_MIN_CALLS = int(os.environ.get('TTS_BREAKER_MIN_CALLS', 5))  # Calls needed before it can open
+    TTS_BREAKER_OPEN_SECONDS = float(os.environ.get('TTS_BREAKER_OPEN_SECONDS', 30))  # Fail fast with 503 this long, then probe
+    TTS_BREAKER_HALF_OPEN_CALLS = int(os.environ.get('TTS_BREAKER_HALF_OPEN_CALLS', 1))  # Successful probes that close it
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 1))  # Request threads per worker process (gunicorn --threads), 1 for sync workers
+    TTS_MAX_IN_FLIGHT = int(os.environ.get('TTS_MAX_IN_FLIGHT', max(1, WEB_THREADS - 1)))  # Backend calls at once per process, from request, job, batch and chunk threads together
+    TTS_BULKHEAD_WAIT = float(os.environ.get('TTS_BULKHEAD_WAIT', 1))  # Seconds to wait for a free slot before answering 503
+
+    # Background generation jobs (POST /api/voice/generate?async=1)
+    TTS_JOB_WORKERS = int(os.environ.get('TTS_JOB_WORKERS', 2))  # Worker threads per process, 0 disables
+    TTS_JOB_POLL_INTERVAL = float(os.environ.get('TTS_JOB_POLL_INTERVAL', 2))  # Seconds between queue polls
+    TTS_JOB_STALE_SECONDS = int(os.environ.get('TTS_JOB_STALE_SECONDS', 600))  # Requeue 'running' jobs older than this
+    TTS_JOB_STALE_CHECK_INTERVAL = int(os.environ.get('TTS_JOB_STALE_CHECK_INTERVAL', 60))  # Seconds between stale job sweeps, 0 disables
+    TTS_JOB_MAX_ATTEMPTS = int(os.environ.get('TTS_JOB_MAX_ATTEMPTS', 3))  # Claims before a stale job is failed and refunded
+
+    # POST /api/voice/generate-batch
+    TTS_BATCH_MAX_ITEMS = int(os.environ.get('TTS_BATCH_MAX_ITEMS', 100))
+    TTS_BATCH_CONCURRENCY = int(os.environ.get('TTS_BATCH_CONCURRENCY', 4))  # Backend calls in flight per batch
+
+    # Long texts are split on sentence boundaries and rendered in parallel chunks
+    TTS_CHUNK_THRESHOLD = int(os.environ.get('TTS_CHUNK_THRESHOLD', 1000))  # Longer texts are chunked
+    TTS_CHUNK_MAX_CHARS = int(os.environ.get('TTS_CHUNK_MAX_CHARS', 400))
+    TTS_CHUNK_CONCURRENCY = int(os.environ.get('TTS_CHUNK_CONCURRENCY', 4))  # Backend calls in flight per text
+    TTS_CHUNK_RETRIES = int(os.environ.get('TTS_CHUNK_RETRIES', 2))  # Extra attempts per failed chunk
+    TTS_CHUNK_CROSSFADE_MS = int(os.environ.get('TTS_CHUNK_CROSSFADE_MS', 30))
+    TTS_STREAM_FIRST_CHUNK_CHARS = int(os.environ.get('TTS_STREAM_FIRST_CHUNK_CHARS', 120))  # Short first chunk for /generate-stream
+
+    # Synthesis cache for repeated (text, language, speaker_id) requests
+    SYNTH_CACHE_ENABLED = os.environ.get('SYNTH_CACHE_ENABLED', 'true').lower() == 'true'
+    SYNTH_CACHE_MAX_BYTES = int(os.environ.get('SYNTH_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))  # 2 GB of blobs
+    SYNTH_CACHE_TTL_SECONDS = int(os.environ.get('SYNTH_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+    SYNTH_CACHE_RECOUNT_INTERVAL = int(os.environ.get('SYNTH_CACHE_RECOUNT_INTERVAL', 3600))  # Rebuild the running size totals, 0 disables
+    SYNTH_CACHE_CHARGE_HITS = os.environ.get('SYNTH_CACHE_CHARGE_HITS', 'true').lower() == 'true'  # Deduct characters on hits
+
+    # Backend voice catalog (/voice/list) cached per process
+    VOICE_CATALOG_TTL = int(os.environ.get('VOICE_CATALOG_TTL', 300))  # Older catalogs are served while one thread refreshes
+    VOICE_CATALOG_REFRESH_INTERVAL = int(os.environ.get('VOICE_CATALOG_REFRESH_INTERVAL', 240))  # Periodic refresh, 0 disables
+    VOICE_CATALOG_RETRY_SECONDS = int(os.environ.get('VOICE_CATALOG_RETRY_SECONDS', 30))  # Wait after a failed refresh
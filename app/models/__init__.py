@@ -5,3 +5,6 @@ from app.models.plan import Plan
 from app.models.usage import Usage
 from app.models.cloned_voice import ClonedVoice
 from app.models.audio_file import AudioFile
+from app.models.generation_job import GenerationJob
+from app.models.synth_cache_entry import SynthCacheEntry
+from app.models.stats_counter import StatsCounter
@@ -1,5 +1,6 @@
 # app/models/audio_file.py
 from app import db
+from app.config import Config
 from datetime import datetime, timedelta
 
 class AudioFile(db.Model):
@@ -10,4 +11,15 @@ class AudioFile(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     characters_used = db.Column(db.BigInteger, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expire_at = db.Column(db.DateTime, default=lambda: datetime.utcnow() + timedelta(days=7))
+    expire_at = db.Column(db.DateTime, default=lambda: datetime.utcnow() + timedelta(days=Config.AUDIO_RETENTION_DAYS), index=True)  # Expiry cleanup
+    size = db.Column(db.BigInteger, nullable=True)  # Bytes on disk, counted against the plan's storage budget
+    variants_size = db.Column(db.BigInteger, nullable=False, default=0)  # Bytes of transcoded variants (mp3/ogg/opus)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow)  # Last stream/download, for LRU eviction
+
+    # History: WHERE user_id = ? ORDER BY created_at DESC
+    # Eviction: least recently accessed first, per user and globally
+    __table_args__ = (
+        db.Index('ix_audio_files_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_audio_files_user_id_last_accessed_at', 'user_id', 'last_accessed_at'),
+        db.Index('ix_audio_files_last_accessed_at', 'last_accessed_at'),
+    )
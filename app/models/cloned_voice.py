@@ -11,3 +11,8 @@ class ClonedVoice(db.Model):
     voice_name = db.Column(db.String(100), nullable=False)
     speaker_id = db.Column(db.String(100), nullable=True)  # Unique ID for external API
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Per-user voice lists and speaker_id lookups
+    __table_args__ = (
+        db.Index('ix_cloned_voices_user_id_speaker_id', 'user_id', 'speaker_id'),
+    )
@@ -0,0 +1,23 @@
+# app/models/generation_job.py
+from app import db
+from datetime import datetime
+
+class GenerationJob(db.Model):
+    __tablename__ = 'generation_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    status = db.Column(db.Enum('queued', 'running', 'done', 'failed'), nullable=False, default='queued')
+    payload = db.Column(db.Text, nullable=False)  # JSON body for /translate-tts
+    characters = db.Column(db.BigInteger, nullable=False)  # Reserved from usage at enqueue time
+    audio_id = db.Column(db.Integer, db.ForeignKey('audio_files.id'), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Workers claim the oldest queued job
+    __table_args__ = (
+        db.Index('ix_generation_jobs_status_created_at', 'status', 'created_at'),
+    )
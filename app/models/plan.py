@@ -8,5 +8,7 @@ class Plan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     character_limit = db.Column(db.BigInteger, nullable=False)
+    audio_retention_days = db.Column(db.Integer, nullable=True)  # Generated audio lifetime, NULL = AUDIO_RETENTION_DAYS
+    audio_storage_bytes = db.Column(db.BigInteger, nullable=True)  # Per-user generated audio budget, NULL = AUDIO_STORAGE_BYTES, 0 = unlimited
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
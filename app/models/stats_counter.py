@@ -0,0 +1,10 @@
+# app/models/stats_counter.py
+from app import db
+from datetime import datetime
+
+class StatsCounter(db.Model):
+    __tablename__ = 'stats_counters'
+
+    name = db.Column(db.String(64), primary_key=True)  # e.g. total_users, total_characters_used
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -14,5 +14,10 @@ class Subscription(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Active subscription lookups: WHERE user_id = ? AND status = 'active'
+    __table_args__ = (
+        db.Index('ix_subscriptions_user_id_status', 'user_id', 'status'),
+    )
+
     user = db.relationship('User', backref='subscriptions', lazy=True)
     plan = db.relationship('Plan', backref='subscriptions', lazy=True)
\ No newline at end of file
@@ -0,0 +1,16 @@
+# app/models/synth_cache_entry.py
+from app import db
+from datetime import datetime
+
+class SynthCacheEntry(db.Model):
+    __tablename__ = 'synth_cache_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False)  # sha256 of the normalized tts_payload
+    blob_hash = db.Column(db.String(64), nullable=False, index=True)  # sha256 of the audio bytes
+    blob_path = db.Column(db.String(255), nullable=False)
+    speaker_id = db.Column(db.String(100), nullable=True, index=True)  # To invalidate when a clone changes
+    size = db.Column(db.BigInteger, nullable=False)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
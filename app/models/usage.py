@@ -10,3 +10,8 @@ class Usage(db.Model):
     characters_used = db.Column(db.BigInteger, default=0)
     characters_remaining = db.Column(db.BigInteger, default=0)
     last_generated_at = db.Column(db.DateTime, default=None)
+
+    # One usage row per user; also the index for every quota lookup
+    __table_args__ = (
+        db.UniqueConstraint('user_id', name='uq_usage_user_id'),
+    )
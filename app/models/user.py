@@ -9,7 +9,7 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
     user_type = db.Column(db.Enum('admin', 'user'), nullable=False)
-    plan_id = db.Column(db.Integer, db.ForeignKey('plans.id'), nullable=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('plans.id'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -17,3 +17,7 @@ class User(db.Model):
     usage = db.relationship('Usage', backref='user', uselist=False)
     cloned_voices = db.relationship('ClonedVoice', backref='user', lazy=True)
     audio_files = db.relationship('AudioFile', backref='user', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_users_user_type_created_at', 'user_type', 'created_at'),
+    )
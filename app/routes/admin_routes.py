@@ -7,14 +7,20 @@ from app.models.usage import Usage
 from app.models.audio_file import AudioFile
 from app.models.contact_message import ContactMessage
 from app import db
+from sqlalchemy.orm import joinedload
 from werkzeug.security import generate_password_hash
 from app.schemas.user_schema import UserSchema
 from app.schemas.plan_schema import PlanSchema
 from app.schemas.usage_schema import UsageSchema
 from app.schemas.contact_message_schema import ContactMessageSchema
 from datetime import datetime
+import os
+import logging
+from app.utils import admin_stats
+from app.utils.pagination import decode_cursor, get_page_size, keyset_page, InvalidCursor
 
 admin_bp = Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
 user_schema = UserSchema()
 plan_schema = PlanSchema()
 usage_schema = UsageSchema()
@@ -62,6 +68,7 @@ def assign_plan():
                     character_limit=plan_data['character_limit']
                 )
                 db.session.add(plan)
+                admin_stats.increment(total_plans=1)
         
         db.session.commit()
         
@@ -84,6 +91,7 @@ def assign_plan():
             return jsonify({"error": "Plan not found"}), 404
 
         # Update user plan
+        admin_stats.plan_changed(user.plan_id, plan.id)
         user.plan_id = plan.id
         user.updated_at = datetime.utcnow()
         
@@ -110,6 +118,7 @@ def assign_plan():
         # Update or create usage
         usage = Usage.query.filter_by(user_id=user.id).first()
         if usage:
+            admin_stats.increment(total_characters_used=-(usage.characters_used or 0))
             usage.characters_remaining = plan.character_limit
             usage.characters_used = 0
         else:
@@ -156,31 +165,31 @@ def reset_password():
 @admin_bp.route('/stats', methods=['GET'])
 def get_stats():
     try:
-        total_users = User.query.filter_by(user_type='user').count()
-        total_admins = User.query.filter_by(user_type='admin').count()
-        total_plans = Plan.query.count()
-        total_audios = AudioFile.query.count()
-        
-        # Active users (users with plans)
-        active_users = User.query.filter(User.plan_id.isnot(None)).count()
-        
-        # Recent registrations (last 30 days)
-        from datetime import timedelta
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_users = User.query.filter(User.created_at >= thirty_days_ago).count()
-        
-        # Total characters used
-        total_chars_used = db.session.query(db.func.sum(Usage.characters_used)).scalar() or 0
-        
+        # Served from the stats_counters summary table through a short
+        # in-process cache; ?fresh=1 recounts from the source tables
+        fresh = request.args.get('fresh', '').lower() in ('1', 'true', 'yes')
+        return jsonify(admin_stats.get_stats(fresh=fresh)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Get runtime counters of this worker process
+@admin_bp.route('/runtime-stats', methods=['GET'])
+@admin_required
+def get_runtime_stats():
+    try:
+        from app.utils.tts_client import get_tts_client
+        from app.utils import synth_cache, scheduler, reaper, retention, voice_catalog, transcoder, voice_sample, log
         return jsonify({
-            "total_users": total_users,
-            "total_admins": total_admins,
-            "active_users": active_users,
-            "total_plans": total_plans,
-            "total_audios": total_audios,
-            "recent_users": recent_users,
-            "total_characters_used": total_chars_used,
-            "last_updated": datetime.utcnow().isoformat()
+            "pid": os.getpid(),
+            "tts_backend": get_tts_client().get_stats(),
+            "synth_cache": synth_cache.get_stats(),
+            "periodic_tasks": scheduler.get_stats(),
+            "audio_reaper": reaper.get_stats(),
+            "audio_retention": retention.get_stats(),
+            "voice_catalog": voice_catalog.get_stats(),
+            "transcoder": transcoder.get_stats(),
+            "voice_samples": voice_sample.get_stats(),
+            "logging": log.get_stats()
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -194,7 +203,8 @@ def get_users():
         per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search', '', type=str)
         
-        query = User.query
+        # Plan and usage are loaded in the same statement as the users
+        query = User.query.options(joinedload(User.plan), joinedload(User.usage))
         
         # Search filter
         if search:
@@ -363,9 +373,12 @@ def create_plan():
             for plan_data in data:
                 plan = Plan(
                     name=plan_data['name'],
-                    character_limit=plan_data['character_limit']
+                    character_limit=plan_data['character_limit'],
+                    audio_retention_days=plan_data.get('audio_retention_days'),
+                    audio_storage_bytes=plan_data.get('audio_storage_bytes')
                 )
                 db.session.add(plan)
+                admin_stats.increment(total_plans=1)
                 plans.append(plan)
             db.session.commit()
             return jsonify({"message": f"{len(plans)} plans created"}), 201
@@ -376,9 +389,12 @@ def create_plan():
                 
             plan = Plan(
                 name=data['name'],
-                character_limit=data['character_limit']
+                character_limit=data['character_limit'],
+                audio_retention_days=data.get('audio_retention_days'),
+                audio_storage_bytes=data.get('audio_storage_bytes')
             )
             db.session.add(plan)
+            admin_stats.increment(total_plans=1)
             db.session.commit()
             return jsonify({"message": "Plan created", "plan_id": plan.id}), 201
     except Exception as e:
@@ -399,6 +415,8 @@ def update_plan(plan_id):
             
         plan.name = data.get('name', plan.name)
         plan.character_limit = data.get('character_limit', plan.character_limit)
+        plan.audio_retention_days = data.get('audio_retention_days', plan.audio_retention_days)
+        plan.audio_storage_bytes = data.get('audio_storage_bytes', plan.audio_storage_bytes)
         db.session.commit()
         return jsonify({"message": "Plan updated"}), 200
     except Exception as e:
@@ -419,6 +437,7 @@ def delete_plan(plan_id):
             return jsonify({"error": f"Cannot delete plan. {users_count} users are using this plan."}), 400
 
         db.session.delete(plan)
+        admin_stats.increment(total_plans=-1)
         db.session.commit()
         return jsonify({"message": "Plan deleted"}), 200
     except Exception as e:
@@ -510,15 +529,24 @@ def get_messages():
 @admin_bp.route('/plans', methods=['GET'])
 def get_plans():
     try:
-        plans = Plan.query.order_by(Plan.created_at.desc()).all()
+        # Count users per plan in the same statement (GROUP BY plan_id)
+        user_counts = db.session.query(
+            User.plan_id.label('plan_id'),
+            db.func.count(User.id).label('user_count')
+        ).group_by(User.plan_id).subquery()
+
+        plans = db.session.query(Plan, db.func.coalesce(user_counts.c.user_count, 0)).outerjoin(
+            user_counts, user_counts.c.plan_id == Plan.id
+        ).order_by(Plan.created_at.desc()).all()
+
         result = []
-        for plan in plans:
-            # Count users with this plan
-            user_count = User.query.filter_by(plan_id=plan.id).count()
+        for plan, user_count in plans:
             result.append({
                 "id": plan.id,
                 "name": plan.name,
                 "character_limit": plan.character_limit,
+                "audio_retention_days": plan.audio_retention_days,
+                "audio_storage_bytes": plan.audio_storage_bytes,
                 "user_count": user_count,
                 "created_at": plan.created_at.isoformat() if plan.created_at else None
             })
@@ -530,14 +558,10 @@ def get_plans():
 @admin_bp.route('/test', methods=['GET', 'POST'])
 def test_admin():
     try:
-        print(f"Test endpoint called with method: {request.method}")
-        print(f"Headers: {dict(request.headers)}")
-        if request.method == 'POST':
-            data = request.get_json()
-            print(f"POST data: {data}")
+        logger.debug("Admin test endpoint called", extra={"method": request.method})
         return jsonify({"message": "Admin test endpoint working", "method": request.method}), 200
     except Exception as e:
-        print(f"Error in test endpoint: {str(e)}")
+        logger.exception("Admin test endpoint failed")
         return jsonify({"error": str(e)}), 500
 
 # Test endpoint with JWT
@@ -546,10 +570,9 @@ def test_admin():
 def test_admin_jwt():
     try:
         identity = get_jwt_identity()
-        print(f"JWT test - Identity: {identity}")
         return jsonify({"message": "JWT test working", "user_id": identity}), 200
     except Exception as e:
-        print(f"Error in JWT test: {str(e)}")
+        logger.exception("JWT test failed")
         return jsonify({"error": str(e)}), 500
 
 # Test endpoint with admin check
@@ -560,7 +583,7 @@ def test_admin_check():
         identity = get_jwt_identity()
         return jsonify({"message": "Admin test working", "admin_id": identity}), 200
     except Exception as e:
-        print(f"Error in admin test: {str(e)}")
+        logger.exception("Admin test failed")
         return jsonify({"error": str(e)}), 500
 # Simple test endpoint
 @admin_bp.route('/test-simple', methods=['POST', 'OPTIONS'])
@@ -591,6 +614,7 @@ def create_default_plans():
                     character_limit=plan_data['character_limit']
                 )
                 db.session.add(plan)
+                admin_stats.increment(total_plans=1)
                 created_plans.append(plan_data['name'])
         
         db.session.commit()
@@ -616,6 +640,7 @@ def create_admin():
                 user_type='admin'
             )
             db.session.add(admin)
+            admin_stats.user_created(admin)
             db.session.commit()
             return jsonify({"message": "Admin created: admin@example.com / admin123"}), 200
         else:
@@ -629,38 +654,54 @@ def get_subscription_users():
     try:
         from app.models.subscription import Subscription
         
-        # Get all users with their subscriptions
-        users = db.session.query(User, Subscription, Plan).join(
-            Subscription, User.id == Subscription.user_id, isouter=True
-        ).join(
-            Plan, User.plan_id == Plan.id, isouter=True
-        ).filter(User.user_type == 'user').all()
+        limit = get_page_size()
+        cursor = decode_cursor(request.args.get('cursor'))
+        
+        # One page of users with their plan and usage, newest first
+        users, next_cursor = keyset_page(
+            db.session.query(User, Plan, Usage).join(
+                Plan, User.plan_id == Plan.id, isouter=True
+            ).join(
+                Usage, User.id == Usage.user_id, isouter=True
+            ).filter(User.user_type == 'user'),
+            User.created_at, User.id, cursor, limit,
+            key=lambda row: (row[0].created_at, row[0].id)
+        )
+        
+        # Subscriptions of the users on this page, in one query
+        subscriptions = {}
+        if users:
+            for subscription in Subscription.query.filter(
+                Subscription.user_id.in_([user.id for user, plan, usage in users])
+            ).order_by(Subscription.id).all():
+                subscriptions.setdefault(subscription.user_id, []).append(subscription)
         
         result = []
-        for user, subscription, plan in users:
-            usage = Usage.query.filter_by(user_id=user.id).first()
-            
-            result.append({
-                "id": user.id,
-                "email": user.email,
-                "user_type": user.user_type,
-                "plan_id": user.plan_id,
-                "plan_name": plan.name if plan else "No Plan",
-                "character_limit": plan.character_limit if plan else 0,
-                "characters_used": usage.characters_used if usage else 0,
-                "characters_remaining": usage.characters_remaining if usage else 0,
-                "subscription": {
-                    "id": subscription.id if subscription else None,
-                    "status": subscription.status if subscription else "inactive",
-                    "start_date": subscription.start_date.isoformat() if subscription and subscription.start_date else None,
-                    "end_date": subscription.end_date.isoformat() if subscription and subscription.end_date else None,
-                    "created_at": subscription.created_at.isoformat() if subscription and subscription.created_at else None
-                } if subscription else None,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "updated_at": user.updated_at.isoformat() if user.updated_at else None
-            })
+        for user, plan, usage in users:
+            for subscription in subscriptions.get(user.id, [None]):
+                result.append({
+                    "id": user.id,
+                    "email": user.email,
+                    "user_type": user.user_type,
+                    "plan_id": user.plan_id,
+                    "plan_name": plan.name if plan else "No Plan",
+                    "character_limit": plan.character_limit if plan else 0,
+                    "characters_used": usage.characters_used if usage else 0,
+                    "characters_remaining": usage.characters_remaining if usage else 0,
+                    "subscription": {
+                        "id": subscription.id,
+                        "status": subscription.status,
+                        "start_date": subscription.start_date.isoformat() if subscription.start_date else None,
+                        "end_date": subscription.end_date.isoformat() if subscription.end_date else None,
+                        "created_at": subscription.created_at.isoformat() if subscription.created_at else None
+                    } if subscription else None,
+                    "created_at": user.created_at.isoformat() if user.created_at else None,
+                    "updated_at": user.updated_at.isoformat() if user.updated_at else None
+                })
             
-        return jsonify({"users": result, "total": len(result)}), 200
+        return jsonify({"users": result, "limit": limit, "next_cursor": next_cursor}), 200
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 # Update subscription status
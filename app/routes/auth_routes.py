@@ -4,6 +4,7 @@ from app.models.user import User
 from app.models.usage import Usage
 from app.schemas.user_schema import UserSchema
 from app import db
+from app.utils import admin_stats
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 
@@ -40,6 +41,7 @@ def register():
             characters_remaining=0
         )
         db.session.add(usage)
+        admin_stats.user_created(user)
         db.session.commit()
         
         return jsonify({"message": "User created successfully"}), 201
@@ -1,10 +1,13 @@
 # app/routes/files_routes.py
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from app import db
 import os
 from app.config import Config
+from app.utils.file_utils import save_file, find_file
+from app.utils.file_serving import send_audio_file
+from app.utils.storage import get_storage
 
 files_bp = Blueprint('files', __name__)
 
@@ -22,10 +25,7 @@ def upload_file():
             return jsonify({"error": "No file selected"}), 400
 
         filename = secure_filename(f"{user_id}_{file.filename}")
-        upload_folder = Config.UPLOAD_FOLDER
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        file_path = save_file(file, Config.UPLOAD_FOLDER, filename)
 
         # Perhaps save to a File model, but for now just return path
         return jsonify({"message": "File uploaded", "file_path": file_path}), 201
@@ -42,10 +42,17 @@ def download_file(file_path):
         if not file_path.startswith(str(user_id)):
             return jsonify({"error": "Access denied"}), 403
 
-        full_path = os.path.join(Config.UPLOAD_FOLDER, os.path.basename(file_path))
-        if not os.path.exists(full_path):
-            return jsonify({"error": "File not found"}), 404
-
-        return send_file(full_path, as_attachment=True)
+        filename = os.path.basename(file_path)
+        storage = get_storage()
+        full_path = storage.new_path(Config.UPLOAD_FOLDER, filename, create=False)
+        st = storage.stat(full_path)
+        if st is None:
+            # Uploaded to local disk before sharding or before switching backends
+            full_path = find_file(Config.UPLOAD_FOLDER, filename)
+            if not full_path:
+                return jsonify({"error": "File not found"}), 404
+
+        # Re-uploading a file name replaces it, so clients must revalidate
+        return send_audio_file(full_path, as_attachment=True, stat=st, immutable=False)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -23,6 +23,7 @@ from app.models.usage import Usage
 from app.schemas.plan_schema import PlanSchema
 from app.schemas.subscription_schema import SubscriptionSchema
 from app import db
+from app.utils import admin_stats
 from datetime import datetime, timedelta
 
 subscription_bp = Blueprint('subscription', __name__)
@@ -89,12 +90,14 @@ def create_subscription():
             db.session.add(subscription)
             
         # Update user's plan
+        admin_stats.plan_changed(user.plan_id, plan_id)
         user.plan_id = plan_id
         user.updated_at = datetime.utcnow()
         
         # Update or create usage
         usage = Usage.query.filter_by(user_id=int(user_id)).first()
         if usage:
+            admin_stats.increment(total_characters_used=-(usage.characters_used or 0))
             usage.characters_remaining = plan.character_limit
             usage.characters_used = 0
         else:
@@ -213,6 +216,7 @@ def cancel_subscription():
         # Also update user's plan_id to None
         user = User.query.get(int(user_id))
         if user:
+            admin_stats.plan_changed(user.plan_id, None)
             user.plan_id = None
             user.updated_at = datetime.utcnow()
             
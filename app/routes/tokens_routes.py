@@ -3,7 +3,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.usage import Usage
 from app.schemas.usage_schema import UsageSchema
-from app import db
+from app.utils import quota
 
 tokens_bp = Blueprint('tokens', __name__)
 usage_schema = UsageSchema()
@@ -32,14 +32,14 @@ def consume_tokens():
         user_id = get_jwt_identity()
         data = request.get_json()
         characters = data.get('characters', 0)
+        if not isinstance(characters, int) or isinstance(characters, bool) or characters < 0:
+            return jsonify({"error": "characters must be a non-negative integer"}), 400
 
-        usage = Usage.query.filter_by(user_id=int(user_id)).first()
-        if not usage or characters > usage.characters_remaining:
+        # Single conditional UPDATE, safe against concurrent requests
+        if not quota.consume(int(user_id), characters):
             return jsonify({"error": "Not enough tokens"}), 400
 
-        usage.characters_used += characters
-        usage.characters_remaining -= characters
-        db.session.commit()
+        usage = Usage.query.filter_by(user_id=int(user_id)).first()
         return jsonify({"message": "Tokens consumed", "remaining": usage.characters_remaining}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,45 +1,59 @@
 # app/routes/tts_routes.py
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.audio_file import AudioFile
 from app.models.cloned_voice import ClonedVoice
-from app.models.usage import Usage
+from app.models.generation_job import GenerationJob
 from app import db
 from datetime import datetime, timedelta
-import os, glob
+import os, glob, json, uuid, base64, shutil, mimetypes, logging
 from werkzeug.utils import secure_filename
 from app.config import Config
-from pydub import AudioSegment
-from pydub.generators import Sine
 from dotenv import load_dotenv
+from app.utils.tts_client import get_tts_client, BackendUnavailable
+from app.utils.tts_pipeline import build_tts_payload, generate_audio_file, generate_audio_files, characters_to_charge, create_audio_record, create_audio_records, enforce_storage_budget, SynthesisError
+from app.utils.tts_pipeline import render_chunks, append_segment, new_work_dir, store_assembled
+from app.utils.text_segmenter import split_text
+from pydub import AudioSegment
+from app.utils import synth_cache
+from app.utils import voice_catalog
+from app.utils.file_serving import send_audio_file
+from app.utils.job_worker import enqueue_generation_job
+from app.utils import quota
+from app.utils import retention
+from app.utils import transcoder
+from app.utils import metrics
+from app.utils import voice_sample
+from app.utils import log
+from app.utils.storage import get_storage, storage_for
+from app.utils.pagination import decode_cursor, get_page_size, keyset_page, InvalidCursor
 import requests
 
 load_dotenv()
 
 tts_bp = Blueprint('tts', __name__)
+logger = logging.getLogger(__name__)
 
 GENERATED_FOLDER = Config.GENERATED_AUDIO_FOLDER
 CLONED_FOLDER = Config.CLONED_VOICE_FOLDER
 
-TTS_BASE_URL = os.getenv("TTS_BASE_URL")
-
 # -------------------
 # Generate TTS Audio
 # -------------------
 @tts_bp.route('/generate', methods=['POST'])
 @jwt_required()
 def generate_tts():
+    reserved = 0
     try:
         identity = get_jwt_identity()
-        print(f"Generate TTS - JWT Identity: {identity}, Type: {type(identity)}")  # Debug log
         
         if not identity:
-            print("No JWT identity found in generate_tts")  # Debug log
+            logger.warning("No JWT identity found in generate_tts")
             return jsonify({"error": "Invalid token"}), 401
             
         user_id = int(identity)
         data = request.get_json()
-        print(f"Generate TTS - User ID: {user_id}, Data: {data}")  # Debug log
+        logger.debug("Generate request", extra={"user_id": user_id, "text": log.summarize_text(data.get('text'))})
         
         text = data.get('text')
         if not text:
@@ -47,102 +61,288 @@ def generate_tts():
             
         characters = len(text)
 
-        usage = Usage.query.filter_by(user_id=user_id).first()
-        if not usage or characters > usage.characters_remaining:
-            print(f"Not enough characters: usage={usage}, characters={characters}")  # Debug log
+        # Reserve the characters up front; settled or refunded below
+        with metrics.stage('quota_check'):
+            granted = quota.reserve(user_id, characters)
+        if not granted:
+            logger.info("Not enough characters", extra={"user_id": user_id, "characters": characters})
             return jsonify({"error": "Not enough characters in plan"}), 400
+        reserved = characters
 
-        # Prepare API request
-        language = data.get('language', 'en')  # Tone/language for TTS
-        source_language = data.get('source_language')  # Optional
-        target_language = data.get('target_language')  # Optional
-        voice_model = data.get('voice_model', 'default_male_01')  # Voice type or speaker_id
-        
-        # Check if voice_model is a speaker_id (from cloned voice) or default voice type
-        # Default voices: "default_male_01", "default_female_01"
-        # Cloned voice IDs are in format "user-XXX-YYYY"
-        if voice_model.startswith('user-') or voice_model.startswith('default_'):
-            speaker_id = voice_model  # Use the cloned voice or default speaker_id
-        else:
-            # Fallback for legacy voice_model values like 'male' or 'female'
-            if voice_model.lower() == 'female':
-                speaker_id = 'default_female_01'
-            else:
-                speaker_id = 'default_male_01'
-        
         # Prepare TTS API payload for the new endpoint
-        tts_payload = {
-            "text": text,
-            "language": language,
-            "speaker_id": speaker_id
-        }
-        
-        # Add optional language parameters if provided
-        if source_language:
-            tts_payload["src_lang"] = source_language
-        if target_language:
-            tts_payload["tgt_lang"] = target_language
-            
-        print(f"TTS API Payload: {tts_payload}")  # Debug log
-        
-        # Call external TTS API
-        tts_api_url = f"{TTS_BASE_URL}/translate-tts"
-        
+        tts_payload = build_tts_payload(data)
+        logger.debug("TTS payload", extra={"payload": log.summarize_payload(tts_payload)})
+
+        # Job mode: a background worker renders it and settles the reservation
+        if _is_async_request(data):
+            job = enqueue_generation_job(user_id, tts_payload, characters)
+            reserved = 0
+            response = jsonify({
+                "message": "Generation queued",
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": f"/api/voice/jobs/{job.id}"
+            })
+            response.headers['Location'] = f"/api/voice/jobs/{job.id}"
+            return response, 202
+
+        # Call external TTS API (or reuse a cached rendering)
         try:
-            response = requests.post(tts_api_url, json=tts_payload, timeout=60)
-            response.raise_for_status()
-            tts_response = response.json()
-            print(f"TTS API Response: {tts_response}")  # Debug log
-            
-            # Get the audio file path from API response
-            remote_audio_path = tts_response.get('file_path')
-            if not remote_audio_path:
-                return jsonify({"error": "No audio file path in API response"}), 500
-                
-            # Download the audio file from the remote server
-            audio_filename = os.path.basename(remote_audio_path)
-            local_filename = f"{user_id}_{datetime.utcnow().timestamp()}_{audio_filename}"
-            file_path = os.path.join(GENERATED_FOLDER, local_filename)
-            os.makedirs(GENERATED_FOLDER, exist_ok=True)
-            
-            # Download audio file
-            base_url = f"{TTS_BASE_URL}"
-            audio_url = tts_response.get('audio_path')
-            if audio_url:
-                if not audio_url.startswith('http'):
-                    audio_url = f"{base_url}{audio_url}"
-                    
-                audio_response = requests.get(audio_url, timeout=30)
-                audio_response.raise_for_status()
-                
-                with open(file_path, 'wb') as f:
-                    f.write(audio_response.content)
-                    
-                print(f"Downloaded audio file to: {file_path}")  # Debug log
-            else:
-                return jsonify({"error": "No audio path in API response"}), 500
-                
-        except requests.exceptions.RequestException as e:
-            print(f"TTS API Error: {str(e)}")  # Debug log
-            return jsonify({"error": f"TTS API error: {str(e)}"}), 500
+            file_path, cache_hit = generate_audio_file(user_id, tts_payload)
+        except SynthesisError as e:
+            logger.warning("TTS backend error", extra={"user_id": user_id, "status": e.status_code, "error": str(e)})
+            quota.refund(user_id, reserved)
+            db.session.commit()
+            return jsonify({"error": str(e)}), e.status_code, _retry_after_header(e)
+
+        # Settle usage and save audio record in one commit
+        charged = characters_to_charge(characters, cache_hit)
+        quota.settle(user_id, reserved, charged)
+        audio = create_audio_record(user_id, file_path, characters)
+        with metrics.stage('db_commit'):
+            db.session.commit()
+        reserved = 0
+        enforce_storage_budget(user_id, audio.id)
+        
+        logger.info("Audio generated", extra={"audio_id": audio.id, "user_id": user_id, "cached": cache_hit, "characters_charged": charged})
+        return jsonify({
+            "message": "Audio generated",
+            "file_path": file_path,
+            "audio_id": audio.id,
+            "cached": cache_hit,
+            "characters_charged": charged
+        }), 200
+    except Exception as e:
+        logger.exception("Generate TTS failed")
+        if reserved:
+            db.session.rollback()
+            quota.refund(user_id, reserved)
+            db.session.commit()
+        return jsonify({"error": str(e)}), 500
 
-        # Update usage
-        usage.characters_used += characters
-        usage.characters_remaining -= characters
-        usage.last_generated_at = datetime.utcnow()
-        db.session.commit()
+def _is_async_request(data):
+    flag = request.args.get('async', data.get('async', False))
+    if isinstance(flag, str):
+        return flag.lower() in ('1', 'true', 'yes')
+    return bool(flag)
+
+def _retry_after_header(error):
+    """Retry-After for a backend call the circuit breaker or bulkhead refused"""
+    retry_after = getattr(error, 'retry_after', None)
+    return {'Retry-After': str(retry_after)} if retry_after else {}
+
+# -------------------
+# Generate Many Texts in One Request
+# -------------------
+@tts_bp.route('/generate-batch', methods=['POST'])
+@jwt_required()
+def generate_tts_batch():
+    """
+    Body: {"items": [{"text", "language", "voice_model", ...}, ...]}
+    The characters of all items are reserved at once, items are rendered
+    with bounded concurrency, and the characters of failed items are
+    refunded when the batch is settled. Returns one result per item.
+    """
+    reserved = 0
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+        items = data.get('items')
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items must be a non-empty list"}), 400
+        if len(items) > Config.TTS_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {Config.TTS_BATCH_MAX_ITEMS} items per batch"}), 400
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('text'):
+                return jsonify({"error": f"Text is required (item {index})"}), 400
+
+        characters = [len(item['text']) for item in items]
+        total = sum(characters)
+        if not quota.reserve(user_id, total):
+            logger.info("Not enough characters for batch", extra={"user_id": user_id, "characters": total})
+            return jsonify({"error": "Not enough characters in plan"}), 400
+        reserved = total
+
+        tts_payloads = [build_tts_payload(item) for item in items]
+        outcomes = generate_audio_files(user_id, tts_payloads)
 
-        # Save audio record
-        audio = AudioFile(user_id=user_id, file_path=file_path, characters_used=characters)
-        db.session.add(audio)
+        # Settle the whole batch and insert its rows in one commit
+        done = [(index, file_path, cache_hit) for index, (file_path, cache_hit, error) in enumerate(outcomes) if not error]
+        charged = [characters_to_charge(characters[index], cache_hit) for index, _, cache_hit in done]
+        if done:
+            quota.settle(user_id, reserved, sum(charged))
+            audio_ids = create_audio_records(user_id, [(file_path, characters[index]) for index, file_path, _ in done])
+        else:
+            quota.refund(user_id, reserved)
+            audio_ids = []
         db.session.commit()
-        
-        print(f"Audio generated successfully: {audio.id}")  # Debug log
-        return jsonify({"message": "Audio generated", "file_path": file_path, "audio_id": audio.id}), 200
+        reserved = 0
+        if audio_ids:
+            enforce_storage_budget(user_id, *audio_ids)
+
+        saved = {index: (audio_id, item_charged) for (index, _, _), audio_id, item_charged in zip(done, audio_ids, charged)}
+        results = []
+        for index, (file_path, cache_hit, error) in enumerate(outcomes):
+            if error:
+                results.append({"index": index, "status": "failed", "error": str(error)})
+                continue
+            audio_id, item_charged = saved[index]
+            results.append({
+                "index": index,
+                "status": "done",
+                "audio_id": audio_id,
+                "file_path": file_path,
+                "cached": cache_hit,
+                "characters_charged": item_charged
+            })
+
+        logger.info("Batch generated", extra={"user_id": user_id, "succeeded": len(done), "items": len(items)})
+        if not done:
+            first_error = outcomes[0][2]
+            return jsonify({"error": "All items failed", "results": results}), first_error.status_code, _retry_after_header(first_error)
+        return jsonify({
+            "message": "Batch generated",
+            "succeeded": len(done),
+            "failed": len(items) - len(done),
+            "characters_charged": sum(charged),
+            "results": results
+        }), 200
+    except Exception as e:
+        logger.exception("Generate batch failed")
+        if reserved:
+            db.session.rollback()
+            quota.refund(user_id, reserved)
+            db.session.commit()
+        return jsonify({"error": str(e)}), 500
+
+# -------------------
+# Progressive Streaming Generation (Server-Sent Events)
+# -------------------
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@tts_bp.route('/generate-stream', methods=['POST'])
+@jwt_required()
+def generate_tts_stream():
+    """
+    Render text chunk by chunk and stream each chunk as soon as it is ready:
+      event: start  {"chunks": n}
+      event: audio  {"index", "mimetype", "duration_ms", "audio": base64 file bytes}
+      event: done   {"audio_id", "file_path", "cached", "characters_charged"}
+      event: error  {"error", "status"}
+    The stitched file and its AudioFile row are saved before "done".
+    """
+    identity = get_jwt_identity()
+    user_id = int(identity)
+    data = request.get_json() or {}
+    text = data.get('text')
+    if not text:
+        return jsonify({"error": "Text is required"}), 400
+
+    characters = len(text)
+    if not quota.reserve(user_id, characters):
+        logger.info("Not enough characters", extra={"user_id": user_id, "characters": characters})
+        return jsonify({"error": "Not enough characters in plan"}), 400
+    tts_payload = build_tts_payload(data)
+
+    def generate():
+        reserved = characters
+        work_dir = None
+        try:
+            file_path = synth_cache.materialize(user_id, tts_payload)
+            if file_path:
+                # Whole text already rendered: one frame with the finished file
+                yield _sse('start', {"chunks": 1})
+                storage = storage_for(file_path)
+                with storage.open(file_path) as f:
+                    audio_bytes = f.read()
+                yield _sse('audio', {
+                    "index": 0,
+                    "mimetype": mimetypes.guess_type(file_path)[0] or 'audio/wav',
+                    "duration_ms": None,
+                    "audio": base64.b64encode(audio_bytes).decode('ascii')
+                })
+                cache_hit = True
+            else:
+                chunks = split_text(text, first_max_chars=Config.TTS_STREAM_FIRST_CHUNK_CHARS)
+                yield _sse('start', {"chunks": len(chunks)})
+                work_dir = new_work_dir()
+                combined, ext, cache_hit = None, None, True
+                for index, (chunk_path, chunk_cached) in enumerate(render_chunks(tts_payload, chunks, work_dir)):
+                    ext = ext or os.path.splitext(chunk_path)[1]
+                    segment = AudioSegment.from_file(chunk_path)
+                    combined = append_segment(combined, segment)
+                    cache_hit = cache_hit and chunk_cached
+                    with open(chunk_path, 'rb') as f:
+                        audio_bytes = f.read()
+                    yield _sse('audio', {
+                        "index": index,
+                        "mimetype": mimetypes.guess_type(chunk_path)[0] or 'audio/wav',
+                        "duration_ms": len(segment),
+                        "audio": base64.b64encode(audio_bytes).decode('ascii')
+                    })
+                file_path = store_assembled(user_id, tts_payload, combined, ext, work_dir)
+
+            charged = characters_to_charge(characters, cache_hit)
+            quota.settle(user_id, reserved, charged)
+            audio = create_audio_record(user_id, file_path, characters)
+            db.session.commit()
+            reserved = 0
+            enforce_storage_budget(user_id, audio.id)
+            logger.info("Audio streamed and saved", extra={"audio_id": audio.id, "user_id": user_id, "cached": cache_hit, "characters_charged": charged})
+            yield _sse('done', {
+                "audio_id": audio.id,
+                "file_path": file_path,
+                "cached": cache_hit,
+                "characters_charged": charged
+            })
+        except SynthesisError as e:
+            logger.warning("TTS backend error", extra={"user_id": user_id, "status": e.status_code, "error": str(e)})
+            yield _sse('error', {"error": str(e), "status": e.status_code, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.exception("Generate stream failed")
+            yield _sse('error', {"error": str(e), "status": 500})
+        finally:
+            # Also reached when the client disconnects mid-stream
+            if reserved:
+                db.session.rollback()
+                quota.refund(user_id, reserved)
+                db.session.commit()
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx: pass frames through as they are written
+    }
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+# -------------------
+# Generation Job Status
+# -------------------
+@tts_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_generation_job(job_id):
+    try:
+        identity = get_jwt_identity()
+        user_id = int(identity)
+
+        job = GenerationJob.query.filter_by(id=job_id, user_id=user_id).first()
+        if not job:
+            return jsonify({"error": "Job not found or access denied"}), 404
+
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "audio_id": job.audio_id,
+            "characters": job.characters,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None
+        }), 200
     except Exception as e:
-        print(f"Generate TTS error: {str(e)}")  # Debug log
-        import traceback
-        traceback.print_exc()  # Print full stack trace
         return jsonify({"error": str(e)}), 500
 
 # -------------------
@@ -153,35 +353,45 @@ def generate_tts():
 def download_audio(audio_id):
     try:
         identity = get_jwt_identity()
-        print(f"JWT Identity: {identity}, Type: {type(identity)}")  # Debug log
         
         if not identity:
-            print("No JWT identity found")  # Debug log
+            logger.warning("No JWT identity found")
             return jsonify({"error": "Invalid token"}), 401
             
         user_id = int(identity)
-        print(f"User ID: {user_id}, Audio ID: {audio_id}")  # Debug log
+        logger.debug("Download request", extra={"user_id": user_id, "audio_id": audio_id})
+
+        try:
+            variant = transcoder.parse_format(request.args)  # ?format=mp3|ogg|opus&bitrate=64k
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         audio = AudioFile.query.get(audio_id)
         if not audio:
-            print(f"Audio not found: {audio_id}")  # Debug log
+            logger.info("Audio not found", extra={"audio_id": audio_id})
             return jsonify({"error": "Audio file not found"}), 404
             
         if audio.user_id != user_id:
-            print(f"Access denied: audio.user_id={audio.user_id}, user_id={user_id}")  # Debug log
+            logger.warning("Access denied", extra={"audio_id": audio_id, "owner_id": audio.user_id, "user_id": user_id})
             return jsonify({"error": "Access denied"}), 403
             
-        if not os.path.exists(audio.file_path):
-            print(f"File not found on disk: {audio.file_path}")  # Debug log
+        st = storage_for(audio.file_path).stat(audio.file_path)
+        if st is None:
+            logger.warning("File not found in storage", extra={"audio_id": audio_id, "file_path": audio.file_path})
             return jsonify({"error": "Audio file not found on disk"}), 404
             
-        print(f"Sending file: {audio.file_path}")  # Debug log
-        return send_file(audio.file_path, as_attachment=True, download_name=f"audio_{audio_id}.wav")
+        retention.touch(audio)
+        file_path, mimetype = audio.file_path, None
+        if variant:
+            file_path, st = transcoder.get_variant(audio, *variant)
+            mimetype = transcoder.mimetype_for(variant[0])
+        logger.debug("Sending file", extra={"file_path": file_path})
+        download_name = f"audio_{audio_id}{os.path.splitext(file_path)[1] or '.wav'}"
+        response = send_audio_file(file_path, as_attachment=True, download_name=download_name, mimetype=mimetype, stat=st)
+        return metrics.observe_audio_response(response, 'download', variant[0] if variant else 'original', st.size)
         
     except Exception as e:
-        print(f"Download error: {str(e)}")  # Debug log
-        import traceback
-        traceback.print_exc()  # Print full stack trace
+        logger.exception("Download failed")
         return jsonify({"error": str(e)}), 500
 
 # -------------------
@@ -192,35 +402,44 @@ def download_audio(audio_id):
 def stream_audio(audio_id):
     try:
         identity = get_jwt_identity()
-        print(f"Stream JWT Identity: {identity}, Type: {type(identity)}")  # Debug log
         
         if not identity:
-            print("No JWT identity found")  # Debug log
+            logger.warning("No JWT identity found")
             return jsonify({"error": "Invalid token"}), 401
             
         user_id = int(identity)
-        print(f"Stream User ID: {user_id}, Audio ID: {audio_id}")  # Debug log
+        logger.debug("Stream request", extra={"user_id": user_id, "audio_id": audio_id})
+
+        try:
+            variant = transcoder.parse_format(request.args)  # ?format=mp3|ogg|opus&bitrate=64k
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         audio = AudioFile.query.get(audio_id)
         if not audio:
-            print(f"Audio not found: {audio_id}")  # Debug log
+            logger.info("Audio not found", extra={"audio_id": audio_id})
             return jsonify({"error": "Audio file not found"}), 404
             
         if audio.user_id != user_id:
-            print(f"Access denied: audio.user_id={audio.user_id}, user_id={user_id}")  # Debug log
+            logger.warning("Access denied", extra={"audio_id": audio_id, "owner_id": audio.user_id, "user_id": user_id})
             return jsonify({"error": "Access denied"}), 403
             
-        if not os.path.exists(audio.file_path):
-            print(f"File not found on disk: {audio.file_path}")  # Debug log
+        st = storage_for(audio.file_path).stat(audio.file_path)
+        if st is None:
+            logger.warning("File not found in storage", extra={"audio_id": audio_id, "file_path": audio.file_path})
             return jsonify({"error": "Audio file not found on disk"}), 404
             
-        print(f"Streaming file: {audio.file_path}")  # Debug log
-        return send_file(audio.file_path, as_attachment=False)
+        retention.touch(audio)
+        file_path, mimetype = audio.file_path, None
+        if variant:
+            file_path, st = transcoder.get_variant(audio, *variant)
+            mimetype = transcoder.mimetype_for(variant[0])
+        logger.debug("Streaming file", extra={"file_path": file_path})
+        response = send_audio_file(file_path, as_attachment=False, mimetype=mimetype, stat=st)
+        return metrics.observe_audio_response(response, 'stream', variant[0] if variant else 'original', st.size)
         
     except Exception as e:
-        print(f"Stream error: {str(e)}")  # Debug log
-        import traceback
-        traceback.print_exc()  # Print full stack trace
+        logger.exception("Stream failed")
         return jsonify({"error": str(e)}), 500
 
 @tts_bp.route('/download-audio/<int:audio_id>', methods=['GET'])
@@ -244,39 +463,43 @@ def clone_voice():
         file = request.files['voice_file']
         voice_name = request.form['voice_name']
         
-        # Generate unique user_id for the clone
-        import random
-        unique_id = f"user-{random.randint(100, 999)}-{datetime.utcnow().year}"
+        # Decode, downmix, trim, resample: only the normalized WAV is sent and stored
+        try:
+            sample = voice_sample.prepare(file.stream)
+        except voice_sample.SampleRejected as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Speaker id for the clone, never reused: cached renderings are keyed by it
+        unique_id = f"user-{uuid.uuid4().hex}"
         
         # Prepare file for external API
-        files = {'voice_file': (file.filename, file.stream, file.content_type)}
+        files = {'voice_file': (f"{unique_id}.wav", sample.wav, 'audio/wav')}
         data = {'user_id': unique_id}
         
         # Call external voice cloning API
-        clone_api_url = f"{TTS_BASE_URL}/voice/upload"
-        
         try:
-            response = requests.post(clone_api_url, files=files, data=data, timeout=60)
-            response.raise_for_status()
-            clone_response = response.json()
-            print(f"Clone API Response: {clone_response}")  # Debug log
+            clone_response = get_tts_client().upload_voice(files, data)
+            logger.info("Voice sample uploaded", extra={"speaker_id": unique_id, "remote_path": clone_response.get('path')})
             
             remote_voice_path = clone_response.get('path')
             if not remote_voice_path:
                 return jsonify({"error": "No voice path in API response"}), 500
                 
+        except BackendUnavailable as e:
+            logger.warning("Voice cloning backend unavailable", extra={"reason": e.reason, "retry_after": e.retry_after})
+            return jsonify({"error": str(e)}), 503, _retry_after_header(e)
         except requests.exceptions.RequestException as e:
-            print(f"Clone API Error: {str(e)}")  # Debug log
+            logger.warning("Voice cloning backend error", extra={"speaker_id": unique_id, "error": str(e)})
             return jsonify({"error": f"Voice cloning API error: {str(e)}"}), 500
         
         # Save locally as well
         filename = secure_filename(f"{user_id}_{voice_name}_{datetime.utcnow().timestamp()}.wav")
-        os.makedirs(CLONED_FOLDER, exist_ok=True)
-        file_path = os.path.join(CLONED_FOLDER, filename)
+        storage = get_storage()
+        file_path = storage.new_path(CLONED_FOLDER, filename)
         
-        # Reset file stream and save locally
-        file.stream.seek(0)
-        file.save(file_path)
+        # Reset the normalized sample and save it
+        sample.wav.seek(0)
+        storage.put(file_path, sample.wav)
 
         # Save to DB with unique_id as speaker_id
         voice = ClonedVoice(
@@ -292,12 +515,17 @@ def clone_voice():
             "message": "Voice cloned successfully", 
             "voice_id": voice.id,
             "speaker_id": unique_id,
-            "remote_path": remote_voice_path
+            "remote_path": remote_voice_path,
+            "sample": {
+                "duration": sample.duration,
+                "speech_seconds": sample.speech_seconds,
+                "sample_rate": Config.CLONE_SAMPLE_RATE,
+                "size": sample.size,
+                "processing_ms": sample.processing_ms
+            }
         }), 200
     except Exception as e:
-        print(f"Clone voice error: {str(e)}")  # Debug log
-        import traceback
-        traceback.print_exc()
+        logger.exception("Clone voice failed")
         return jsonify({"error": str(e)}), 500
 
 # -------------------
@@ -333,7 +561,7 @@ def list_voices():
 @jwt_required()
 def get_available_voices():
     """
-    Fetches all available voices for the current user from external API.
+    Lists all available voices for the current user from the cached backend catalog.
     - Default voices (default_male_01, default_female_01) are visible to all users if available in API
     - User's personal cloned voices are only visible to themselves
     """
@@ -341,79 +569,8 @@ def get_available_voices():
         identity = get_jwt_identity()
         user_id = int(identity)
         
-        available_voices = []
-        
-        # Get user's cloned voices from local DB for matching
         user_clones = ClonedVoice.query.filter_by(user_id=user_id).all()
-        user_speaker_ids = [c.speaker_id for c in user_clones if c.speaker_id]
-        
-        # Fetch voices from external API
-        try:
-            external_api_url = f"{TTS_BASE_URL}/voice/list"
-            response = requests.get(external_api_url, timeout=30)
-            
-            if response.ok:
-                external_data = response.json()
-                print(f"External API response: {external_data}")  # Debug log
-                
-                # Handle response format: {"voices": [...]}
-                voice_list = external_data.get('voices', []) if isinstance(external_data, dict) else external_data
-                
-                # Process each voice from external API
-                for voice in voice_list:
-                    voice_user_id = voice.get('user_id', '')
-                    is_available = voice.get('available', False)
-                    
-                    # Skip unavailable voices
-                    if not is_available:
-                        continue
-                    
-                    # Check if it's a default voice
-                    if voice_user_id in ['default_male_01', 'default_female_01']:
-                        # Determine gender from user_id
-                        gender = 'female' if 'female' in voice_user_id else 'male'
-                        voice_name = 'Default Female Voice' if gender == 'female' else 'Default Male Voice'
-                        
-                        available_voices.append({
-                            "user_id": voice_user_id,
-                            "voice_name": voice_name,
-                            "path": voice.get('path', ''),
-                            "is_default": True,
-                            "available": True,
-                            "gender": gender
-                        })
-                    
-                    # Check if the voice belongs to the current user (cloned voice)
-                    elif voice_user_id in user_speaker_ids:
-                        # Find the matching local clone for additional info
-                        matching_clone = next((c for c in user_clones if c.speaker_id == voice_user_id), None)
-                        
-                        available_voices.append({
-                            "user_id": voice_user_id,
-                            "voice_name": matching_clone.voice_name if matching_clone else voice_user_id,
-                            "path": voice.get('path', ''),
-                            "is_default": False,
-                            "available": True,
-                            "clone_id": matching_clone.id if matching_clone else None
-                        })
-                        
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching external voices: {str(e)}")  # Debug log
-            # If external API fails, only return user's local cloned voices
-        
-        # Also add user's local cloned voices that might not be in external API yet
-        existing_user_ids = [v['user_id'] for v in available_voices]
-        
-        for clone in user_clones:
-            if clone.speaker_id and clone.speaker_id not in existing_user_ids:
-                available_voices.append({
-                    "user_id": clone.speaker_id,
-                    "voice_name": clone.voice_name,
-                    "path": clone.voice_file_path,
-                    "is_default": False,
-                    "available": True,
-                    "clone_id": clone.id
-                })
+        available_voices = voice_catalog.voices_for_user(user_clones)
         
         return jsonify({
             "voices": available_voices,
@@ -421,9 +578,7 @@ def get_available_voices():
         }), 200
         
     except Exception as e:
-        print(f"Get available voices error: {str(e)}")  # Debug log
-        import traceback
-        traceback.print_exc()
+        logger.exception("Get available voices failed")
         return jsonify({"error": str(e)}), 500
 
 # -------------------
@@ -440,10 +595,12 @@ def download_voice(voice_id):
         if not voice:
             return jsonify({"error": "Voice not found or access denied"}), 404
 
-        if not os.path.exists(voice.voice_file_path):
+        st = storage_for(voice.voice_file_path).stat(voice.voice_file_path)
+        if st is None:
             return jsonify({"error": "Voice file not found on disk"}), 404
 
-        return send_file(voice.voice_file_path, as_attachment=True, download_name=f"{voice.voice_name}.wav")
+        return send_audio_file(voice.voice_file_path, as_attachment=True,
+                               download_name=f"{voice.voice_name}.wav", stat=st, immutable=False)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -462,33 +619,19 @@ def delete_voice(voice_id):
         if not voice:
             return jsonify({"error": "Voice not found or access denied"}), 404
 
-        # Delete file from filesystem
-        if os.path.exists(voice.voice_file_path):
-            os.remove(voice.voice_file_path)
+        # Delete file from storage
+        storage_for(voice.voice_file_path).delete(voice.voice_file_path)
 
         # Delete from database
+        speaker_id = voice.speaker_id
         db.session.delete(voice)
         db.session.commit()
+        synth_cache.invalidate_speaker(speaker_id)
 
         return jsonify({"message": "Voice deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# -------------------
-# Auto-delete Generated Audio > 7 days
-# -------------------
-def delete_expired_audio():
-    now = datetime.utcnow()
-    expired_audios = AudioFile.query.filter(AudioFile.expire_at <= now).all()
-    for audio in expired_audios:
-        if os.path.exists(audio.file_path):
-            os.remove(audio.file_path)
-        db.session.delete(audio)
-    db.session.commit()
-
-# You can call delete_expired_audio() via a scheduled job (cron, APScheduler, or Celery)
-# to periodically clean up old audio files.
-
 # -------------------
 # Get Supported Languages
 # -------------------
@@ -542,15 +685,14 @@ def get_audio_history():
         user_id = int(identity)
         
         # Get query parameters
-        limit = request.args.get('limit', 10, type=int)
-        offset = request.args.get('offset', 0, type=int)
+        limit = get_page_size(10)
+        cursor = decode_cursor(request.args.get('cursor'))
         
-        # Query user's audio files ordered by creation date (newest first)
-        audios = AudioFile.query.filter_by(user_id=user_id)\
-            .order_by(AudioFile.created_at.desc())\
-            .limit(limit)\
-            .offset(offset)\
-            .all()
+        # User's audio files, newest first, continuing after the cursor
+        audios, next_cursor = keyset_page(
+            AudioFile.query.filter_by(user_id=user_id),
+            AudioFile.created_at, AudioFile.id, cursor, limit
+        )
         
         result = [{
             "id": audio.id,
@@ -560,16 +702,14 @@ def get_audio_history():
             "expires_at": audio.expire_at.isoformat() if audio.expire_at else None
         } for audio in audios]
         
-        # Get total count
-        total_count = AudioFile.query.filter_by(user_id=user_id).count()
-        
         return jsonify({
             "audios": result,
-            "total": total_count,
             "limit": limit,
-            "offset": offset
+            "next_cursor": next_cursor
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Audio history error: {str(e)}")
+        logger.exception("Audio history failed")
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -7,6 +7,7 @@ from app.models.audio_file import AudioFile
 from app.schemas.user_schema import UserSchema
 from app.schemas.usage_schema import UsageSchema
 from app.schemas.audio_file_schema import AudioFileSchema
+from app.utils.pagination import decode_cursor, get_page_size, keyset_page, InvalidCursor
 
 user_bp = Blueprint('user', __name__)
 user_schema = UserSchema()
@@ -75,9 +76,17 @@ def get_profile():
 def get_voice_history():
     try:
         user_id = get_jwt_identity()
-        audios = AudioFile.query.filter_by(user_id=int(user_id)).all()
+        limit = get_page_size()
+        cursor = decode_cursor(request.args.get('cursor'))
+
+        audios, next_cursor = keyset_page(
+            AudioFile.query.filter_by(user_id=int(user_id)),
+            AudioFile.created_at, AudioFile.id, cursor, limit
+        )
         result = audio_schema.dump(audios, many=True)
-        return jsonify(result), 200
+        return jsonify({"audios": result, "limit": limit, "next_cursor": next_cursor}), 200
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -9,3 +9,6 @@ class AudioFileSchema(ma.Schema):
     characters_used = fields.Int(required=True)
     created_at = fields.DateTime(dump_only=True)
     expire_at = fields.DateTime(dump_only=True)
+    size = fields.Int(dump_only=True)
+    variants_size = fields.Int(dump_only=True)
+    last_accessed_at = fields.DateTime(dump_only=True)
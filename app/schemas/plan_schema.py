@@ -6,5 +6,7 @@ class PlanSchema(ma.Schema):
     id = fields.Int(dump_only=True)
     name = fields.Str(required=True)
     character_limit = fields.Int(required=True)
+    audio_retention_days = fields.Int(allow_none=True)
+    audio_storage_bytes = fields.Int(allow_none=True)
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
@@ -0,0 +1,154 @@
+# app/utils/admin_stats.py
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.config import Config
+from app.models.stats_counter import StatsCounter
+from app.models.user import User
+from app.models.plan import Plan
+from app.models.usage import Usage
+from app.models.audio_file import AudioFile
+
+# --------------------------
+# Admin dashboard counters
+# --------------------------
+# The figures behind /api/admin/stats live in the stats_counters table.
+# Register, generate and subscription code paths bump them in their own
+# transaction with increment(); a periodic recount() rebuilds them from the
+# source tables to pick up everything else (deletes, admin edits, the
+# sliding 30 day window of recent_users). Reads go through a short
+# in-process cache, so dashboard polling costs at most one query per TTL.
+
+COUNTERS = (
+    'total_users',
+    'total_admins',
+    'active_users',
+    'total_plans',
+    'total_audios',
+    'recent_users',
+    'total_characters_used',
+)
+RECOUNT_MARKER = '_recounted_at'  # value = unix time of the last full recount
+RECENT_USERS_DAYS = 30
+
+_cache = {"snapshot": None, "cached_at": 0.0}
+_cache_lock = threading.Lock()
+
+# --------------------------
+# Incremental updates (caller commits)
+# --------------------------
+def increment(**deltas):
+    """Add deltas to counters with a single UPDATE in the caller's transaction"""
+    deltas = {name: n for name, n in deltas.items() if n}
+    if not deltas:
+        return
+    StatsCounter.query.filter(StatsCounter.name.in_(list(deltas))).update({
+        "value": StatsCounter.value + db.case(deltas, value=StatsCounter.name, else_=0),
+        "updated_at": datetime.utcnow()
+    }, synchronize_session=False)
+
+def user_created(user):
+    counter = 'total_admins' if user.user_type == 'admin' else 'total_users'
+    increment(**{counter: 1}, recent_users=1, active_users=1 if user.plan_id else 0)
+
+def plan_changed(old_plan_id, new_plan_id):
+    """A user gained or lost a plan"""
+    increment(active_users=bool(new_plan_id) - bool(old_plan_id))
+
+# --------------------------
+# Full recount
+# --------------------------
+def _count_all():
+    thirty_days_ago = datetime.utcnow() - timedelta(days=RECENT_USERS_DAYS)
+    return {
+        "total_users": User.query.filter_by(user_type='user').count(),
+        "total_admins": User.query.filter_by(user_type='admin').count(),
+        "active_users": User.query.filter(User.plan_id.isnot(None)).count(),
+        "total_plans": Plan.query.count(),
+        "total_audios": AudioFile.query.count(),
+        "recent_users": User.query.filter(User.created_at >= thirty_days_ago).count(),
+        "total_characters_used": int(db.session.query(db.func.sum(Usage.characters_used)).scalar() or 0),
+    }
+
+def recount():
+    """
+    Rebuild every counter from the source tables and commit.
+    Increments that commit while the counts run may be lost or doubled
+    until the next recount; the dashboard tolerates that.
+    """
+    values = _count_all()
+    values[RECOUNT_MARKER] = int(time.time())
+    now = datetime.utcnow()
+
+    existing = {row.name: row for row in StatsCounter.query.all()}
+    for name, value in values.items():
+        row = existing.get(name)
+        if row is None:
+            db.session.add(StatsCounter(name=name, value=value, updated_at=now))
+        else:
+            row.value = value
+            row.updated_at = now
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created the rows first, its figures are as good as ours
+        db.session.rollback()
+
+    snapshot = {name: values[name] for name in COUNTERS}
+    snapshot["last_updated"] = now.isoformat()
+    snapshot["last_recount"] = now.isoformat()
+    return _cache_put(snapshot)
+
+def recount_if_due():
+    """
+    Periodic task: recount unless another process did so recently. The run
+    is claimed with a conditional UPDATE on the marker row, so several
+    worker processes do not all recount at every interval.
+    """
+    now = int(time.time())
+    cutoff = now - int(Config.ADMIN_STATS_RECOUNT_INTERVAL * 0.9)
+    claimed = StatsCounter.query.filter(
+        StatsCounter.name == RECOUNT_MARKER,
+        StatsCounter.value <= cutoff
+    ).update({"value": now}, synchronize_session=False)
+    db.session.commit()
+    if claimed or StatsCounter.query.get(RECOUNT_MARKER) is None:
+        recount()
+
+# --------------------------
+# Reads
+# --------------------------
+def _read():
+    """Snapshot of the stored counters, or None before the first recount"""
+    rows = {row.name: row for row in StatsCounter.query.all()}
+    if any(name not in rows for name in COUNTERS + (RECOUNT_MARKER,)):
+        return None
+    snapshot = {name: rows[name].value for name in COUNTERS}
+    last_updated = max(rows[name].updated_at for name in COUNTERS)
+    snapshot["last_updated"] = last_updated.isoformat() if last_updated else None
+    snapshot["last_recount"] = datetime.utcfromtimestamp(rows[RECOUNT_MARKER].value).isoformat()
+    return snapshot
+
+def _cache_put(snapshot):
+    with _cache_lock:
+        _cache["snapshot"] = snapshot
+        _cache["cached_at"] = time.monotonic()
+    return snapshot
+
+def get_stats(fresh=False):
+    """
+    Counters for the admin dashboard. fresh=True recounts from the source
+    tables instead of serving the cache or the stored counters.
+    """
+    if not fresh:
+        with _cache_lock:
+            snapshot = _cache["snapshot"]
+            age = time.monotonic() - _cache["cached_at"]
+        if snapshot is not None and age < Config.ADMIN_STATS_CACHE_TTL:
+            return dict(snapshot, cached=True)
+        snapshot = _read()
+        if snapshot is not None:
+            return dict(_cache_put(snapshot), cached=False)
+    return dict(recount(), cached=False)
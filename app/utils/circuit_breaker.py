@@ -0,0 +1,162 @@
+# app/utils/circuit_breaker.py
+import time
+import threading
+from collections import deque
+
+# --------------------------
+# Circuit breaker and bulkhead
+# --------------------------
+# A CircuitBreaker watches the outcome of the last `window` calls to one
+# dependency. Once at least `min_calls` were made and the share of failures
+# reaches `failure_rate`, it opens: calls are refused straight away for
+# `open_seconds`. Then it goes half open and lets `half_open_calls` probes
+# through; as many successes close it again, a failure reopens it.
+#
+# A Bulkhead caps how many calls are in flight at once, so a slow
+# dependency can hold at most that many threads of a worker.
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+
+class CircuitOpen(Exception):
+    """The breaker refused the call; retry_after is the wait in seconds before the next probe"""
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Thread-safe breaker for one dependency:
+        probe = breaker.acquire()      # raises CircuitOpen
+        ... call ...
+        breaker.record(failed, probe)  # failed=None: outcome says nothing about the dependency
+    """
+    def __init__(self, name, failure_rate, window, min_calls, open_seconds, half_open_calls=1, on_change=None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.on_change = on_change
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=max(self.min_calls, window))  # True for a failure
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def _set_state(self, state):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+        if state != CLOSED:
+            self._probes = 0
+            self._probe_successes = 0
+        self._outcomes.clear()
+        return previous
+
+    def acquire(self):
+        """Admit a call, returns True when it is a half-open probe"""
+        changed = None
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, remaining)
+                changed = (self._set_state(HALF_OPEN), HALF_OPEN)
+            probe = self.state == HALF_OPEN
+            if probe:
+                if self._probes >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, 1)  # Probes in flight decide soon
+                self._probes += 1
+        if changed:
+            self._notify(*changed)
+        return probe
+
+    def record(self, failed, probe=False):
+        """Report how an admitted call went"""
+        changed = None
+        with self._lock:
+            if probe:
+                if self.state != HALF_OPEN:
+                    return
+                self._probes -= 1
+                if failed:
+                    changed = (self._set_state(OPEN), OPEN)
+                elif failed is False:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        changed = (self._set_state(CLOSED), CLOSED)
+            elif self.state == CLOSED and failed is not None:
+                # Calls admitted before the breaker opened do not count afterwards
+                self._outcomes.append(failed)
+                total = len(self._outcomes)
+                if total >= self.min_calls and sum(self._outcomes) / total >= self.failure_rate:
+                    changed = (self._set_state(OPEN), OPEN)
+        if changed:
+            self._notify(*changed)
+
+    def _notify(self, previous, state):
+        if self.on_change and previous != state:
+            self.on_change(self, previous, state)
+
+    def snapshot(self):
+        with self._lock:
+            total = len(self._outcomes)
+            snapshot = {
+                "state": self.state,
+                "calls": total,
+                "failure_rate": round(sum(self._outcomes) / total, 3) if total else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+            if self.state == OPEN:
+                snapshot["retry_after"] = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+            return snapshot
+
+
+class Bulkhead:
+    """Cap on concurrent calls; acquire waits up to max_wait seconds for a slot (0 = unlimited)"""
+    def __init__(self, max_concurrent, max_wait):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """False when no slot freed up in time"""
+        if self._semaphore and not self._semaphore.acquire(timeout=self.max_wait):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._semaphore:
+            self._semaphore.release()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "max_in_flight": self.max_concurrent,
+                "in_flight": self.in_flight,
+                "peak": self.peak,
+                "rejected": self.rejected
+            }
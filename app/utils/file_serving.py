@@ -0,0 +1,233 @@
+# app/utils/file_serving.py
+import os
+import uuid
+import mimetypes
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import request, Response, redirect
+from werkzeug.http import (
+    http_date, parse_etags, parse_date, parse_if_range_header, quote_etag
+)
+from app.config import Config
+from app.utils.file_utils import content_disposition
+from app.utils.storage import storage_for
+
+# --------------------------
+# Validators
+# --------------------------
+def _last_modified(st):
+    # HTTP dates have one second resolution
+    return datetime.fromtimestamp(int(st.mtime), tz=timezone.utc)
+
+def _not_modified(etag, last_modified):
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110 13.2.2)"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return etags.star_tag or etags.contains_weak(etag)
+
+    if_modified_since = parse_date(request.headers.get('If-Modified-Since'))
+    if if_modified_since:
+        return last_modified <= if_modified_since
+    return False
+
+def _if_range_matches(etag, last_modified):
+    """A Range is only honoured when If-Range (if any) still matches the file"""
+    header = request.headers.get('If-Range')
+    if not header:
+        return True
+    if_range = parse_if_range_header(header)
+    if if_range.etag:
+        # If-Range requires a strong comparison
+        return not header.strip().startswith('W/') and if_range.etag == etag
+    if if_range.date:
+        return if_range.date == last_modified
+    return False
+
+# --------------------------
+# Ranges
+# --------------------------
+def _parse_byte_ranges(header):
+    """
+    Parse "bytes=0-99,200-,-500" into (first, last) pairs, last being None
+    for open ranges and first None for suffix ranges. Unlike werkzeug's
+    parser this accepts unordered and overlapping ranges (RFC 9110 14.1.1).
+    """
+    if not header or '=' not in header:
+        return None
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+
+    parsed = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        first, sep, last = item.partition('-')
+        first, last = first.strip(), last.strip()
+        if not sep or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+        if not first:
+            if not last:
+                return None
+            parsed.append((None, int(last)))
+        else:
+            if last and int(last) < int(first):
+                return None
+            parsed.append((int(first), int(last) if last else None))
+    return parsed or None
+
+def _satisfiable_ranges(length):
+    """
+    Parse the Range header into sorted, merged (start, stop) pairs with an
+    exclusive stop. Returns None when the header is absent or invalid, which
+    means the whole file is served, and [] when nothing is satisfiable.
+    """
+    parsed = _parse_byte_ranges(request.headers.get('Range'))
+    if parsed is None:
+        return None
+
+    ranges = []
+    for first, last in parsed:
+        if first is None:
+            # Suffix range: the last `last` bytes
+            start, stop = max(length - last, 0), length
+        else:
+            start = first
+            stop = length if last is None else min(last + 1, length)
+        if start < stop:
+            ranges.append((start, stop))
+
+    ranges.sort()
+    merged = []
+    for start, stop in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+def _multipart_body(storage, path, ranges, length, mimetype, boundary):
+    """Return (body_iterator, content_length) for a multipart/byteranges body"""
+    parts = []
+    content_length = 0
+    for start, stop in ranges:
+        head = (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n"
+        ).encode('latin-1')
+        parts.append((head, start, stop))
+        content_length += len(head) + (stop - start)
+    tail = f"\r\n--{boundary}--\r\n".encode('latin-1')
+    content_length += len(tail)
+
+    def generate():
+        for head, start, stop in parts:
+            yield head
+            yield from storage.iter_range(path, start, stop)
+        yield tail
+
+    return generate(), content_length
+
+# --------------------------
+# Proxy offload
+# --------------------------
+# With FILE_SERVING_MODE=x-accel (nginx) or x-sendfile (Apache mod_xsendfile,
+# lighttpd) the app only authorizes the request and names the file in a
+# header; the proxy sends the bytes itself, including Range and conditional
+# requests, so no worker is held for the length of the transfer.
+
+def _offload_header(local_path):
+    """(header, value) handing local_path to the proxy, None to serve it from the app"""
+    mode = Config.FILE_SERVING_MODE
+    if mode == 'app':
+        return None
+    path = os.path.abspath(local_path)
+    if mode == 'x-sendfile':
+        return 'X-Sendfile', path
+    if mode == 'x-accel':
+        relative = os.path.relpath(path, Config.UPLOAD_FOLDER)
+        if relative.startswith('..'):
+            return None  # Outside the internal location nginx maps
+        prefix = Config.X_ACCEL_REDIRECT_PREFIX.rstrip('/')
+        return 'X-Accel-Redirect', f"{prefix}/{quote(relative.replace(os.sep, '/'))}"
+    raise ValueError(f"Unknown FILE_SERVING_MODE: {mode}")
+
+# --------------------------
+# Send audio file
+# --------------------------
+def send_audio_file(path, as_attachment=False, download_name=None, mimetype=None, stat=None, immutable=True):
+    """
+    Serve a stored file with strong ETag/Last-Modified validators,
+    304 for conditional requests and 206 for single or multi-range requests.
+    Files of at least STORAGE_REDIRECT_MIN_BYTES on a backend that can
+    presign URLs are redirected there instead of streamed by the worker,
+    and local files are handed to the front proxy when FILE_SERVING_MODE
+    is set. stat is the file's StorageStat when the caller already has it.
+    immutable=False is for files that can be replaced under the same name.
+    """
+    storage = storage_for(path)
+    st = stat or storage.stat(path)
+    if st is None:
+        raise FileNotFoundError(path)
+    length = st.size
+    etag = st.etag
+    last_modified = _last_modified(st)
+    download_name = download_name or os.path.basename(path)
+    mimetype = mimetype or mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+    if length >= Config.STORAGE_REDIRECT_MIN_BYTES:
+        url = storage.presign(path, download_name=download_name if as_attachment else None, mimetype=mimetype)
+        if url:
+            # The object store answers Range and conditional requests itself
+            response = redirect(url, code=302)
+            response.headers['Cache-Control'] = 'private, no-store'
+            return response
+
+    headers = {
+        'ETag': quote_etag(etag),
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': f"private, max-age={Config.AUDIO_CACHE_MAX_AGE}, immutable" if immutable
+                         else 'private, no-cache',
+        'Accept-Ranges': 'bytes'
+    }
+    if as_attachment:
+        headers['Content-Disposition'] = content_disposition(download_name)
+
+    if _not_modified(etag, last_modified):
+        return Response(status=304, headers=headers)
+
+    local_path = storage.local_path(path)
+    offload = _offload_header(local_path) if local_path else None
+    if offload:
+        # The proxy sets its own validators and length from the file
+        for name in ('ETag', 'Last-Modified', 'Accept-Ranges'):
+            headers.pop(name)
+        headers[offload[0]] = offload[1]
+        return Response(status=200, headers=headers, mimetype=mimetype)
+
+    ranges = _satisfiable_ranges(length) if _if_range_matches(etag, last_modified) else None
+
+    if ranges is None:
+        headers['Content-Length'] = str(length)
+        return Response(storage.iter_range(path, 0, length), status=200, headers=headers,
+                        mimetype=mimetype, direct_passthrough=True)
+
+    if not ranges:
+        headers['Content-Range'] = f"bytes */{length}"
+        return Response(status=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        headers['Content-Range'] = f"bytes {start}-{stop - 1}/{length}"
+        headers['Content-Length'] = str(stop - start)
+        return Response(storage.iter_range(path, start, stop), status=206, headers=headers,
+                        mimetype=mimetype, direct_passthrough=True)
+
+    boundary = uuid.uuid4().hex
+    body, content_length = _multipart_body(storage, path, ranges, length, mimetype, boundary)
+    headers['Content-Length'] = str(content_length)
+    return Response(body, status=206, headers=headers,
+                    content_type=f"multipart/byteranges; boundary={boundary}", direct_passthrough=True)
@@ -1,6 +1,11 @@
 # app/utils/file_utils.py
 import os
+import hashlib
+import unicodedata
+from urllib.parse import quote
 from datetime import datetime, timedelta
+from werkzeug.http import dump_options_header
+from app.config import Config
 
 # --------------------------
 # Ensure folders exist
@@ -10,29 +15,69 @@ def ensure_folder(path):
         os.makedirs(path)
 
 # --------------------------
-# Auto-delete generated audio
+# Sharded layout
 # --------------------------
-def delete_expired_audio(AudioFileModel, session):
+# Files live in hashed subdirectories, folder/3f/a2/<filename> for the
+# default two levels, so no directory grows past a few thousand entries.
+# The shard is derived from the filename alone: a file can be found again
+# from its name, without a database lookup.
+
+def shard_parts(filename, levels=None):
+    levels = Config.STORAGE_SHARD_LEVELS if levels is None else levels
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return [digest[i * 2:i * 2 + 2] for i in range(levels)]
+
+def sharded_path(folder, filename, create=True):
+    """Path of filename inside its shard of folder, creating the shard directory"""
+    directory = os.path.join(folder, *shard_parts(filename))
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+def is_sharded(path):
+    """True when path already sits in the shard directories of its filename"""
+    filename = os.path.basename(path)
+    parts = shard_parts(filename)
+    if not parts:
+        return True
+    directories = os.path.normpath(os.path.dirname(path)).split(os.sep)
+    return directories[-len(parts):] == parts
+
+def find_file(folder, filename):
+    """Locate filename in folder: sharded location first, then the legacy flat one"""
+    path = sharded_path(folder, filename, create=False)
+    if os.path.exists(path):
+        return path
+    legacy = os.path.join(folder, filename)
+    return legacy if os.path.exists(legacy) else None
+
+# --------------------------
+# Download headers
+# --------------------------
+def content_disposition(download_name, disposition='attachment'):
     """
-    Delete generated audio older than 7 days
-    AudioFileModel: SQLAlchemy model for generated audio
-    session: db.session
+    Content-Disposition value for download_name, built like Flask's
+    send_file: quoted, with an ASCII filename and an RFC 5987 filename*
+    when the name is not ASCII, so the header stays latin-1 encodable.
     """
-    now = datetime.utcnow()
-    expired_files = AudioFileModel.query.filter(AudioFileModel.expire_at <= now).all()
-    for audio in expired_files:
-        if os.path.exists(audio.file_path):
-            os.remove(audio.file_path)
-        session.delete(audio)
-    session.commit()
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        options = {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='!#$&+^`|~')}"}
+    else:
+        options = {'filename': download_name}
+    return dump_options_header(disposition, options)
 
 # --------------------------
 # Save uploaded file
 # --------------------------
 def save_file(file, folder, filename=None):
-    ensure_folder(folder)
+    """Store an uploaded file on the configured storage backend, returns its path"""
+    from app.utils.storage import get_storage  # storage builds on the helpers above
     if not filename:
         filename = f"{datetime.utcnow().timestamp()}_{file.filename}"
-    file_path = os.path.join(folder, filename)
-    file.save(file_path)
+    storage = get_storage()
+    file_path = storage.new_path(folder, filename)
+    storage.put(file_path, file.stream)
     return file_path
@@ -0,0 +1,214 @@
+# app/utils/job_worker.py
+import os
+import json
+import threading
+import logging
+from datetime import datetime, timedelta
+from app import db
+from app.config import Config
+from app.models.generation_job import GenerationJob
+from app.utils import quota
+from app.utils.tts_pipeline import generate_audio_file, characters_to_charge, create_audio_record, enforce_storage_budget, SynthesisError
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Enqueue
+# --------------------------
+def enqueue_generation_job(user_id, tts_payload, characters):
+    """
+    Queue a job for characters the caller already reserved with
+    quota.reserve. The reservation is settled or refunded by the worker.
+    """
+    job = GenerationJob(
+        user_id=user_id,
+        status='queued',
+        payload=json.dumps(tts_payload),
+        characters=characters
+    )
+    db.session.add(job)
+    db.session.commit()
+    notify_job_workers()
+    return job
+
+# --------------------------
+# Claim / run a single job
+# --------------------------
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running'. The conditional
+    UPDATE makes sure only one worker (in any process) wins a given job.
+    """
+    candidates = GenerationJob.query.with_entities(GenerationJob.id)\
+        .filter_by(status='queued')\
+        .order_by(GenerationJob.created_at)\
+        .limit(5)\
+        .all()
+    for (job_id,) in candidates:
+        claimed = GenerationJob.query.filter_by(id=job_id, status='queued').update({
+            "status": 'running',
+            "started_at": datetime.utcnow(),
+            "attempts": GenerationJob.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(GenerationJob, job_id)
+    return None
+
+def run_job(job):
+    """
+    Synthesize a claimed job, then settle or refund its reserved characters.
+    Returns the seconds the worker should pause when the backend refused the
+    call (circuit open or bulkhead full); the job is then queued again.
+    """
+    try:
+        file_path, cache_hit = generate_audio_file(job.user_id, json.loads(job.payload))
+    except SynthesisError as e:
+        if e.retry_after:
+            db.session.rollback()
+            requeue_job(job)
+            logger.info("Backend unavailable, generation job requeued",
+                        extra={"job_id": job.id, "retry_after": e.retry_after})
+            return e.retry_after
+        logger.warning("Generation job failed", extra={"job_id": job.id, "error": str(e)})
+        db.session.rollback()
+        finish_job(job, error=str(e))
+        return
+    except Exception as e:
+        message = f"Unexpected error: {str(e)}"
+        logger.exception("Generation job failed", extra={"job_id": job.id})
+        db.session.rollback()
+        finish_job(job, error=message)
+        return
+
+    finish_job(job, file_path=file_path, charged=characters_to_charge(job.characters, cache_hit))
+
+def finish_job(job, file_path=None, error=None, charged=0):
+    if error is None:
+        quota.settle(job.user_id, job.characters, charged)
+        audio = create_audio_record(job.user_id, file_path, job.characters)
+        db.session.flush()
+        job.audio_id = audio.id
+        job.status = 'done'
+    else:
+        quota.refund(job.user_id, job.characters)
+        job.error = error
+        job.status = 'failed'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    if error is None:
+        enforce_storage_budget(job.user_id, job.audio_id)
+
+def requeue_job(job):
+    """
+    Hand a claimed job back to the queue, its reservation stays in place.
+    The backend refused the call, so the attempt does not count.
+    """
+    job.status = 'queued'
+    job.started_at = None
+    job.attempts = max(0, job.attempts - 1)
+    db.session.commit()
+
+def requeue_stale_jobs():
+    """
+    Put back jobs left 'running' by a worker process that died. A job that
+    was already claimed TTS_JOB_MAX_ATTEMPTS times is failed and its
+    reservation refunded instead, so a job that keeps killing its worker is
+    not retried forever. Runs periodically in every process: each job is
+    moved with a conditional UPDATE, so only one process acts on it.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.TTS_JOB_STALE_SECONDS)
+    stale = GenerationJob.query.with_entities(
+        GenerationJob.id, GenerationJob.user_id, GenerationJob.characters, GenerationJob.attempts
+    ).filter(
+        GenerationJob.status == 'running',
+        GenerationJob.started_at < cutoff
+    ).all()
+
+    requeued = failed = 0
+    for job_id, user_id, characters, attempts in stale:
+        give_up = attempts >= Config.TTS_JOB_MAX_ATTEMPTS
+        changes = {"status": 'failed', "error": f"Worker lost the job {attempts} times",
+                   "finished_at": datetime.utcnow()} if give_up else {"status": 'queued', "started_at": None}
+        moved = GenerationJob.query.filter(
+            GenerationJob.id == job_id,
+            GenerationJob.status == 'running',
+            GenerationJob.started_at < cutoff
+        ).update(changes, synchronize_session=False)
+        if moved and give_up:
+            quota.refund(user_id, characters)
+            failed += 1
+        elif moved:
+            requeued += 1
+        db.session.commit()
+
+    if requeued or failed:
+        logger.info("Recovered stale generation jobs", extra={"requeued": requeued, "failed": failed})
+    if requeued:
+        notify_job_workers()
+    return requeued + failed
+
+# --------------------------
+# Worker pool
+# --------------------------
+class JobWorkerPool:
+    """Daemon threads that poll the generation_jobs table"""
+    def __init__(self, app, workers, poll_interval):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+
+    def start(self):
+        with self.app.app_context():
+            requeue_stale_jobs()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"tts-job-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def notify(self):
+        self.wakeup.set()
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            try:
+                with self.app.app_context():
+                    job = claim_next_job()
+                    if job:
+                        pause = run_job(job)
+                        if pause:
+                            self.stopping.wait(pause)
+                        continue
+            except Exception:
+                logger.exception("Job worker error")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def start_job_workers(app):
+    """Start this process's worker pool once; safe to call on every request"""
+    global _pool, _pool_pid
+    if Config.TTS_JOB_WORKERS <= 0:
+        return None
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = JobWorkerPool(app, Config.TTS_JOB_WORKERS, Config.TTS_JOB_POLL_INTERVAL)
+                _pool.start()
+                _pool_pid = pid
+    return _pool
+
+def notify_job_workers():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.notify()
@@ -0,0 +1,241 @@
+# app/utils/log.py
+import os
+import re
+import sys
+import copy
+import json
+import uuid
+import queue
+import atexit
+import random
+import hashlib
+import logging
+import threading
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request, has_request_context
+from app.config import Config
+
+# --------------------------
+# Structured, non-blocking logging
+# --------------------------
+# Everything under the "app" logger (module loggers via
+# logging.getLogger(__name__), and Flask's app.logger) goes through a
+# bounded queue to a listener thread that formats and writes the lines, so
+# a request thread only pays for building the record. Lines are JSON
+# objects carrying the request id and the record's `extra` fields; long
+# field values are truncated and tagged with a hash. DEBUG records can be
+# sampled. When the queue is full, records are dropped and counted rather
+# than blocking the request.
+
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# --------------------------
+# Field helpers
+# --------------------------
+def digest(value):
+    return hashlib.sha256(value.encode('utf-8', 'replace')).hexdigest()[:16]
+
+def summarize_text(text):
+    """Length and hash of user text, logged instead of the text itself"""
+    text = text or ''
+    return {"chars": len(text), "sha256": digest(text)}
+
+def summarize_payload(payload):
+    """Copy of a TTS payload with its text replaced by summarize_text"""
+    return {key: summarize_text(value) if key == 'text' else value for key, value in (payload or {}).items()}
+
+def _compact(value):
+    """JSON-safe value with long strings truncated, keeping a hash of the whole"""
+    limit = Config.LOG_MAX_FIELD_CHARS
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if not isinstance(value, str):
+        try:
+            value = json.loads(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            value = str(value)
+        if not isinstance(value, str):
+            if len(json.dumps(value)) <= limit:
+                return value
+            value = json.dumps(value)
+    if len(value) <= limit:
+        return value
+    return {"truncated": value[:limit], "chars": len(value), "sha256": digest(value)}
+
+def _fields(record):
+    return {key: _compact(value) for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and not key.startswith('_')}
+
+# --------------------------
+# Formatters (run on the listener thread)
+# --------------------------
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, 'request_id', None),
+            "pid": record.process,
+        }
+        line.update(_fields(record))
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for development (LOG_FORMAT=text)"""
+    def format(self, record):
+        fields = ' '.join(f"{key}={json.dumps(value, default=str)}" for key, value in _fields(record).items())
+        line = (f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S.%f')[:-3]} {record.levelname:7} "
+                f"{record.name} [{getattr(record, 'request_id', None) or '-'}] {record.getMessage()}")
+        if fields:
+            line = f"{line} {fields}"
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
+
+# --------------------------
+# Filters (run on the logging thread, before the queue)
+# --------------------------
+def current_request_id():
+    request_id = request_id_var.get()
+    if request_id is None and has_request_context():
+        request_id = g.get('request_id')  # Streamed bodies outlive the before_request context
+    return request_id
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+class _DebugSampler(logging.Filter):
+    """Let through LOG_DEBUG_SAMPLE_RATE of DEBUG records"""
+    def filter(self, record):
+        rate = Config.LOG_DEBUG_SAMPLE_RATE
+        return record.levelno > logging.DEBUG or rate >= 1 or random.random() < rate
+
+# --------------------------
+# Queue handler
+# --------------------------
+class AsyncHandler(QueueHandler):
+    """
+    QueueHandler whose listener thread is started per process on first
+    use, since threads do not survive a gunicorn fork.
+    """
+    def __init__(self, target, maxsize):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            atexit.register(self._listener.stop)  # Flush what is queued on shutdown
+            self._pid = pid
+
+    def prepare(self, record):
+        # Keep exc_info and extra fields: formatting happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_handler = None
+_handler_lock = threading.Lock()
+
+def _parse_levels(spec):
+    """'app.routes=DEBUG,app.utils.storage=WARNING' -> {logger: level}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure():
+    """Install the queue handler on the "app" logger once per interpreter"""
+    global _handler
+    with _handler_lock:
+        if _handler is not None:
+            return _handler
+        target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(TextFormatter() if Config.LOG_FORMAT == 'text' else JsonFormatter())
+        _handler = AsyncHandler(target, Config.LOG_QUEUE_SIZE)
+        _handler.addFilter(_ContextFilter())
+        _handler.addFilter(_DebugSampler())
+
+        root = logging.getLogger('app')
+        root.setLevel(Config.LOG_LEVEL.upper())
+        root.addHandler(_handler)
+        root.propagate = False
+        for name, level in _parse_levels(Config.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+        return _handler
+
+def get_stats():
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "level": Config.LOG_LEVEL.upper(),
+    }
+
+# --------------------------
+# Request ids
+# --------------------------
+def with_request_id(func):
+    """Wrap func so pool threads running it log the caller's request id"""
+    request_id = current_request_id()
+
+    def run(*args, **kwargs):
+        token = request_id_var.set(request_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            request_id_var.reset(token)
+    return run
+
+def _assign_request_id():
+    incoming = request.headers.get(Config.REQUEST_ID_HEADER, '')
+    g.request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+    request_id_var.set(g.request_id)
+
+def _echo_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers[Config.REQUEST_ID_HEADER] = request_id
+    return response
+
+def _clear_request_id(exc):
+    request_id_var.set(None)  # Worker threads are reused for later requests
+
+def init_app(app):
+    """Configure logging and tag every request with an id (echoed in the response)"""
+    configure()
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
+    app.teardown_request(_clear_request_id)
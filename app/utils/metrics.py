@@ -0,0 +1,171 @@
+# app/utils/metrics.py
+import time
+from flask import request, g, Response, jsonify
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST, multiprocess
+)
+from sqlalchemy import event
+from app.config import Config
+
+# --------------------------
+# Prometheus metrics
+# --------------------------
+# Every request is counted and timed per blueprint endpoint; generation
+# stages, backend errors and refused calls, circuit breaker states, DB pool
+# usage and bytes of audio served are recorded where they happen.
+# GET /metrics exports them in the Prometheus text format. Under gunicorn set PROMETHEUS_MULTIPROC_DIR (an empty
+# directory, before the workers start): prometheus_client then keeps each
+# worker's values in files there and /metrics aggregates all workers,
+# whichever one answers the scrape.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by endpoint and status',
+    ['method', 'endpoint', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time until the response is returned (streamed bodies excluded)',
+    ['method', 'endpoint'], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Requests being handled',
+    ['method', 'endpoint'], multiprocess_mode='livesum'
+)
+GENERATION_STAGE = Histogram(
+    'tts_generation_stage_seconds', 'Time spent in each stage of audio generation',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+BACKEND_ERRORS = Counter(
+    'tts_backend_errors_total', 'Failed TTS backend calls by HTTP status or exception',
+    ['operation', 'reason']
+)
+BACKEND_REJECTED = Counter(
+    'tts_backend_rejected_total', 'Backend calls refused without being sent (circuit_open or bulkhead_full)',
+    ['operation', 'reason']
+)
+BACKEND_IN_FLIGHT = Gauge('tts_backend_in_flight', 'Backend calls in flight', multiprocess_mode='livesum')
+CIRCUIT_STATE = Gauge(
+    'tts_circuit_state', 'Backend circuit breaker state: 0 closed, 1 half open, 2 open (worst worker)',
+    ['operation'], multiprocess_mode='livemax'
+)
+DB_POOL_SIZE = Gauge('db_pool_size', 'Connections the pool keeps open', multiprocess_mode='livesum')
+DB_POOL_OPEN = Gauge('db_pool_connections_open', 'Open database connections', multiprocess_mode='livesum')
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_connections_checked_out', 'Database connections in use by a request or thread',
+    multiprocess_mode='livesum'
+)
+AUDIO_BYTES_SERVED = Counter(
+    'audio_bytes_served_total', 'Audio bytes sent by stream/download, by who delivered them',
+    ['endpoint', 'delivery', 'format']
+)
+
+# --------------------------
+# Recording helpers
+# --------------------------
+def stage(name):
+    """with metrics.stage('quota_check'): ... times one generation stage"""
+    return GENERATION_STAGE.labels(stage=name).time()
+
+def backend_error(operation, reason):
+    BACKEND_ERRORS.labels(operation=operation, reason=reason).inc()
+
+def backend_rejected(operation, reason):
+    BACKEND_REJECTED.labels(operation=operation, reason=reason).inc()
+
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+def circuit_state(operation, state):
+    CIRCUIT_STATE.labels(operation=operation).set(CIRCUIT_STATES[state])
+
+def _counting(body, counter):
+    try:
+        for chunk in body:
+            counter.inc(len(chunk))
+            yield chunk
+    finally:
+        close = getattr(body, 'close', None)
+        if close:
+            close()
+
+def observe_audio_response(response, endpoint, fmt, size):
+    """
+    Count the audio bytes behind a send_audio_file response. Bytes the app
+    streams are counted as they are sent; files handed to the proxy or
+    redirected to the object store count at their full size.
+    """
+    if response.status_code in (200, 206):
+        offloaded = 'X-Accel-Redirect' in response.headers or 'X-Sendfile' in response.headers
+        delivery = 'proxy' if offloaded else 'app'
+    elif response.status_code in (302, 303, 307):
+        delivery = 'redirect'
+    else:
+        return response  # 304/416 send no audio
+
+    counter = AUDIO_BYTES_SERVED.labels(endpoint=endpoint, delivery=delivery, format=fmt)
+    if delivery == 'app':
+        response.response = _counting(response.response, counter)
+    else:
+        counter.inc(size)
+    return response
+
+def instrument_engine(engine):
+    """Track pool usage of a SQLAlchemy engine through its pool events"""
+    def on_connect(*args):
+        DB_POOL_OPEN.inc()
+        # Set from each worker's first connection, pools are per process
+        size = getattr(engine.pool, 'size', None)
+        if callable(size):
+            DB_POOL_SIZE.set(size())
+
+    event.listen(engine, 'connect', on_connect)
+    event.listen(engine, 'close', lambda *args: DB_POOL_OPEN.dec())
+    event.listen(engine, 'close_detached', lambda *args: DB_POOL_OPEN.dec())
+    event.listen(engine, 'checkout', lambda *args: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, 'checkin', lambda *args: DB_POOL_CHECKED_OUT.dec())
+
+# --------------------------
+# Flask integration
+# --------------------------
+def _labels():
+    return request.method, request.endpoint or 'unmatched'
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+    g._metrics_labels = _labels()
+    HTTP_IN_FLIGHT.labels(*g._metrics_labels).inc()
+
+def _after_request(response):
+    g._metrics_status = response.status_code
+    return response
+
+def _teardown_request(exc):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return
+    method, endpoint = g.pop('_metrics_labels')
+    status = g.pop('_metrics_status', 500)
+    HTTP_IN_FLIGHT.labels(method, endpoint).dec()
+    HTTP_LATENCY.labels(method, endpoint).observe(time.perf_counter() - started)
+    HTTP_REQUESTS.labels(method, endpoint, str(status)).inc()
+
+def render():
+    """All metrics in the Prometheus text format, summed over workers in multiprocess mode"""
+    if Config.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=Config.PROMETHEUS_MULTIPROC_DIR)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+def _metrics_view():
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {Config.METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(render(), content_type=CONTENT_TYPE_LATEST)
+
+def init_app(app):
+    """Time every request and serve GET /metrics; register before other request hooks"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', _metrics_view, methods=['GET'])
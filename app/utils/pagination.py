@@ -0,0 +1,58 @@
+# app/utils/pagination.py
+import json
+import base64
+from datetime import datetime
+from flask import request
+from app import db
+from app.config import Config
+
+# --------------------------
+# Keyset (cursor) pagination on (created_at, id), newest first
+# --------------------------
+# A cursor encodes the last row of the previous page, so every page is an
+# index range scan starting right after it: no OFFSET, no COUNT(*).
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps({"t": created_at.isoformat(), "id": row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Return (created_at, id) from a cursor token, or None for the first page"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {token}") from e
+
+def get_page_size(default=None):
+    """?limit=N, clamped to 1..MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', default or Config.DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(limit, Config.MAX_PAGE_SIZE))
+
+def keyset_page(query, created_col, id_col, cursor, limit, key=None):
+    """
+    Apply the cursor to query, ordered by (created_col, id_col) descending.
+    key(row) must return the row's (created_at, id); by default the row's
+    own attributes are used. Returns (rows, next_cursor).
+    """
+    if cursor:
+        created_at, row_id = cursor
+        query = query.filter(db.or_(
+            created_col < created_at,
+            db.and_(created_col == created_at, id_col < row_id)
+        ))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_created_at, last_id = key(rows[-1]) if key else (rows[-1].created_at, rows[-1].id)
+        next_cursor = encode_cursor(last_created_at, last_id)
+    return rows, next_cursor
@@ -0,0 +1,39 @@
+# app/utils/query_counter.py
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# --------------------------
+# Count SQL statements
+# --------------------------
+class QueryCounter:
+    """Statements executed on an engine by the current thread while active"""
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+_local = threading.local()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = getattr(_local, 'counter', None)
+    if counter is not None:
+        counter.statements.append(statement)
+
+@contextmanager
+def count_queries(engine):
+    """
+    with count_queries(db.engine) as counter:
+        client.get('/api/admin/plans')
+    assert counter.count <= 2
+    """
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    _local.counter = counter
+    try:
+        yield counter
+    finally:
+        _local.counter = None
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
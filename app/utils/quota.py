@@ -0,0 +1,61 @@
+# app/utils/quota.py
+from datetime import datetime
+from app import db
+from app.models.usage import Usage
+from app.utils import admin_stats
+
+# --------------------------
+# Character quota ledger
+# --------------------------
+# Every change to Usage counters is a single conditional UPDATE evaluated by
+# the database, so concurrent requests for one user can never both spend the
+# same characters (no read-modify-write in Python).
+
+def reserve(user_id, characters):
+    """
+    Take characters out of characters_remaining before calling the backend.
+    Commits immediately so the reservation is visible to other workers.
+    Returns False when the user does not have enough characters left.
+    """
+    reserved = Usage.query.filter(
+        Usage.user_id == user_id,
+        Usage.characters_remaining >= characters
+    ).update({
+        "characters_remaining": Usage.characters_remaining - characters
+    }, synchronize_session=False)
+    db.session.commit()
+    return reserved == 1
+
+def settle(user_id, reserved, charged=None):
+    """
+    Turn a reservation into usage. charged defaults to the full reservation;
+    any part that is not charged goes back to characters_remaining.
+    The caller commits, normally together with the AudioFile row.
+    """
+    charged = reserved if charged is None else charged
+    Usage.query.filter(Usage.user_id == user_id).update({
+        "characters_used": Usage.characters_used + charged,
+        "characters_remaining": Usage.characters_remaining + (reserved - charged),
+        "last_generated_at": datetime.utcnow()
+    }, synchronize_session=False)
+    admin_stats.increment(total_characters_used=charged)
+
+def refund(user_id, reserved):
+    """Give a reservation back after a failed generation, the caller commits"""
+    Usage.query.filter(Usage.user_id == user_id).update({
+        "characters_remaining": Usage.characters_remaining + reserved
+    }, synchronize_session=False)
+
+def consume(user_id, characters):
+    """Reserve and settle in one statement, for callers with nothing to roll back"""
+    consumed = Usage.query.filter(
+        Usage.user_id == user_id,
+        Usage.characters_remaining >= characters
+    ).update({
+        "characters_used": Usage.characters_used + characters,
+        "characters_remaining": Usage.characters_remaining - characters
+    }, synchronize_session=False)
+    if consumed:
+        admin_stats.increment(total_characters_used=characters)
+    db.session.commit()
+    return consumed == 1
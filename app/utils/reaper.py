@@ -0,0 +1,135 @@
+# app/utils/reaper.py
+import time
+import threading
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from app import db
+from app.config import Config
+from app.models.audio_file import AudioFile
+from app.models.generation_job import GenerationJob
+from app.utils import admin_stats
+from app.utils.storage import storage_for
+from app.utils.transcoder import delete_variants
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Expired audio reaper
+# --------------------------
+# Walks audio_files in (expire_at, id) order through the expire_at index,
+# one bounded batch at a time: files are removed in a thread pool, then the
+# batch's rows are deleted and committed. Files go before rows, so a run
+# that dies mid-batch leaves rows whose files are already gone; the next
+# run finds them again and only has the row left to delete. Rows whose file
+# could not be removed are kept and retried by the next run.
+# The in-app run is scheduled cluster wide, so one process reaps at a time.
+
+_last_report = None
+_totals = {"runs": 0, "rows": 0, "files": 0, "missing": 0, "bytes": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+def _remove_file(path):
+    """Return (status, bytes freed, error) with status 'deleted', 'missing' or 'error'"""
+    try:
+        freed = storage_for(path).delete(path)
+        variants_freed = delete_variants(path)
+    except Exception as e:
+        return 'error', 0, str(e)
+    if freed is None:
+        return 'missing', variants_freed, None
+    return 'deleted', freed + variants_freed, None
+
+def _next_batch(now, after, batch_size):
+    query = db.session.query(AudioFile.id, AudioFile.file_path, AudioFile.expire_at)\
+        .filter(AudioFile.expire_at <= now)
+    if after:
+        last_expire_at, last_id = after
+        query = query.filter(db.or_(
+            AudioFile.expire_at > last_expire_at,
+            db.and_(AudioFile.expire_at == last_expire_at, AudioFile.id > last_id)
+        ))
+    return query.order_by(AudioFile.expire_at, AudioFile.id).limit(batch_size).all()
+
+def _delete_rows(ids):
+    """Delete one batch of rows in a single transaction, returns the rows deleted"""
+    if not ids:
+        return 0
+    GenerationJob.query.filter(GenerationJob.audio_id.in_(ids))\
+        .update({"audio_id": None}, synchronize_session=False)
+    deleted = AudioFile.query.filter(AudioFile.id.in_(ids)).delete(synchronize_session=False)
+    admin_stats.increment(total_audios=-deleted)
+    db.session.commit()
+    return deleted
+
+def new_report():
+    return {"batches": 0, "rows": 0, "files": 0, "missing": 0, "bytes": 0, "errors": 0, "complete": False}
+
+def reclaim(rows, pool, report):
+    """
+    Remove the files of one batch of rows (id, file_path) in the pool, then
+    delete the rows whose file is gone. Adds to report and returns it.
+    """
+    results = list(pool.map(_remove_file, [row.file_path for row in rows]))
+    removed_ids = []
+    for row, (status, freed, error) in zip(rows, results):
+        if status == 'error':
+            report["errors"] += 1
+            logger.warning("Reaper could not delete file", extra={"file_path": row.file_path, "error": error})
+            continue
+        removed_ids.append(row.id)
+        report["files" if status == 'deleted' else "missing"] += 1
+        report["bytes"] += freed
+
+    report["rows"] += _delete_rows(removed_ids)
+    report["batches"] += 1
+    return report
+
+def reap_expired_audio(batch_size=None, max_seconds=None, threads=None):
+    """
+    Delete expired audio files and their rows until none are left or
+    max_seconds have passed. Returns a report of what was reclaimed.
+    """
+    batch_size = batch_size or Config.AUDIO_REAPER_BATCH_SIZE
+    max_seconds = Config.AUDIO_REAPER_MAX_SECONDS if max_seconds is None else max_seconds
+    threads = threads or Config.AUDIO_REAPER_DELETE_THREADS
+
+    started = time.monotonic()
+    now = datetime.utcnow()
+    report = new_report()
+    after = None
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='audio-reaper') as pool:
+        while True:
+            if max_seconds and time.monotonic() - started >= max_seconds:
+                break
+
+            batch = _next_batch(now, after, batch_size)
+            if not batch:
+                report["complete"] = True
+                break
+            after = (batch[-1].expire_at, batch[-1].id)
+
+            reclaim(batch, pool, report)
+
+            if len(batch) < batch_size:
+                report["complete"] = True
+                break
+
+    report["seconds"] = round(time.monotonic() - started, 3)
+    report["finished_at"] = datetime.utcnow().isoformat()
+    _record(report)
+    logger.info("Audio reaper pass", extra={"report": report})
+    return report
+
+def _record(report):
+    global _last_report
+    with _stats_lock:
+        _last_report = report
+        _totals["runs"] += 1
+        for key in ("rows", "files", "missing", "bytes", "errors"):
+            _totals[key] += report[key]
+
+def get_stats():
+    with _stats_lock:
+        return {"last_run": _last_report, "totals": dict(_totals)}
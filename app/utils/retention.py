@@ -0,0 +1,223 @@
+# app/utils/retention.py
+import os
+import time
+import shutil
+import threading
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from app import db
+from app.config import Config
+from app.models.audio_file import AudioFile
+from app.models.plan import Plan
+from app.models.user import User
+from app.utils import reaper
+from app.utils import synth_cache
+from app.utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Generated audio retention
+# --------------------------
+# Three limits, all evicting through reaper.reclaim():
+#  - per-plan lifetime: expire_at is set from the plan when the row is
+#    created and the reaper deletes expired rows
+#  - per-user byte budget: checked right after each generation, the user's
+#    least recently accessed files go first
+#  - disk high-water mark: a periodic check sheds synthesis cache blobs,
+#    then evicts the least recently accessed files of all users until the
+#    disk is under the low-water mark (local storage only, an object store
+#    has no disk to fill)
+
+GENERATED_FOLDER = Config.GENERATED_AUDIO_FOLDER
+
+_counters = {"budget_evictions": 0, "pressure_runs": 0, "pressure_evictions": 0, "bytes_evicted": 0}
+_counters_lock = threading.Lock()
+
+def _count(report, counter):
+    with _counters_lock:
+        _counters[counter] += report["rows"]
+        _counters["bytes_evicted"] += report["bytes"]
+
+# --------------------------
+# Plan limits
+# --------------------------
+def limits_for(user_id):
+    """(retention days, storage budget in bytes or 0 for unlimited) of the user's plan"""
+    row = db.session.query(Plan.audio_retention_days, Plan.audio_storage_bytes)\
+        .join(User, User.plan_id == Plan.id)\
+        .filter(User.id == user_id).first()
+    days = row.audio_retention_days if row and row.audio_retention_days is not None else Config.AUDIO_RETENTION_DAYS
+    budget = row.audio_storage_bytes if row and row.audio_storage_bytes is not None else Config.AUDIO_STORAGE_BYTES
+    return days, budget
+
+def expire_at_for(user_id, now=None):
+    days, _ = limits_for(user_id)
+    return (now or datetime.utcnow()) + timedelta(days=days)
+
+# --------------------------
+# Access tracking
+# --------------------------
+def touch(audio):
+    """
+    Record a stream/download. Written at most once per
+    AUDIO_ACCESS_TOUCH_SECONDS so range requests do not turn into writes.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=Config.AUDIO_ACCESS_TOUCH_SECONDS)
+    if audio.last_accessed_at and audio.last_accessed_at > cutoff:
+        return False
+    AudioFile.query.filter(
+        AudioFile.id == audio.id,
+        db.or_(AudioFile.last_accessed_at.is_(None), AudioFile.last_accessed_at <= cutoff)
+    ).update({"last_accessed_at": now}, synchronize_session=False)
+    db.session.commit()
+    return True
+
+# --------------------------
+# Per-user budget
+# --------------------------
+def enforce_user_budget(user_id, keep_ids=()):
+    """
+    Evict the user's least recently accessed files until their generated
+    audio fits the plan's budget. keep_ids (the files just generated) are
+    never evicted. Returns the eviction report, or None when within budget.
+    """
+    _, budget = limits_for(user_id)
+    if not budget:
+        return None
+    # Transcoded variants count against the budget along with the originals
+    file_bytes = db.func.coalesce(AudioFile.size, 0) + db.func.coalesce(AudioFile.variants_size, 0)
+    used = db.session.query(db.func.coalesce(db.func.sum(file_bytes), 0))\
+        .filter(AudioFile.user_id == user_id).scalar()
+    over = int(used) - budget
+    if over <= 0:
+        return None
+
+    report = reaper.new_report()
+    skipped = set()
+    with ThreadPoolExecutor(max_workers=Config.AUDIO_REAPER_DELETE_THREADS, thread_name_prefix='audio-evict') as pool:
+        while over > 0:
+            query = db.session.query(AudioFile.id, AudioFile.file_path, file_bytes.label('size'))\
+                .filter(AudioFile.user_id == user_id)
+            if keep_ids:
+                query = query.filter(AudioFile.id.notin_(list(keep_ids)))
+            if skipped:
+                query = query.filter(AudioFile.id.notin_(skipped))
+            candidates = query.order_by(AudioFile.last_accessed_at, AudioFile.id)\
+                .limit(Config.AUDIO_REAPER_BATCH_SIZE).all()
+            if not candidates:
+                break
+
+            batch, planned = [], 0
+            for row in candidates:
+                if planned >= over:
+                    break
+                batch.append(row)
+                planned += row.size or 0
+
+            errors = report["errors"]
+            reaper.reclaim(batch, pool, report)
+            if report["errors"] > errors:
+                # Files that could not be removed keep their row, do not pick them again
+                remaining = {row.id for row in batch}
+                remaining &= {row_id for (row_id,) in db.session.query(AudioFile.id).filter(AudioFile.id.in_(remaining))}
+                skipped |= remaining
+                planned -= sum(row.size or 0 for row in batch if row.id in remaining)
+            over -= planned
+
+    _count(report, "budget_evictions")
+    logger.info("Storage budget evictions", extra={"user_id": user_id, "report": report})
+    return report
+
+# --------------------------
+# Disk high-water mark
+# --------------------------
+def disk_usage():
+    os.makedirs(GENERATED_FOLDER, exist_ok=True)
+    usage = shutil.disk_usage(GENERATED_FOLDER)
+    return usage.used / usage.total if usage.total else 0.0
+
+def bytes_over_low_water():
+    """Bytes to free to get the disk under AUDIO_DISK_LOW_WATER"""
+    os.makedirs(GENERATED_FOLDER, exist_ok=True)
+    usage = shutil.disk_usage(GENERATED_FOLDER)
+    return max(0, int(usage.used - Config.AUDIO_DISK_LOW_WATER * usage.total))
+
+def relieve_disk_pressure(max_seconds=None):
+    """
+    Periodic task: above AUDIO_DISK_HIGH_WATER, shed synthesis cache blobs,
+    then evict the least recently accessed generated files in batches until
+    the disk is back under AUDIO_DISK_LOW_WATER or the runtime budget is
+    spent. A run never plans to evict more than the bytes still needed,
+    stops when a batch frees nothing (files hardlinked into the cache), and
+    leaves users' audio alone when all of it could not bring the disk under
+    the mark: the space is then held by something else.
+    """
+    if not get_storage().is_local or disk_usage() < Config.AUDIO_DISK_HIGH_WATER:
+        return None
+    max_seconds = Config.AUDIO_REAPER_MAX_SECONDS if max_seconds is None else max_seconds
+
+    started = time.monotonic()
+    report = reaper.new_report()
+
+    # Cached renderings can be synthesized again, users' files cannot
+    cache_bytes = synth_cache.stored_totals()[1]
+    report["cache_bytes"] = synth_cache.evict(max_bytes=max(0, cache_bytes - bytes_over_low_water()))
+    need = bytes_over_low_water()
+
+    file_bytes = db.func.coalesce(AudioFile.size, 0) + db.func.coalesce(AudioFile.variants_size, 0)
+    evictable = int(db.session.query(db.func.coalesce(db.func.sum(file_bytes), 0)).scalar())
+    if need > evictable:
+        logger.warning("Disk over the high-water mark by more than all generated audio, not evicting it",
+                       extra={"bytes_needed": need, "audio_bytes": evictable})
+        need = 0
+
+    skipped = set()
+    with ThreadPoolExecutor(max_workers=Config.AUDIO_REAPER_DELETE_THREADS, thread_name_prefix='audio-evict') as pool:
+        while need > 0:
+            if max_seconds and time.monotonic() - started >= max_seconds:
+                break
+            query = db.session.query(AudioFile.id, AudioFile.file_path, file_bytes.label('size'))
+            if skipped:
+                query = query.filter(AudioFile.id.notin_(skipped))
+            candidates = query.order_by(AudioFile.last_accessed_at, AudioFile.id)\
+                .limit(Config.AUDIO_REAPER_BATCH_SIZE).all()
+            if not candidates:
+                break
+
+            batch, planned = [], 0
+            for row in candidates:
+                if planned >= need:
+                    break
+                batch.append(row)
+                planned += row.size or 0
+
+            errors, freed = report["errors"], report["bytes"]
+            reaper.reclaim(batch, pool, report)
+            if report["errors"] > errors:
+                ids = [row.id for row in batch]
+                skipped |= {row_id for (row_id,) in db.session.query(AudioFile.id).filter(AudioFile.id.in_(ids))}
+            if report["bytes"] == freed:
+                break  # Nothing released, more of the same would not help either
+            need = bytes_over_low_water()
+
+    report["complete"] = bytes_over_low_water() == 0
+    report["seconds"] = round(time.monotonic() - started, 3)
+    with _counters_lock:
+        _counters["pressure_runs"] += 1
+    _count(report, "pressure_evictions")
+    logger.info("Disk high-water mark evictions", extra={"report": report, "disk_usage": round(disk_usage(), 3)})
+    return report
+
+def get_stats():
+    with _counters_lock:
+        stats = dict(_counters)
+    try:
+        stats["disk_usage"] = round(disk_usage(), 4)
+    except OSError:
+        stats["disk_usage"] = None
+    stats["high_water"] = Config.AUDIO_DISK_HIGH_WATER
+    stats["low_water"] = Config.AUDIO_DISK_LOW_WATER
+    return stats
@@ -0,0 +1,126 @@
+# app/utils/scheduler.py
+import os
+import time
+import threading
+import logging
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.config import Config
+from app.models.stats_counter import StatsCounter
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Periodic background tasks
+# --------------------------
+# Each worker process runs its own daemon thread per task, started lazily
+# from a before_request hook (like the generation job workers) so forked
+# processes do not inherit dead threads. Tasks that must run only once per
+# cluster are scheduled with cluster=True: each run is claimed with a
+# conditional UPDATE on a stats_counters row, and processes that lose the
+# claim skip that interval.
+
+TASK_MARKER = '_task:{}'  # value = unix time until which the task is claimed
+
+def claim_run(name, seconds):
+    """Claim the task's next run for `seconds` unless another process holds it"""
+    now = int(time.time())
+    marker = TASK_MARKER.format(name)
+    claimed = StatsCounter.query.filter(
+        StatsCounter.name == marker,
+        StatsCounter.value <= now
+    ).update({"value": now + seconds}, synchronize_session=False)
+    if not claimed and db.session.get(StatsCounter, marker) is None:
+        db.session.add(StatsCounter(name=marker, value=now + seconds))
+        claimed = 1
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created the row first and holds the run
+        db.session.rollback()
+        return False
+    return bool(claimed)
+
+def release_run(name, seconds):
+    """Keep the claim until the next run is due, a little early to absorb timer drift"""
+    StatsCounter.query.filter(StatsCounter.name == TASK_MARKER.format(name)).update(
+        {"value": int(time.time() + seconds * 0.9)}, synchronize_session=False
+    )
+    db.session.commit()
+
+class PeriodicTask:
+    """
+    Call func() inside an app context every interval seconds. With
+    cluster=True only the process that claims a run calls it.
+    """
+    def __init__(self, app, name, interval, func, cluster=False):
+        self.app = app
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.cluster = cluster
+        self.stopping = threading.Event()
+        self.thread = None
+        self.runs = 0
+        self.skipped = 0
+        self.last_error = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name=f"periodic-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+    def _loop(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                with self.app.app_context():
+                    if not self._run():
+                        self.skipped += 1
+                        continue
+                self.runs += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Periodic task failed", extra={"task": self.name})
+
+    def _run(self):
+        if not self.cluster:
+            self.func()
+            return True
+        if not claim_run(self.name, Config.PERIODIC_TASK_LEASE_SECONDS):
+            return False
+        try:
+            self.func()
+        finally:
+            db.session.rollback()  # Whatever func left uncommitted
+            release_run(self.name, self.interval)
+        return True
+
+_tasks = {}
+_tasks_pid = None
+_tasks_lock = threading.Lock()
+
+def schedule(app, name, interval, func, cluster=False):
+    """Start the named task once in this process; safe to call on every request"""
+    global _tasks, _tasks_pid
+    if interval <= 0:
+        return None
+    pid = os.getpid()
+    if _tasks_pid != pid or name not in _tasks:
+        with _tasks_lock:
+            if _tasks_pid != pid:
+                _tasks = {}
+                _tasks_pid = pid
+            if name not in _tasks:
+                task = PeriodicTask(app, name, interval, func, cluster)
+                task.start()
+                _tasks[name] = task
+    return _tasks[name]
+
+def get_stats():
+    return {
+        name: {"interval": task.interval, "runs": task.runs, "skipped": task.skipped, "last_error": task.last_error}
+        for name, task in _tasks.items()
+    } if _tasks_pid == os.getpid() else {}
@@ -0,0 +1,292 @@
+# app/utils/storage.py
+import os
+import glob
+import shutil
+import tempfile
+import mimetypes
+import threading
+from collections import namedtuple
+from app.config import Config
+from app.utils.file_utils import sharded_path, shard_parts, content_disposition
+
+CHUNK_SIZE = 64 * 1024
+
+# size in bytes, mtime as a unix timestamp, etag without quotes
+StorageStat = namedtuple('StorageStat', ['size', 'mtime', 'etag'])
+
+# --------------------------
+# Storage interface
+# --------------------------
+# Stored files are addressed by the path string kept in the database
+# (AudioFile.file_path, ClonedVoice.voice_file_path). Local storage uses
+# absolute filesystem paths, S3 storage uses object keys. New files go to
+# the configured backend (get_storage); existing files are read through the
+# backend their path belongs to (storage_for), so local files written
+# before switching to S3 keep working.
+
+class Storage:
+    is_local = False
+
+    def new_path(self, folder, filename, create=True):
+        """Path for a new file of a kind (Config.*_FOLDER), sharded by filename"""
+        raise NotImplementedError
+
+    def put(self, path, stream):
+        """Store a readable binary stream, returns the size written"""
+        raise NotImplementedError
+
+    def put_file(self, path, local_file):
+        """Move a finished local file into storage, returns its size"""
+        raise NotImplementedError
+
+    def open(self, path):
+        """Readable binary file object, the caller closes it"""
+        raise NotImplementedError
+
+    def iter_range(self, path, start, stop, chunk_size=CHUNK_SIZE):
+        """Yield the bytes [start, stop) of a file in chunks"""
+        raise NotImplementedError
+
+    def delete(self, path):
+        """Remove a file, returns the bytes freed or None when it did not exist"""
+        raise NotImplementedError
+
+    def stat(self, path):
+        """StorageStat of a file, or None when it does not exist"""
+        raise NotImplementedError
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def list(self, prefix):
+        """Paths of the stored files whose path starts with prefix"""
+        raise NotImplementedError
+
+    def presign(self, path, expires=None, download_name=None, mimetype=None):
+        """Time-limited URL clients can fetch the file from directly, None if unsupported"""
+        return None
+
+    def local_path(self, path):
+        """Filesystem path of a stored file, None for remote backends"""
+        return None
+
+# --------------------------
+# Local disk
+# --------------------------
+class LocalStorage(Storage):
+    is_local = True
+
+    def new_path(self, folder, filename, create=True):
+        return sharded_path(folder, filename, create=create)
+
+    def put(self, path, stream):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(stream, f, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.path.getsize(path)
+
+    def put_file(self, path, local_file):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(local_file, path)
+        return os.path.getsize(path)
+
+    def open(self, path):
+        return open(path, 'rb')
+
+    def iter_range(self, path, start, stop, chunk_size=CHUNK_SIZE):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, path):
+        try:
+            st = os.stat(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        # A hardlink into the synthesis cache frees nothing until the blob goes too
+        return st.st_size if st.st_nlink <= 1 else 0
+
+    def stat(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # Strong ETag from size and mtime; stored files are never rewritten in place
+        return StorageStat(st.st_size, st.st_mtime, f"{st.st_size:x}-{st.st_mtime_ns:x}")
+
+    def list(self, prefix):
+        return glob.glob(glob.escape(prefix) + '*')
+
+    def local_path(self, path):
+        return path
+
+# --------------------------
+# S3-compatible object storage (AWS S3, MinIO, ...)
+# --------------------------
+class _CountingReader:
+    """Wraps a stream to count the bytes an upload consumed"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+
+    def read(self, n=-1):
+        data = self.stream.read(n)
+        self.size += len(data)
+        return data
+
+class S3Storage(Storage):
+    def __init__(self, bucket, endpoint_url=None, public_endpoint_url=None, region=None,
+                 access_key=None, secret_key=None, prefix=''):
+        try:
+            import boto3
+            from botocore.config import Config as BotoConfig
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3: pip install boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.ClientError = ClientError
+        session = boto3.session.Session(
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region
+        )
+        boto_config = BotoConfig(
+            s3={'addressing_style': 'path'},  # MinIO and most S3-compatible servers
+            retries={'max_attempts': 3, 'mode': 'standard'},
+            max_pool_connections=Config.STORAGE_S3_POOL_SIZE
+        )
+        self.client = session.client('s3', endpoint_url=endpoint_url, config=boto_config)
+        # Presigned URLs must use a host clients can reach, which may differ
+        # from the one the app talks to (e.g. an internal MinIO address)
+        self.presign_client = session.client('s3', endpoint_url=public_endpoint_url, config=boto_config) \
+            if public_endpoint_url else self.client
+
+    def new_path(self, folder, filename, create=True):
+        kind = os.path.relpath(os.path.abspath(folder), Config.UPLOAD_FOLDER)
+        if kind.startswith('..'):
+            kind = os.path.basename(os.path.normpath(folder))
+        parts = [self.prefix] if self.prefix else []
+        if kind != '.':
+            parts.extend(kind.split(os.sep))
+        return '/'.join(parts + shard_parts(filename) + [filename])
+
+    def _extra_args(self, path):
+        mimetype = mimetypes.guess_type(path)[0]
+        return {'ContentType': mimetype} if mimetype else {}
+
+    def put(self, path, stream):
+        reader = _CountingReader(stream)
+        self.client.upload_fileobj(reader, self.bucket, path, ExtraArgs=self._extra_args(path))
+        return reader.size
+
+    def put_file(self, path, local_file):
+        size = os.path.getsize(local_file)
+        self.client.upload_file(local_file, self.bucket, path, ExtraArgs=self._extra_args(path))
+        os.remove(local_file)
+        return size
+
+    def open(self, path):
+        return self.client.get_object(Bucket=self.bucket, Key=path)['Body']
+
+    def iter_range(self, path, start, stop, chunk_size=CHUNK_SIZE):
+        if stop <= start:
+            return
+        body = self.client.get_object(Bucket=self.bucket, Key=path, Range=f"bytes={start}-{stop - 1}")['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def _missing(self, error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def delete(self, path):
+        st = self.stat(path)
+        if st is None:
+            return None
+        self.client.delete_object(Bucket=self.bucket, Key=path)
+        return st.size
+
+    def stat(self, path):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=path)
+        except self.ClientError as e:
+            if self._missing(e):
+                return None
+            raise
+        return StorageStat(head['ContentLength'], head['LastModified'].timestamp(), head['ETag'].strip('"'))
+
+    def list(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        return [
+            item['Key']
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix)
+            for item in page.get('Contents', [])
+        ]
+
+    def presign(self, path, expires=None, download_name=None, mimetype=None):
+        params = {'Bucket': self.bucket, 'Key': path}
+        if download_name:
+            params['ResponseContentDisposition'] = content_disposition(download_name)
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        return self.presign_client.generate_presigned_url(
+            'get_object', Params=params, ExpiresIn=expires or Config.STORAGE_PRESIGN_EXPIRES
+        )
+
+# --------------------------
+# Backend selection (one instance per process)
+# --------------------------
+_local = LocalStorage()
+_storage = None
+_storage_pid = None
+_storage_lock = threading.Lock()
+
+def _create_storage():
+    backend = Config.STORAGE_BACKEND
+    if backend == 'local':
+        return _local
+    if backend == 's3':
+        return S3Storage(
+            bucket=Config.STORAGE_S3_BUCKET,
+            endpoint_url=Config.STORAGE_S3_ENDPOINT_URL,
+            public_endpoint_url=Config.STORAGE_S3_PUBLIC_ENDPOINT_URL,
+            region=Config.STORAGE_S3_REGION,
+            access_key=Config.STORAGE_S3_ACCESS_KEY,
+            secret_key=Config.STORAGE_S3_SECRET_KEY,
+            prefix=Config.STORAGE_S3_PREFIX
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+def get_storage():
+    """The backend new files are written to"""
+    global _storage, _storage_pid
+    pid = os.getpid()
+    if _storage is None or _storage_pid != pid:
+        with _storage_lock:
+            if _storage is None or _storage_pid != pid:
+                _storage = _create_storage()
+                _storage_pid = pid
+    return _storage
+
+def storage_for(path):
+    """The backend a stored path belongs to: absolute paths are local files"""
+    if os.path.isabs(path):
+        return _local
+    return get_storage()
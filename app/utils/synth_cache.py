@@ -0,0 +1,296 @@
+# app/utils/synth_cache.py
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.config import Config
+from app.models.stats_counter import StatsCounter
+from app.models.synth_cache_entry import SynthCacheEntry
+from app.utils import admin_stats
+from app.utils.file_utils import sharded_path
+from app.utils.storage import get_storage, storage_for
+
+CACHE_FOLDER = Config.SYNTH_CACHE_FOLDER
+GENERATED_FOLDER = Config.GENERATED_AUDIO_FOLDER
+
+# Only these payload fields influence the rendered audio
+KEY_FIELDS = ('text', 'language', 'speaker_id', 'src_lang', 'tgt_lang')
+
+# Running totals in stats_counters, adjusted in the same transaction as the
+# entries they count, so the request path never aggregates the table
+ENTRIES_COUNTER = 'synth_cache_entries'
+BYTES_COUNTER = 'synth_cache_bytes'
+
+# --------------------------
+# Counters (per process)
+# --------------------------
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_counters_lock = threading.Lock()
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+# --------------------------
+# Cache key
+# --------------------------
+def normalize_payload(tts_payload):
+    """Canonical form of a payload: NFC text with collapsed whitespace, lower-case language codes"""
+    normalized = {}
+    for field in KEY_FIELDS:
+        value = tts_payload.get(field)
+        if value is None or value == '':
+            continue
+        value = unicodedata.normalize('NFC', str(value))
+        if field == 'text':
+            value = re.sub(r'\s+', ' ', value).strip()
+        elif field != 'speaker_id':
+            value = value.strip().lower()
+        normalized[field] = value
+    return normalized
+
+def cache_key(tts_payload):
+    canonical = json.dumps(normalize_payload(tts_payload), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _link_or_copy(src, dst):
+    """Hardlink dst to src so both share one inode; copy across filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+# --------------------------
+# Lookup / store
+# --------------------------
+def _lookup(tts_payload):
+    """Live cache entry for tts_payload, or None (counted as a miss)"""
+    entry = SynthCacheEntry.query.filter_by(cache_key=cache_key(tts_payload)).first()
+    if not entry:
+        _count("misses")
+        return None
+
+    ttl = timedelta(seconds=Config.SYNTH_CACHE_TTL_SECONDS)
+    if entry.created_at and entry.created_at < datetime.utcnow() - ttl:
+        _remove_entries([entry])
+        db.session.commit()
+        _count("misses")
+        return None
+    return entry
+
+def _link_blob(entry, file_path):
+    """Hardlink the entry's blob to file_path and count the hit; False if the blob is gone"""
+    try:
+        _link_or_copy(entry.blob_path, file_path)
+    except FileNotFoundError:
+        # Blob evicted by another process between query and link
+        _count("misses")
+        return False
+
+    entry.hits += 1
+    entry.last_accessed_at = datetime.utcnow()
+    db.session.commit()
+    _count("hits")
+    return True
+
+def materialize(user_id, tts_payload):
+    """
+    On a hit, hardlink the cached blob into GENERATED_FOLDER and return the
+    new path for the user's AudioFile. Returns None on a miss.
+    The cache shares blobs through hardlinks, so it only runs on local storage.
+    """
+    if not Config.SYNTH_CACHE_ENABLED or not get_storage().is_local:
+        return None
+
+    entry = _lookup(tts_payload)
+    if not entry:
+        return None
+
+    ext = os.path.splitext(entry.blob_path)[1]
+    file_path = sharded_path(GENERATED_FOLDER, f"{user_id}_{datetime.utcnow().timestamp()}_{entry.blob_hash[:16]}{ext}")
+    return file_path if _link_blob(entry, file_path) else None
+
+def fetch(tts_payload, file_stem):
+    """
+    On a hit, link the cached blob to a local working file (file_stem plus
+    the blob's extension) and return its path. Returns None on a miss.
+    """
+    if not Config.SYNTH_CACHE_ENABLED:
+        return None
+
+    entry = _lookup(tts_payload)
+    if not entry:
+        return None
+
+    file_path = file_stem + os.path.splitext(entry.blob_path)[1]
+    return file_path if _link_blob(entry, file_path) else None
+
+def store(tts_payload, file_path):
+    """Add a freshly synthesized local file to the cache, then enforce the size/TTL limits"""
+    if not Config.SYNTH_CACHE_ENABLED or not storage_for(file_path).is_local:
+        return None
+
+    key = cache_key(tts_payload)
+    if SynthCacheEntry.query.filter_by(cache_key=key).first():
+        return None
+
+    blob_hash = _file_sha256(file_path)
+    ext = os.path.splitext(file_path)[1] or '.wav'
+    blob_path = sharded_path(CACHE_FOLDER, f"{blob_hash}{ext}")
+    if not os.path.exists(blob_path):
+        try:
+            _link_or_copy(file_path, blob_path)
+        except FileExistsError:
+            pass  # Same content stored concurrently
+
+    entry = SynthCacheEntry(
+        cache_key=key,
+        blob_hash=blob_hash,
+        blob_path=blob_path,
+        speaker_id=tts_payload.get('speaker_id'),
+        size=os.path.getsize(blob_path)
+    )
+    db.session.add(entry)
+    try:
+        db.session.flush()
+        new_blob = not _blob_referenced(blob_hash, blob_path, exclude_id=entry.id)
+        admin_stats.increment(**{ENTRIES_COUNTER: 1, BYTES_COUNTER: entry.size if new_blob else 0})
+        db.session.commit()
+    except IntegrityError:
+        # Another worker cached the same payload first
+        db.session.rollback()
+        return None
+
+    _count("stores")
+    if stored_totals()[1] > Config.SYNTH_CACHE_MAX_BYTES:
+        evict()
+    return entry
+
+# --------------------------
+# Eviction
+# --------------------------
+def _blob_referenced(blob_hash, blob_path, exclude_id=None):
+    """True when an entry (other than exclude_id) still uses the blob, looked up through the blob_hash index"""
+    query = SynthCacheEntry.query.filter_by(blob_hash=blob_hash, blob_path=blob_path)
+    if exclude_id is not None:
+        query = query.filter(SynthCacheEntry.id != exclude_id)
+    return query.first() is not None
+
+def _remove_entries(entries):
+    """
+    Delete entries and any blob no longer referenced by a remaining entry,
+    adjusting the running totals. The caller commits; returns the bytes freed.
+    """
+    blobs = {}
+    for entry in entries:
+        blobs[entry.blob_path] = (entry.blob_hash, entry.size)
+        db.session.delete(entry)
+    db.session.flush()
+
+    freed = 0
+    for blob_path, (blob_hash, size) in blobs.items():
+        if _blob_referenced(blob_hash, blob_path):
+            continue
+        freed += size
+        try:
+            os.remove(blob_path)
+        except FileNotFoundError:
+            pass
+    admin_stats.increment(**{ENTRIES_COUNTER: -len(entries), BYTES_COUNTER: -freed})
+    _count("evictions", len(entries))
+    return freed
+
+def _totals():
+    """(entries, bytes on disk) counted from the table; entries sharing a deduplicated blob count it once"""
+    blobs = db.session.query(
+        db.func.count(SynthCacheEntry.id).label('entries'),
+        db.func.max(SynthCacheEntry.size).label('size')
+    ).group_by(SynthCacheEntry.blob_path).subquery()
+    entries, size = db.session.query(db.func.sum(blobs.c.entries), db.func.sum(blobs.c.size)).one()
+    return int(entries or 0), int(size or 0)
+
+def recount():
+    """
+    Rebuild the running totals from the table. Runs when they do not exist
+    yet and periodically, to correct drift from concurrent stores of the
+    same blob.
+    """
+    values = dict(zip((ENTRIES_COUNTER, BYTES_COUNTER), _totals()))
+    now = datetime.utcnow()
+    existing = {row.name: row for row in StatsCounter.query.filter(StatsCounter.name.in_(list(values))).all()}
+    for name, value in values.items():
+        row = existing.get(name)
+        if row is None:
+            db.session.add(StatsCounter(name=name, value=value, updated_at=now))
+        else:
+            row.value = value
+            row.updated_at = now
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created the rows first, its figures are as good as ours
+        db.session.rollback()
+    return values[ENTRIES_COUNTER], values[BYTES_COUNTER]
+
+def stored_totals(rebuild=True):
+    """(entries, bytes) from the running totals, rebuilt first when missing unless rebuild=False"""
+    values = dict(db.session.query(StatsCounter.name, StatsCounter.value)
+                  .filter(StatsCounter.name.in_((ENTRIES_COUNTER, BYTES_COUNTER))).all())
+    if len(values) < 2:
+        return recount() if rebuild else (0, 0)
+    return int(values[ENTRIES_COUNTER]), int(values[BYTES_COUNTER])
+
+def evict(max_bytes=None):
+    """
+    Drop entries past their TTL, then least recently used ones until under
+    max_bytes (SYNTH_CACHE_MAX_BYTES by default). Returns the bytes dropped.
+    """
+    max_bytes = Config.SYNTH_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    before = total = stored_totals()[1]
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.SYNTH_CACHE_TTL_SECONDS)
+    expired = SynthCacheEntry.query.filter(SynthCacheEntry.created_at < cutoff).all()
+    if expired:
+        total -= _remove_entries(expired)
+
+    while total > max_bytes:
+        victims = SynthCacheEntry.query.order_by(SynthCacheEntry.last_accessed_at).limit(20).all()
+        if not victims:
+            break
+        for entry in victims:
+            total -= _remove_entries([entry])
+            if total <= max_bytes:
+                break
+    db.session.commit()
+    return before - total
+
+def invalidate_speaker(speaker_id):
+    """Forget every rendering of a cloned voice whose sample changed or was deleted"""
+    if not speaker_id:
+        return
+    entries = SynthCacheEntry.query.filter_by(speaker_id=speaker_id).all()
+    if entries:
+        _remove_entries(entries)
+        db.session.commit()
+
+def get_stats():
+    with _counters_lock:
+        stats = dict(_counters)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["entries"], stats["bytes"] = stored_totals(rebuild=False)
+    stats["max_bytes"] = Config.SYNTH_CACHE_MAX_BYTES
+    stats["enabled"] = Config.SYNTH_CACHE_ENABLED
+    return stats
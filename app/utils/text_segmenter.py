@@ -0,0 +1,69 @@
+# app/utils/text_segmenter.py
+import re
+from app.config import Config
+
+# --------------------------
+# Sentence-aware text splitting
+# --------------------------
+# Long texts are rendered as several backend calls. Chunks end on sentence
+# boundaries where possible so each one is spoken with natural prosody;
+# a sentence longer than a chunk is cut at clause punctuation, then between
+# words, and only as a last resort in the middle of a word.
+
+# A sentence runs up to terminal punctuation (plus closing quotes/brackets)
+# followed by whitespace, a CJK full stop, a blank line, or the end of text
+_SENTENCE = re.compile(r'.+?(?:[.!?…]+["\'”’)\]]*(?=\s|$)|[。！？]+|\n\s*\n|$)', re.S)
+_CLAUSE_BREAK = re.compile(r'(?<=[,;:、，；：])\s*')
+
+def split_sentences(text):
+    sentences = []
+    for match in _SENTENCE.finditer(text):
+        sentence = ' '.join(match.group().split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+def _pack(pieces, max_chars, first_max_chars=None, separator=' '):
+    """Greedily join pieces into strings of at most max_chars (first_max_chars for the first one)"""
+    packed, current = [], ''
+    for piece in pieces:
+        candidate = f"{current}{separator}{piece}" if current else piece
+        limit = first_max_chars if first_max_chars and not packed else max_chars
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            packed.append(current)
+        current = piece
+    if current:
+        packed.append(current)
+    return packed
+
+def _split_long(sentence, max_chars):
+    """Pieces of at most max_chars from a sentence that does not fit in one chunk"""
+    pieces = []
+    for clause in _CLAUSE_BREAK.split(sentence):
+        if len(clause) <= max_chars:
+            pieces.append(clause)
+            continue
+        for word in clause.split():
+            if len(word) <= max_chars:
+                pieces.append(word)
+            else:
+                pieces.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+    return _pack([piece for piece in pieces if piece], max_chars)
+
+def split_text(text, max_chars=None, first_max_chars=None):
+    """
+    Split text into chunks of at most max_chars characters, on sentence
+    boundaries where possible. A smaller first_max_chars gets a short first
+    chunk (still whole sentences) for streaming, where it is heard first.
+    """
+    max_chars = max_chars or Config.TTS_CHUNK_MAX_CHARS
+    pieces = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_split_long(sentence, max_chars))
+    return _pack(pieces, max_chars, first_max_chars)
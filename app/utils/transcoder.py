@@ -0,0 +1,200 @@
+# app/utils/transcoder.py
+import os
+import re
+import shutil
+import tempfile
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from app import db
+from app.config import Config
+from app.models.audio_file import AudioFile
+from app.utils.storage import storage_for
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Compressed audio variants
+# --------------------------
+# Generated audio is stored as the backend returns it (usually WAV).
+# ?format=mp3|ogg|opus on stream/download serves a transcoded variant that
+# is stored next to the original as <name>.<bitrate>.<ext> and reused by
+# later requests. ffmpeg runs in a process pool so transcoding does not
+# hold the GIL of the serving threads. AudioFile.variants_size tracks the
+# variant bytes of each file; the reaper removes variants with the original.
+
+# format -> (pydub/ffmpeg format, codec, extension, mimetype)
+FORMATS = {
+    'mp3': ('mp3', 'libmp3lame', 'mp3', 'audio/mpeg'),
+    'ogg': ('ogg', 'libvorbis', 'ogg', 'audio/ogg'),
+    'opus': ('opus', 'libopus', 'opus', 'audio/ogg; codecs=opus'),
+}
+_VARIANT_SUFFIX = re.compile(r'\.(\d+k)\.(' + '|'.join(spec[2] for spec in FORMATS.values()) + r')$')
+
+class TranscodeError(Exception):
+    pass
+
+_counters = {"transcodes": 0, "hits": 0, "failures": 0, "bytes_written": 0}
+_counters_lock = threading.Lock()
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+# --------------------------
+# Request parameters
+# --------------------------
+def parse_format(args):
+    """
+    (format, bitrate) from request args, or None to serve the original.
+    Raises ValueError for an unsupported format or bitrate.
+    """
+    fmt = (args.get('format') or '').lower().strip()
+    if not fmt or fmt in ('original', 'wav'):
+        return None
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt} (use one of {', '.join(['wav'] + list(FORMATS))})")
+    bitrate = (args.get('bitrate') or Config.AUDIO_DEFAULT_BITRATE).lower().strip()
+    if bitrate not in Config.AUDIO_BITRATES:
+        raise ValueError(f"Unsupported bitrate: {bitrate} (use one of {', '.join(Config.AUDIO_BITRATES)})")
+    return fmt, bitrate
+
+def variant_path(path, fmt, bitrate):
+    return f"{os.path.splitext(path)[0]}.{bitrate}.{FORMATS[fmt][2]}"
+
+def mimetype_for(fmt):
+    return FORMATS[fmt][3]
+
+# --------------------------
+# Worker processes
+# --------------------------
+def _init_worker(ffmpeg_binary):
+    if ffmpeg_binary:
+        from pydub import AudioSegment
+        AudioSegment.converter = ffmpeg_binary
+
+def _transcode(source, target, fmt, codec, bitrate):
+    """Runs in a pool process: decode source and write target"""
+    from pydub import AudioSegment
+    AudioSegment.from_file(source).export(target, format=fmt, codec=codec, bitrate=bitrate)
+    return os.path.getsize(target)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """This process's transcoding pool; spawned children do not inherit threads or sockets"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(1, Config.TRANSCODE_WORKERS),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(Config.FFMPEG_BINARY,)
+                )
+                _pool_pid = pid
+    return _pool
+
+def _discard_pool(pool):
+    """Drop a pool whose worker died so the next transcode starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# --------------------------
+# Variants
+# --------------------------
+_inflight = {}  # variant path -> Future, so concurrent requests share one transcode
+_inflight_lock = threading.Lock()
+
+def _transcode_to_storage(storage, path, target, fmt, bitrate):
+    os.makedirs(Config.TTS_WORK_FOLDER, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='transcode_', dir=Config.TTS_WORK_FOLDER)
+    try:
+        source = storage.local_path(path)
+        if not source:
+            source = os.path.join(work_dir, 'source' + os.path.splitext(path)[1])
+            with storage.open(path) as f, open(source, 'wb') as out:
+                shutil.copyfileobj(f, out)
+
+        output = os.path.join(work_dir, os.path.basename(target))
+        ffmpeg_format, codec, _, _ = FORMATS[fmt]
+        pool = _get_pool()
+        try:
+            pool.submit(_transcode, source, output, ffmpeg_format, codec, bitrate)\
+                .result(timeout=Config.TRANSCODE_TIMEOUT)
+        except BrokenProcessPool as e:
+            _discard_pool(pool)
+            raise TranscodeError(f"Could not transcode to {fmt}: {str(e)}")
+        except Exception as e:
+            raise TranscodeError(f"Could not transcode to {fmt}: {str(e)}")
+        return storage.put_file(target, output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def get_variant(audio, fmt, bitrate):
+    """
+    Path and StorageStat of audio's variant in fmt/bitrate, transcoding it
+    on first use. Raises TranscodeError when ffmpeg fails.
+    """
+    storage = storage_for(audio.file_path)
+    target = variant_path(audio.file_path, fmt, bitrate)
+    st = storage.stat(target)
+    if st is not None:
+        _count("hits")
+        return target, st
+
+    with _inflight_lock:
+        future = _inflight.get(target)
+        owner = future is None
+        if owner:
+            future = _inflight[target] = Future()
+    if not owner:
+        future.result(timeout=Config.TRANSCODE_TIMEOUT)
+        _count("hits")
+        return target, storage.stat(target)
+
+    try:
+        size = _transcode_to_storage(storage, audio.file_path, target, fmt, bitrate)
+        AudioFile.query.filter_by(id=audio.id).update({
+            "variants_size": db.func.coalesce(AudioFile.variants_size, 0) + size
+        }, synchronize_session=False)
+        db.session.commit()
+        future.set_result(size)
+    except Exception as e:
+        _count("failures")
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(target, None)
+
+    _count("transcodes")
+    _count("bytes_written", size)
+    logger.info("Transcoded audio", extra={"audio_id": audio.id, "format": fmt, "bitrate": bitrate, "size": size})
+    return target, storage.stat(target)
+
+def delete_variants(path):
+    """Remove every variant of a stored file, returns the bytes freed"""
+    storage = storage_for(path)
+    stem = os.path.splitext(path)[0]
+    freed = 0
+    for candidate in storage.list(stem + '.'):
+        if candidate != path and _VARIANT_SUFFIX.search(candidate[len(stem):]):
+            freed += storage.delete(candidate) or 0
+    return freed
+
+def get_stats():
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["variant_bytes"] = int(db.session.query(db.func.coalesce(db.func.sum(AudioFile.variants_size), 0)).scalar())
+    stats["workers"] = Config.TRANSCODE_WORKERS
+    return stats
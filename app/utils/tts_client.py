@@ -0,0 +1,375 @@
+# app/utils/tts_client.py
+import os
+import math
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from dotenv import load_dotenv
+from app.config import Config
+from app.utils import metrics
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpen, Bulkhead
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Only these methods are safe to replay after a connection error or 5xx
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# --------------------------
+# Connection pool counters
+# --------------------------
+class PoolStats:
+    """
+    Thread-safe counters shared by every connection pool of one client.
+    A hit is a request served on an already open keep-alive connection,
+    a miss is a request that had to open a new TCP connection.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "pool_hits": self.requests - self.misses,
+                "pool_misses": self.misses
+            }
+
+
+class TransferStats:
+    """Thread-safe counters for audio downloaded from the backend"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.failed = 0
+        self.rejected_too_large = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.last_bytes_per_sec = 0.0
+
+    def record_download(self, nbytes, seconds):
+        with self._lock:
+            self.downloads += 1
+            self.bytes += nbytes
+            self.seconds += seconds
+            self.last_bytes_per_sec = nbytes / seconds if seconds > 0 else 0.0
+
+    def record_failure(self, too_large=False):
+        with self._lock:
+            self.failed += 1
+            if too_large:
+                self.rejected_too_large += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "downloads": self.downloads,
+                "failed": self.failed,
+                "rejected_too_large": self.rejected_too_large,
+                "bytes": self.bytes,
+                "avg_bytes_per_sec": round(self.bytes / self.seconds, 1) if self.seconds > 0 else 0.0,
+                "last_bytes_per_sec": round(self.last_bytes_per_sec, 1)
+            }
+
+
+class AudioTooLargeError(Exception):
+    """Raised when a generated file exceeds TTS_DOWNLOAD_MAX_BYTES"""
+    pass
+
+
+class BackendUnavailable(requests.exceptions.RequestException):
+    """
+    A backend call refused without being sent: the operation's circuit is
+    open or every bulkhead slot is taken. Answer 503 with Retry-After.
+    """
+    def __init__(self, message, operation, reason, retry_after):
+        super().__init__(message)
+        self.operation = operation
+        self.reason = reason  # circuit_open or bulkhead_full
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def _is_backend_failure(error):
+    """Errors that say the backend is unhealthy; 4xx answers are the caller's fault"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is None or error.response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+def _counting_pool(base_cls, stats):
+    class CountingPool(base_cls):
+        def _get_conn(self, timeout=None):
+            stats.record_request()
+            return super()._get_conn(timeout)
+
+        def _new_conn(self):
+            stats.record_miss()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report hits/misses into a PoolStats"""
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats)
+        }
+
+# --------------------------
+# TTS backend client
+# --------------------------
+class TTSClient:
+    """
+    Keep-alive client for the external TTS backend at TTS_BASE_URL.
+    One instance is shared by all threads of a worker process.
+    """
+    def __init__(self, base_url=None, pool_connections=None, pool_maxsize=None,
+                 max_retries=None, backoff_factor=None, connect_timeout=None, read_timeout=None):
+        self.base_url = (base_url or os.getenv("TTS_BASE_URL") or '').rstrip('/')
+        self.connect_timeout = connect_timeout if connect_timeout is not None else Config.TTS_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout if read_timeout is not None else Config.TTS_READ_TIMEOUT
+        self.stats = PoolStats()
+        self.transfers = TransferStats()
+        self.breakers = {}
+        self._breakers_lock = threading.Lock()
+        self.bulkhead = Bulkhead(Config.TTS_MAX_IN_FLIGHT, Config.TTS_BULKHEAD_WAIT)
+
+        retry = Retry(
+            total=max_retries if max_retries is not None else Config.TTS_MAX_RETRIES,
+            backoff_factor=backoff_factor if backoff_factor is not None else Config.TTS_RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False
+        )
+        adapter = CountingHTTPAdapter(
+            self.stats,
+            pool_connections=pool_connections or Config.TTS_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or Config.TTS_POOL_MAXSIZE,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url_for(self, path):
+        """Build an absolute backend URL, leaving absolute URLs untouched"""
+        if path.startswith('http'):
+            return path
+        return f"{self.base_url}{path}"
+
+    def timeout(self, read_timeout=None):
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def request(self, method, path, read_timeout=None, operation=None, **kwargs):
+        """Send a request; failures are counted per operation for /metrics"""
+        kwargs.setdefault('timeout', self.timeout(read_timeout))
+        operation = operation or method.lower()
+        try:
+            response = self.session.request(method, self.url_for(path), **kwargs)
+        except requests.RequestException as e:
+            metrics.backend_error(operation, type(e).__name__)
+            raise
+        if response.status_code >= 400:
+            metrics.backend_error(operation, str(response.status_code))
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    # Circuit breakers and bulkhead
+    def breaker(self, operation):
+        breaker = self.breakers.get(operation)
+        if breaker is None:
+            with self._breakers_lock:
+                breaker = self.breakers.get(operation)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        operation,
+                        failure_rate=Config.TTS_BREAKER_FAILURE_RATE,
+                        window=Config.TTS_BREAKER_WINDOW,
+                        min_calls=Config.TTS_BREAKER_MIN_CALLS,
+                        open_seconds=Config.TTS_BREAKER_OPEN_SECONDS,
+                        half_open_calls=Config.TTS_BREAKER_HALF_OPEN_CALLS,
+                        on_change=self._breaker_changed
+                    )
+                    self.breakers[operation] = breaker
+        return breaker
+
+    @staticmethod
+    def _breaker_changed(breaker, previous, state):
+        metrics.circuit_state(breaker.name, state)
+        log_level = logging.WARNING if state == 'open' else logging.INFO
+        logger.log(log_level, "Backend circuit changed state",
+                   extra={"operation": breaker.name, "from_state": previous, "to_state": state})
+
+    @contextmanager
+    def guard(self, operation):
+        """
+        Run one backend operation behind its circuit breaker and the
+        process-wide bulkhead. Raises BackendUnavailable instead of calling
+        the backend when the circuit is open or no slot frees up in time.
+        """
+        breaker = self.breaker(operation)
+        try:
+            probe = breaker.acquire()
+        except CircuitOpen as e:
+            metrics.backend_rejected(operation, 'circuit_open')
+            raise BackendUnavailable(f"TTS backend unavailable ({operation} circuit open)", operation, 'circuit_open', e.retry_after)
+        if not self.bulkhead.acquire():
+            breaker.record(None, probe)
+            metrics.backend_rejected(operation, 'bulkhead_full')
+            raise BackendUnavailable("TTS backend busy, too many calls in flight", operation, 'bulkhead_full', 1)
+
+        metrics.BACKEND_IN_FLIGHT.inc()
+        failed = None
+        try:
+            yield
+            failed = False
+        except Exception as e:
+            failed = True if _is_backend_failure(e) else None
+            raise
+        finally:
+            metrics.BACKEND_IN_FLIGHT.dec()
+            self.bulkhead.release()
+            breaker.record(failed, probe)
+
+    # Backend operations
+    def synthesize(self, tts_payload):
+        """POST /translate-tts and return the decoded JSON response"""
+        with metrics.stage('synthesis'), self.guard('synthesize'):
+            response = self.post('/translate-tts', json=tts_payload, operation='synthesize')
+            response.raise_for_status()
+            return response.json()
+
+    def upload_voice(self, files, data):
+        """POST /voice/upload and return the decoded JSON response"""
+        with self.guard('upload_voice'):
+            response = self.post('/voice/upload', files=files, data=data, operation='upload_voice')
+            response.raise_for_status()
+            return response.json()
+
+    def list_voices(self):
+        """GET /voice/list, raises for error statuses and returns the response"""
+        with self.guard('list_voices'):
+            response = self.get('/voice/list', read_timeout=30, operation='list_voices')
+            response.raise_for_status()
+            return response
+
+    def download_to_file(self, audio_url, file_path, max_bytes=None, chunk_size=None):
+        """
+        Stream a generated audio file from the backend to file_path.
+        Chunks go to a temp file in the destination folder which is renamed
+        into place once complete, so readers never see a partial file.
+        Returns the number of bytes written.
+        """
+        max_bytes = max_bytes or Config.TTS_DOWNLOAD_MAX_BYTES
+        chunk_size = chunk_size or Config.TTS_DOWNLOAD_CHUNK_SIZE
+        folder = os.path.dirname(file_path)
+        os.makedirs(folder, exist_ok=True)
+
+        started = time.monotonic()
+        written = 0
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.download_', suffix='.part')
+        try:
+            with metrics.stage('download'), self.guard('download'), \
+                    self.get(audio_url, read_timeout=30, stream=True, operation='download') as response:
+                response.raise_for_status()
+                declared = response.headers.get('Content-Length')
+                if declared and declared.isdigit() and int(declared) > max_bytes:
+                    raise AudioTooLargeError(f"Generated audio is {declared} bytes, limit is {max_bytes}")
+
+                with os.fdopen(fd, 'wb') as f:
+                    fd = None
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if not chunk:
+                            continue
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise AudioTooLargeError(f"Generated audio exceeds {max_bytes} bytes")
+                        f.write(chunk)
+
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            if fd is not None:
+                os.close(fd)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.transfers.record_failure(too_large=isinstance(e, AudioTooLargeError))
+            raise
+
+        self.transfers.record_download(written, time.monotonic() - started)
+        return written
+
+    def get_stats(self):
+        stats = self.stats.snapshot()
+        stats["base_url"] = self.base_url
+        stats["downloads"] = self.transfers.snapshot()
+        stats["circuit_breakers"] = {operation: breaker.snapshot() for operation, breaker in list(self.breakers.items())}
+        stats["bulkhead"] = self.bulkhead.snapshot()
+        return stats
+
+    def close(self):
+        self.session.close()
+
+# --------------------------
+# Per-process shared client
+# --------------------------
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_tts_client():
+    """
+    Return this process's TTSClient. A new one is built after a fork so
+    gunicorn workers never share sockets inherited from the master.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = TTSClient()
+                _client_pid = pid
+    return _client
+
+def check_bulkhead():
+    """
+    Refuse to start without a backend bulkhead, and warn when
+    TTS_MAX_IN_FLIGHT does not leave a request thread free: the bulkhead
+    then never refuses a call before every thread is held by a slow backend.
+    """
+    if Config.TTS_MAX_IN_FLIGHT < 1:
+        raise RuntimeError(f"TTS_MAX_IN_FLIGHT must be at least 1, got {Config.TTS_MAX_IN_FLIGHT}")
+    if Config.TTS_MAX_IN_FLIGHT > max(1, Config.WEB_THREADS - 1):
+        logger.warning("Backend bulkhead does not leave a request thread free", extra={
+            "tts_max_in_flight": Config.TTS_MAX_IN_FLIGHT,
+            "web_threads": Config.WEB_THREADS,
+            "hint": "set WEB_THREADS to the worker's thread count and TTS_MAX_IN_FLIGHT below it"
+        })
@@ -0,0 +1,348 @@
+# app/utils/tts_pipeline.py
+import os
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from flask import current_app
+from pydub import AudioSegment
+from app import db
+from app.config import Config
+from app.models.audio_file import AudioFile
+from app.utils.tts_client import get_tts_client, AudioTooLargeError, BackendUnavailable
+from app.utils import synth_cache
+from app.utils import metrics
+from app.utils import admin_stats
+from app.utils import retention
+from app.utils import log
+from app.utils.text_segmenter import split_text
+from app.utils.storage import get_storage, storage_for
+
+GENERATED_FOLDER = Config.GENERATED_AUDIO_FOLDER
+
+logger = logging.getLogger(__name__)
+
+class SynthesisError(Exception):
+    """
+    Backend synthesis failed; status_code is the HTTP status to answer
+    with, retry_after the seconds for a Retry-After header (503 only)
+    """
+    def __init__(self, message, status_code=500, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @classmethod
+    def unavailable(cls, error):
+        """503 for a call the circuit breaker or bulkhead refused"""
+        return cls(str(error), 503, error.retry_after)
+
+# --------------------------
+# Build backend payload
+# --------------------------
+def resolve_speaker_id(voice_model):
+    """
+    Map a voice_model from the client to a backend speaker_id.
+    Default voices: "default_male_01", "default_female_01"
+    Cloned voice IDs are in format "user-XXX-YYYY"
+    """
+    if voice_model.startswith('user-') or voice_model.startswith('default_'):
+        return voice_model
+    # Fallback for legacy voice_model values like 'male' or 'female'
+    if voice_model.lower() == 'female':
+        return 'default_female_01'
+    return 'default_male_01'
+
+def build_tts_payload(data):
+    """Build the /translate-tts payload from a generate request body"""
+    tts_payload = {
+        "text": data.get('text'),
+        "language": data.get('language', 'en'),  # Tone/language for TTS
+        "speaker_id": resolve_speaker_id(data.get('voice_model', 'default_male_01'))
+    }
+
+    # Add optional language parameters if provided
+    if data.get('source_language'):
+        tts_payload["src_lang"] = data.get('source_language')
+    if data.get('target_language'):
+        tts_payload["tgt_lang"] = data.get('target_language')
+    return tts_payload
+
+# --------------------------
+# Synthesize and download
+# --------------------------
+def _request_audio(client, tts_payload):
+    """Have the backend render tts_payload, returns (remote file name, audio URL)"""
+    tts_response = client.synthesize(tts_payload)
+    logger.debug("TTS backend response", extra={"remote_path": tts_response.get('file_path'), "duration": tts_response.get('duration')})
+
+    # Get the audio file path from API response
+    remote_audio_path = tts_response.get('file_path')
+    if not remote_audio_path:
+        raise SynthesisError("No audio file path in API response")
+
+    audio_url = tts_response.get('audio_path')
+    if not audio_url:
+        raise SynthesisError("No audio path in API response")
+    return os.path.basename(remote_audio_path), audio_url
+
+def synthesize_to_file(user_id, tts_payload):
+    """
+    Call the backend for tts_payload and stream the result into
+    GENERATED_FOLDER on the configured storage. Returns the stored path.
+    Raises SynthesisError on any backend problem.
+    """
+    client = get_tts_client()
+    try:
+        audio_filename, audio_url = _request_audio(client, tts_payload)
+        local_filename = f"{user_id}_{datetime.utcnow().timestamp()}_{audio_filename}"
+        storage = get_storage()
+        file_path = storage.new_path(GENERATED_FOLDER, local_filename)
+
+        if storage.local_path(file_path):
+            size = client.download_to_file(audio_url, file_path)
+        else:
+            # Remote storage: stage on local disk, then upload the finished file
+            staging_path = os.path.join(tempfile.gettempdir(), local_filename)
+            try:
+                client.download_to_file(audio_url, staging_path)
+                size = storage.put_file(file_path, staging_path)
+            finally:
+                if os.path.exists(staging_path):
+                    os.remove(staging_path)
+        logger.info("Stored audio file", extra={"file_path": file_path, "size": size})
+        return file_path
+
+    except AudioTooLargeError as e:
+        raise SynthesisError(str(e), 502)
+    except BackendUnavailable as e:
+        raise SynthesisError.unavailable(e)
+    except requests.exceptions.RequestException as e:
+        raise SynthesisError(f"TTS API error: {str(e)}")
+
+# --------------------------
+# Long texts: chunked synthesis
+# --------------------------
+# Texts over TTS_CHUNK_THRESHOLD characters are split on sentence
+# boundaries, the chunks are rendered concurrently (each through the
+# synthesis cache, with retries) into a local working folder, and stitched
+# in order with short crossfades into a single stored file.
+
+def split_for_synthesis(text):
+    """Chunks to render separately, or None when text is rendered in one call"""
+    if len(text) <= Config.TTS_CHUNK_THRESHOLD:
+        return None
+    chunks = split_text(text)
+    return chunks if len(chunks) > 1 else None
+
+def _render_chunk(app, tts_payload, file_stem):
+    """Render one chunk to a local file named file_stem + extension, returns (path, cache_hit)"""
+    with app.app_context():
+        file_path = synth_cache.fetch(tts_payload, file_stem)
+        if file_path:
+            return file_path, True
+
+        client = get_tts_client()
+        attempts = Config.TTS_CHUNK_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                audio_filename, audio_url = _request_audio(client, tts_payload)
+                file_path = file_stem + (os.path.splitext(audio_filename)[1] or '.wav')
+                client.download_to_file(audio_url, file_path)
+                break
+            except AudioTooLargeError as e:
+                raise SynthesisError(str(e), 502)
+            except BackendUnavailable as e:
+                # An open circuit refuses the retries too, a full bulkhead may have a slot by then
+                if e.reason == 'circuit_open' or attempt == attempts:
+                    raise SynthesisError.unavailable(e)
+            except (SynthesisError, requests.exceptions.RequestException) as e:
+                if attempt == attempts:
+                    raise e if isinstance(e, SynthesisError) else SynthesisError(f"TTS API error: {str(e)}")
+                logger.warning("Chunk synthesis failed, retrying", extra={"attempt": attempt, "attempts": attempts, "error": str(e)})
+
+        try:
+            synth_cache.store(tts_payload, file_path)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Synthesis cache store failed", extra={"error": str(e)})
+        return file_path, False
+
+def render_chunks(tts_payload, chunks, work_dir):
+    """
+    Render chunks with up to TTS_CHUNK_CONCURRENCY backend calls in flight.
+    Yields (local path, cache_hit) in text order, each as soon as it and
+    the chunks before it are ready. Raises SynthesisError when a chunk
+    fails after its retries.
+    """
+    app = current_app._get_current_object()
+    # Never more threads than bulkhead slots, extra ones would only wait for a slot and fail
+    pool = ThreadPoolExecutor(max_workers=max(1, min(Config.TTS_CHUNK_CONCURRENCY, Config.TTS_MAX_IN_FLIGHT, len(chunks))),
+                              thread_name_prefix='tts-chunk')
+    futures = [
+        pool.submit(log.with_request_id(_render_chunk), app, dict(tts_payload, text=chunk), os.path.join(work_dir, f"chunk_{index:04d}"))
+        for index, chunk in enumerate(chunks)
+    ]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        # Stop queued chunks after a failure or when the consumer goes away
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+def append_segment(combined, segment, crossfade_ms=None):
+    """Join two pydub segments with a crossfade no longer than either of them"""
+    if combined is None:
+        return segment
+    crossfade_ms = Config.TTS_CHUNK_CROSSFADE_MS if crossfade_ms is None else crossfade_ms
+    return combined.append(segment, crossfade=min(crossfade_ms, len(combined), len(segment)))
+
+def new_work_dir():
+    os.makedirs(Config.TTS_WORK_FOLDER, exist_ok=True)
+    return tempfile.mkdtemp(prefix='chunks_', dir=Config.TTS_WORK_FOLDER)
+
+def store_assembled(user_id, tts_payload, combined, ext, work_dir):
+    """Export the stitched audio, cache it for the whole text and move it into storage"""
+    assembled_path = os.path.join(work_dir, f"assembled{ext}")
+    combined.export(assembled_path, format=ext.lstrip('.') or 'wav')
+    try:
+        synth_cache.store(tts_payload, assembled_path)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning("Synthesis cache store failed", extra={"error": str(e)})
+
+    storage = get_storage()
+    file_path = storage.new_path(GENERATED_FOLDER, f"{user_id}_{datetime.utcnow().timestamp()}_long{ext}")
+    size = storage.put_file(file_path, assembled_path)
+    logger.info("Stored audio file", extra={"file_path": file_path, "size": size})
+    return file_path
+
+def synthesize_chunked_to_file(user_id, tts_payload, chunks):
+    """Render chunks and store them as one file, returns (file_path, every chunk was cached)"""
+    work_dir = new_work_dir()
+    try:
+        combined, ext, all_cached = None, None, True
+        for chunk_path, cache_hit in render_chunks(tts_payload, chunks, work_dir):
+            ext = ext or os.path.splitext(chunk_path)[1]
+            combined = append_segment(combined, AudioSegment.from_file(chunk_path))
+            all_cached = all_cached and cache_hit
+        logger.debug("Stitched chunks", extra={"chunks": len(chunks), "duration_ms": len(combined)})
+        return store_assembled(user_id, tts_payload, combined, ext, work_dir), all_cached
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def generate_audio_file(user_id, tts_payload):
+    """
+    Produce a stored audio file for tts_payload, from the synthesis cache
+    when possible. Long texts are rendered in chunks. Returns (file_path, cache_hit).
+    """
+    with metrics.stage('cache_lookup'):
+        file_path = synth_cache.materialize(user_id, tts_payload)
+    if file_path:
+        logger.debug("Synthesis cache hit", extra={"file_path": file_path})
+        return file_path, True
+
+    chunks = split_for_synthesis(tts_payload.get('text') or '')
+    if chunks:
+        return synthesize_chunked_to_file(user_id, tts_payload, chunks)
+
+    file_path = synthesize_to_file(user_id, tts_payload)
+    try:
+        synth_cache.store(tts_payload, file_path)
+    except Exception as e:
+        # Caching is best effort, the user still gets their audio
+        db.session.rollback()
+        logger.warning("Synthesis cache store failed", extra={"error": str(e)})
+    return file_path, False
+
+def generate_audio_files(user_id, tts_payloads, concurrency=None):
+    """
+    Run generate_audio_file for many payloads with at most `concurrency`
+    backend calls in flight. Returns one (file_path, cache_hit, error) per
+    payload, in order; error is a SynthesisError when that item failed.
+    """
+    app = current_app._get_current_object()
+    concurrency = max(1, min(concurrency or Config.TTS_BATCH_CONCURRENCY, Config.TTS_MAX_IN_FLIGHT, len(tts_payloads)))
+
+    def generate(tts_payload):
+        # Each thread gets its own app context and database session
+        with app.app_context():
+            try:
+                file_path, cache_hit = generate_audio_file(user_id, tts_payload)
+                return file_path, cache_hit, None
+            except SynthesisError as e:
+                return None, False, e
+            except Exception as e:
+                logger.exception("Batch item failed")
+                return None, False, SynthesisError(f"Unexpected error: {str(e)}")
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='tts-batch') as pool:
+        return list(pool.map(log.with_request_id(generate), tts_payloads))
+
+def characters_to_charge(characters, cache_hit):
+    """Cache hits are free unless SYNTH_CACHE_CHARGE_HITS is set"""
+    if cache_hit and not Config.SYNTH_CACHE_CHARGE_HITS:
+        return 0
+    return characters
+
+# --------------------------
+# Save audio record
+# --------------------------
+def create_audio_record(user_id, file_path, characters):
+    """Add the AudioFile row for a generated file, the caller commits"""
+    now = datetime.utcnow()
+    st = storage_for(file_path).stat(file_path)
+    audio = AudioFile(
+        user_id=user_id,
+        file_path=file_path,
+        characters_used=characters,
+        size=st.size if st else None,
+        created_at=now,
+        last_accessed_at=now,
+        expire_at=retention.expire_at_for(user_id, now)
+    )
+    db.session.add(audio)
+    admin_stats.increment(total_audios=1)
+    return audio
+
+def create_audio_records(user_id, entries):
+    """
+    Insert the AudioFile rows for many generated files with one bulk
+    INSERT. entries are (file_path, characters). Returns the new ids in
+    the same order; the caller commits.
+    """
+    now = datetime.utcnow()
+    days, _ = retention.limits_for(user_id)
+    rows = []
+    for file_path, characters in entries:
+        st = storage_for(file_path).stat(file_path)
+        rows.append({
+            "user_id": user_id,
+            "file_path": file_path,
+            "characters_used": characters,
+            "size": st.size if st else None,
+            "created_at": now,
+            "last_accessed_at": now,
+            "expire_at": now + timedelta(days=days)
+        })
+    db.session.bulk_insert_mappings(AudioFile, rows)
+    admin_stats.increment(total_audios=len(rows))
+
+    # File paths are unique per generation, so they map the rows back to their ids
+    paths = [row["file_path"] for row in rows]
+    ids = dict(db.session.query(AudioFile.file_path, AudioFile.id)
+               .filter(AudioFile.user_id == user_id, AudioFile.file_path.in_(paths)))
+    return [ids[path] for path in paths]
+
+def enforce_storage_budget(user_id, *audio_ids):
+    """After the commit: evict older files if the plan's storage budget is exceeded"""
+    try:
+        retention.enforce_user_budget(user_id, keep_ids=audio_ids)
+    except Exception as e:
+        # The new file is saved either way; the next generation retries the eviction
+        db.session.rollback()
+        logger.warning("Storage budget enforcement failed", extra={"user_id": user_id, "error": str(e)})
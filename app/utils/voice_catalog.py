@@ -0,0 +1,163 @@
+# app/utils/voice_catalog.py
+import time
+import threading
+import logging
+from datetime import datetime
+from app.config import Config
+from app.utils.tts_client import get_tts_client
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Backend voice catalog cache
+# --------------------------
+# The backend's /voice/list is fetched at most once per VOICE_CATALOG_TTL
+# per process and kept as a dict of available voices keyed by speaker_id.
+# A stale catalog keeps being served while one thread refreshes it in the
+# background (single flight), and a failed refresh keeps the last good
+# catalog, so /available-voices keeps answering during backend outages.
+# A periodic task refreshes the catalog ahead of its TTL.
+
+DEFAULT_VOICES = {
+    'default_male_01': ('male', 'Default Male Voice'),
+    'default_female_01': ('female', 'Default Female Voice'),
+}
+
+_state = {"voices": None, "fetched_at": 0.0, "refreshed_at": None, "failed_at": None, "last_error": None}
+_state_lock = threading.Lock()
+_refresh_lock = threading.Lock()  # held by the one thread talking to the backend
+_counters = {"refreshes": 0, "failures": 0, "stale_serves": 0}
+
+def _fetch():
+    """Available voices from the backend, keyed by speaker_id"""
+    response = get_tts_client().list_voices()
+    response.raise_for_status()
+    data = response.json()
+    # Handle response format: {"voices": [...]}
+    voice_list = data.get('voices', []) if isinstance(data, dict) else data
+    return {
+        voice['user_id']: voice
+        for voice in voice_list
+        if voice.get('available', False) and voice.get('user_id')
+    }
+
+def _refresh_locked():
+    """Fetch and store the catalog, the caller holds _refresh_lock"""
+    try:
+        voices = _fetch()
+    except Exception as e:
+        with _state_lock:
+            _state["failed_at"] = time.monotonic()
+            _state["last_error"] = str(e)
+            _counters["failures"] += 1
+        logger.warning("Voice catalog refresh failed", extra={"error": str(e)})
+        return False
+    with _state_lock:
+        _state["voices"] = voices
+        _state["fetched_at"] = time.monotonic()
+        _state["refreshed_at"] = datetime.utcnow()
+        _state["last_error"] = None
+        _counters["refreshes"] += 1
+    return True
+
+def _refresh_in_background():
+    if not _refresh_lock.acquire(blocking=False):
+        return  # Another thread is already refreshing
+
+    def run():
+        try:
+            _refresh_locked()
+        finally:
+            _refresh_lock.release()
+
+    threading.Thread(target=run, name='voice-catalog-refresh', daemon=True).start()
+
+def _retry_due(now):
+    failed_at = _state["failed_at"]
+    return failed_at is None or now - failed_at >= Config.VOICE_CATALOG_RETRY_SECONDS
+
+def refresh():
+    """Refresh now (periodic task), waits for a refresh already in flight instead of starting another"""
+    started = time.monotonic()
+    with _refresh_lock:
+        if _state["fetched_at"] > started:
+            return True
+        return _refresh_locked()
+
+def get_catalog():
+    """
+    Dict of available backend voices keyed by speaker_id. Empty when the
+    backend has never answered. Only the very first load blocks.
+    """
+    now = time.monotonic()
+    with _state_lock:
+        voices = _state["voices"]
+        age = now - _state["fetched_at"]
+        retry_due = _retry_due(now)
+
+    if voices is None:
+        if not retry_due:
+            return {}
+        with _refresh_lock:
+            # Threads that waited here find the catalog another one just loaded
+            if _state["voices"] is None and _retry_due(time.monotonic()):
+                _refresh_locked()
+        return _state["voices"] or {}
+
+    if age >= Config.VOICE_CATALOG_TTL:
+        with _state_lock:
+            _counters["stale_serves"] += 1
+        if retry_due:
+            _refresh_in_background()
+    return voices
+
+# --------------------------
+# Per-user view
+# --------------------------
+def voices_for_user(user_clones):
+    """
+    Default voices plus the user's cloned voices, as listed by
+    /available-voices. Clones the backend does not list (yet) are
+    included from the local rows.
+    """
+    catalog = get_catalog()
+    available_voices = []
+
+    for speaker_id, (gender, voice_name) in DEFAULT_VOICES.items():
+        voice = catalog.get(speaker_id)
+        if voice:
+            available_voices.append({
+                "user_id": speaker_id,
+                "voice_name": voice_name,
+                "path": voice.get('path', ''),
+                "is_default": True,
+                "available": True,
+                "gender": gender
+            })
+
+    seen = set()
+    for clone in user_clones:
+        if not clone.speaker_id or clone.speaker_id in seen:
+            continue
+        seen.add(clone.speaker_id)
+        voice = catalog.get(clone.speaker_id)
+        available_voices.append({
+            "user_id": clone.speaker_id,
+            "voice_name": clone.voice_name,
+            "path": voice.get('path', '') if voice else clone.voice_file_path,
+            "is_default": False,
+            "available": True,
+            "clone_id": clone.id
+        })
+    return available_voices
+
+def get_stats():
+    with _state_lock:
+        voices = _state["voices"]
+        stats = dict(_counters)
+        stats["voices"] = len(voices) if voices is not None else None
+        stats["age_seconds"] = round(time.monotonic() - _state["fetched_at"], 1) if voices is not None else None
+        stats["refreshed_at"] = _state["refreshed_at"].isoformat() if _state["refreshed_at"] else None
+        stats["last_error"] = _state["last_error"]
+    stats["ttl"] = Config.VOICE_CATALOG_TTL
+    return stats
@@ -0,0 +1,158 @@
+# app/utils/voice_sample.py
+import io
+import time
+import threading
+import logging
+from collections import namedtuple
+import numpy as np
+import soundfile as sf
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Voice clone sample preprocessing
+# --------------------------
+# Uploaded samples come in any rate, channel count and length (stereo
+# 48 kHz FLACs of several minutes, clips that are mostly silence). Before a
+# sample is sent to /voice/upload it is decoded, downmixed to mono, trimmed
+# of leading/trailing silence, cut to CLONE_MAX_SECONDS, resampled to
+# CLONE_SAMPLE_RATE and re-encoded as 16-bit PCM WAV. Samples with less
+# than CLONE_MIN_SPEECH_SECONDS of audible signal are rejected up front.
+
+FRAME_SECONDS = 0.02  # Energy is measured over 20 ms frames
+PAD_SECONDS = 0.1     # Silence kept around the trimmed speech
+
+# wav: BytesIO positioned at 0, durations in seconds
+PreparedSample = namedtuple('PreparedSample', [
+    'wav', 'size', 'duration', 'speech_seconds', 'source_rate', 'source_channels', 'processing_ms'
+])
+
+class SampleRejected(ValueError):
+    """The upload is not usable as a cloning sample, the message is shown to the user"""
+    pass
+
+_counters = {"processed": 0, "rejected": 0, "input_bytes": 0, "output_bytes": 0, "processing_ms": 0.0}
+_counters_lock = threading.Lock()
+
+def _count(**values):
+    with _counters_lock:
+        for name, n in values.items():
+            _counters[name] += n
+
+# --------------------------
+# Decoding
+# --------------------------
+def _decode_limit_seconds():
+    # Leading silence is trimmed before the duration cap applies, so decode
+    # some extra; nothing past this point can end up in the sample
+    return Config.CLONE_MAX_SECONDS * 2 + 10
+
+def _decode(stream):
+    """(float32 samples shaped (frames, channels), sample rate) from an uploaded file"""
+    try:
+        with sf.SoundFile(stream) as f:
+            frames = min(f.frames, int(f.samplerate * _decode_limit_seconds()))
+            return f.read(frames, dtype='float32', always_2d=True), f.samplerate
+    except (sf.LibsndfileError, RuntimeError):
+        pass
+
+    # Formats libsndfile does not read (m4a, webm, ...) go through ffmpeg
+    from pydub import AudioSegment
+    stream.seek(0)
+    try:
+        segment = AudioSegment.from_file(stream)[:int(_decode_limit_seconds() * 1000)]
+    except Exception:
+        raise SampleRejected("Could not decode the audio file, upload a WAV, FLAC or MP3 recording")
+    samples = np.array(segment.get_array_of_samples(), dtype=np.float32).reshape(-1, segment.channels)
+    return samples / float(1 << (8 * segment.sample_width - 1)), segment.frame_rate
+
+# --------------------------
+# Signal processing
+# --------------------------
+def _frame_levels(mono, rate):
+    """RMS level in dBFS of each FRAME_SECONDS frame, and the frame length in samples"""
+    frame = max(1, int(rate * FRAME_SECONDS))
+    count = len(mono) // frame
+    if count == 0:
+        return np.empty(0), frame
+    frames = mono[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame
+
+def _resample(mono, src_rate, dst_rate):
+    """Band-limited resampling through the FFT (no scipy needed)"""
+    if src_rate == dst_rate or len(mono) == 0:
+        return mono
+    n = len(mono)
+    m = max(1, int(round(n * dst_rate / src_rate)))
+    spectrum = np.fft.rfft(mono)
+    resized = np.zeros(m // 2 + 1, dtype=spectrum.dtype)
+    keep = min(len(spectrum), len(resized))
+    resized[:keep] = spectrum[:keep]
+    return (np.fft.irfft(resized, m) * (m / n)).astype(np.float32)
+
+def prepare(stream):
+    """
+    Normalize an uploaded cloning sample. Returns a PreparedSample whose
+    wav is what gets sent to the backend and stored; raises SampleRejected
+    when the upload cannot be decoded or holds too little speech.
+    """
+    started = time.perf_counter()
+    stream.seek(0, io.SEEK_END)
+    input_bytes = stream.tell()
+    stream.seek(0)
+
+    try:
+        samples, rate = _decode(stream)
+        channels = samples.shape[1]
+        mono = samples.mean(axis=1) if channels > 1 else samples[:, 0]
+
+        levels, frame = _frame_levels(mono, rate)
+        voiced = np.flatnonzero(levels > Config.CLONE_SILENCE_DB)
+        if len(voiced) == 0:
+            raise SampleRejected("No speech detected in the voice sample")
+
+        pad = int(rate * PAD_SECONDS)
+        start = max(0, voiced[0] * frame - pad)
+        stop = min(len(mono), (voiced[-1] + 1) * frame + pad)
+        stop = min(stop, start + int(rate * Config.CLONE_MAX_SECONDS))
+        speech_seconds = np.count_nonzero((voiced * frame >= start) & (voiced * frame < stop)) * FRAME_SECONDS
+        if speech_seconds < Config.CLONE_MIN_SPEECH_SECONDS:
+            raise SampleRejected(
+                f"Voice sample has too little speech ({speech_seconds:.1f}s, "
+                f"at least {Config.CLONE_MIN_SPEECH_SECONDS:g}s needed)"
+            )
+
+        mono = _resample(mono[start:stop], rate, Config.CLONE_SAMPLE_RATE)
+        wav = io.BytesIO()
+        sf.write(wav, np.clip(mono, -1.0, 1.0), Config.CLONE_SAMPLE_RATE, format='WAV', subtype='PCM_16')
+    except SampleRejected:
+        _count(rejected=1)
+        raise
+
+    size = wav.tell()
+    wav.seek(0)
+    processing_ms = round((time.perf_counter() - started) * 1000, 1)
+    _count(processed=1, input_bytes=input_bytes, output_bytes=size, processing_ms=processing_ms)
+    logger.info("Voice sample prepared", extra={
+        "input_bytes": input_bytes, "source_rate": rate, "source_channels": channels, "size": size,
+        "duration": round(len(mono) / Config.CLONE_SAMPLE_RATE, 2), "processing_ms": processing_ms
+    })
+    return PreparedSample(
+        wav=wav,
+        size=size,
+        duration=round(len(mono) / Config.CLONE_SAMPLE_RATE, 2),
+        speech_seconds=round(float(speech_seconds), 2),
+        source_rate=rate,
+        source_channels=channels,
+        processing_ms=processing_ms
+    )
+
+def get_stats():
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["processing_ms"] = round(stats["processing_ms"], 1)
+    stats["avg_processing_ms"] = round(stats["processing_ms"] / stats["processed"], 1) if stats["processed"] else None
+    stats["sample_rate"] = Config.CLONE_SAMPLE_RATE
+    return stats
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare two load test result files from benchmarks/load_test.py.
+
+Prints p50/p95/p99 latency, throughput, error rate and peak RSS per
+endpoint side by side and fails when the newer run regressed: p95 or p99
+latency or peak RSS grew, or throughput dropped, by more than the
+threshold (relative; latency also by at least MIN_LATENCY_DELTA_MS), or
+the error rate rose by more than one point.
+
+Usage: python benchmarks/compare_results.py baseline.json candidate.json [--threshold 0.2]
+"""
+
+import sys
+import json
+import argparse
+
+# (label, path in the endpoint result, higher is worse)
+METRICS = [
+    ("p50 ms", ("latency_ms", "p50"), True),
+    ("p95 ms", ("latency_ms", "p95"), True),
+    ("p99 ms", ("latency_ms", "p99"), True),
+    ("ok/s", ("throughput_rps",), False),
+    ("errors", ("error_rate",), True),
+    ("rss MB", ("rss_mb", "peak"), True),
+]
+# Noisy metrics reported but not failed on
+INFORMATIONAL = {"p50 ms"}
+MIN_LATENCY_DELTA_MS = 5  # Smaller latency changes are jitter, whatever their relative size
+
+def _get(result, path):
+    for key in path:
+        if not isinstance(result, dict):
+            return None
+        result = result.get(key)
+    return result
+
+def _regressed(label, old, new, higher_is_worse, threshold):
+    if label in INFORMATIONAL or old is None or new is None:
+        return False
+    if label == "errors":
+        return new - old > 0.01
+    if label.endswith(" ms") and new - old < MIN_LATENCY_DELTA_MS:
+        return False
+    if old == 0:
+        return False
+    change = (new - old) / old
+    return change > threshold if higher_is_worse else change < -threshold
+
+def compare(baseline_path, candidate_path, threshold=0.2):
+    """Print the comparison, returns False when the candidate regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    print(f"\n📊 {baseline_path} ({baseline.get('git_commit')}) -> {candidate_path} ({candidate.get('git_commit')})")
+    passed = True
+    for endpoint, new_result in candidate["endpoints"].items():
+        old_result = baseline["endpoints"].get(endpoint)
+        if old_result is None:
+            print(f"\n{endpoint}: not in the baseline")
+            continue
+        print(f"\n{endpoint}")
+        for label, path, higher_is_worse in METRICS:
+            old, new = _get(old_result, path), _get(new_result, path)
+            if old is None and new is None:
+                continue
+            regressed = _regressed(label, old, new, higher_is_worse, threshold)
+            passed &= not regressed
+            change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else ""
+            print(f"  {'❌' if regressed else '  '} {label:8} {old!s:>10} -> {new!s:>10}  {change}")
+
+    print("\n🎉 No regressions" if passed else f"\n🛑 Regressions beyond {threshold * 100:.0f}%")
+    return passed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two load test results")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+    return 0 if compare(args.baseline, args.candidate, args.threshold) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
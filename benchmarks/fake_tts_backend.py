@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the GPU TTS backend at TTS_BASE_URL.
+
+Implements the endpoints the app calls (/translate-tts, /voice/upload,
+/voice/list and the audio download behind audio_path) and answers them
+with real WAV audio generated with NumPy, after a configurable delay and
+with a configurable failure rate, so the API can be measured without GPUs.
+
+Latency distributions are given as fixed:S, uniform:LO,HI, normal:MEAN,STD
+or lognormal:MEDIAN,SIGMA (seconds); a bare number means fixed. Failure
+rates are a probability for every route or route=p pairs
+(synth, upload, list, download). POST /_config changes any setting of a
+running backend, GET /_stats returns per-route counters.
+
+Usage: python benchmarks/fake_tts_backend.py --port 8765 --synth-latency lognormal:0.8,0.4 --fail-rate synth=0.02
+Point the app at it with TTS_BASE_URL=http://127.0.0.1:8765
+"""
+
+import io
+import sys
+import time
+import uuid
+import wave
+import random
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from flask import Flask, request, jsonify, Response
+
+ROUTES = ('synth', 'upload', 'list', 'download')
+DEFAULT_VOICES = ('default_male_01', 'default_female_01')
+MAX_RENDERS = 10000  # audio_path ids kept for download
+
+# --------------------------
+# Settings
+# --------------------------
+def parse_latency(spec):
+    """Turn a latency spec into a zero-argument sampler returning seconds"""
+    spec = str(spec).strip()
+    kind, _, params = spec.partition(':')
+    if not params:
+        kind, params = 'fixed', kind
+    values = [float(v) for v in params.split(',')]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(np.log(values[0]), values[1]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def parse_fail_rate(spec):
+    """'0.05' for every route, or 'synth=0.05,list=0.5'"""
+    spec = str(spec).strip()
+    if '=' not in spec:
+        return {route: float(spec or 0) for route in ROUTES}
+    rates = {route: 0.0 for route in ROUTES}
+    for pair in spec.split(','):
+        route, _, rate = pair.partition('=')
+        if route.strip() not in rates:
+            raise ValueError(f"Unknown route in fail rate: {route} (use {', '.join(ROUTES)})")
+        rates[route.strip()] = float(rate)
+    return rates
+
+class Settings:
+    """Current behaviour of the backend, changed at runtime through /_config"""
+    def __init__(self, args):
+        self.lock = threading.Lock()
+        self.specs = {}
+        self.apply({
+            'synth_latency': args.synth_latency,
+            'synth_latency_per_char': args.synth_latency_per_char,
+            'upload_latency': args.upload_latency,
+            'list_latency': args.list_latency,
+            'download_latency': args.download_latency,
+            'fail_rate': args.fail_rate,
+            'fail_status': args.fail_status,
+            'seconds_per_char': args.seconds_per_char,
+            'min_seconds': args.min_seconds,
+            'max_seconds': args.max_seconds,
+            'sample_rate': args.sample_rate,
+            'gpu_slots': args.gpu_slots,
+        })
+
+    def apply(self, values):
+        with self.lock:
+            for key, value in values.items():
+                if key.endswith('_latency'):
+                    setattr(self, key, parse_latency(value))
+                elif key == 'fail_rate':
+                    self.fail_rate = parse_fail_rate(value)
+                elif key in ('fail_status', 'sample_rate', 'gpu_slots'):
+                    value = int(value)
+                    if key == 'gpu_slots':
+                        # Requests beyond the slots queue, like a backend with N GPUs
+                        self.gpu = threading.BoundedSemaphore(value) if value > 0 else None
+                    setattr(self, key, value)
+                elif key in ('synth_latency_per_char', 'seconds_per_char', 'min_seconds', 'max_seconds'):
+                    setattr(self, key, float(value))
+                else:
+                    raise ValueError(f"Unknown setting: {key}")
+                self.specs[key] = value
+
+# --------------------------
+# Audio
+# --------------------------
+@lru_cache(maxsize=128)
+def render_wav(seconds, sample_rate):
+    """Speech-like 16-bit mono WAV: a few harmonics modulated at syllable rate plus noise"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 25 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in (1, 2, 3, 4))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    rng = np.random.default_rng(int(seconds * 10))
+    signal = 0.25 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype('<i2')
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+# --------------------------
+# App
+# --------------------------
+def create_backend(settings):
+    app = Flask(__name__)
+    stats_lock = threading.Lock()
+    stats = {route: {"requests": 0, "failures": 0, "bytes": 0} for route in ROUTES}
+    renders = OrderedDict()  # render id -> seconds of audio
+    voices = OrderedDict((speaker_id, f"/voices/{speaker_id}.wav") for speaker_id in DEFAULT_VOICES)
+
+    def count(route, failed=False, nbytes=0):
+        with stats_lock:
+            stats[route]["requests"] += 1
+            stats[route]["failures"] += int(failed)
+            stats[route]["bytes"] += nbytes
+
+    def simulate(route, extra_latency=0.0):
+        """Sleep like the real backend would; returns an error response for a simulated failure"""
+        delay = getattr(settings, f"{route}_latency")() + extra_latency
+        gpu = settings.gpu if route == 'synth' else None
+        if gpu:
+            gpu.acquire()
+        try:
+            time.sleep(delay)
+        finally:
+            if gpu:
+                gpu.release()
+        if random.random() < settings.fail_rate[route]:
+            count(route, failed=True)
+            return jsonify({"detail": f"simulated {route} failure"}), settings.fail_status
+        return None
+
+    @app.route('/translate-tts', methods=['POST'])
+    def translate_tts():
+        data = request.get_json(silent=True) or {}
+        text = data.get('text') or ''
+        failure = simulate('synth', settings.synth_latency_per_char * len(text))
+        if failure:
+            return failure
+        seconds = min(settings.max_seconds, max(settings.min_seconds, len(text) * settings.seconds_per_char))
+        render_id = uuid.uuid4().hex
+        with stats_lock:
+            renders[render_id] = round(seconds, 1)
+            while len(renders) > MAX_RENDERS:
+                renders.popitem(last=False)
+        count('synth')
+        return jsonify({
+            "file_path": f"/outputs/{render_id}.wav",
+            "audio_path": f"/audio/{render_id}.wav",
+            "duration": round(seconds, 1)
+        })
+
+    @app.route('/audio/<render_id>.wav', methods=['GET'])
+    def download(render_id):
+        with stats_lock:
+            seconds = renders.get(render_id)
+        if seconds is None:
+            return jsonify({"detail": "Not found"}), 404
+        failure = simulate('download')
+        if failure:
+            return failure
+        body = render_wav(seconds, settings.sample_rate)
+        count('download', nbytes=len(body))
+        return Response(body, mimetype='audio/wav')
+
+    @app.route('/voice/upload', methods=['POST'])
+    def upload():
+        sample = request.files.get('voice_file')
+        speaker_id = request.form.get('user_id')
+        if not sample or not speaker_id:
+            return jsonify({"detail": "voice_file and user_id required"}), 422
+        size = len(sample.read())
+        failure = simulate('upload')
+        if failure:
+            return failure
+        path = f"/voices/{speaker_id}.wav"
+        with stats_lock:
+            voices[speaker_id] = path
+        count('upload', nbytes=size)
+        return jsonify({"path": path, "size": size})
+
+    @app.route('/voice/list', methods=['GET'])
+    def voice_list():
+        failure = simulate('list')
+        if failure:
+            return failure
+        with stats_lock:
+            listed = [{"user_id": s, "path": p, "available": True} for s, p in voices.items()]
+        count('list')
+        return jsonify({"voices": listed})
+
+    @app.route('/_config', methods=['GET', 'POST'])
+    def config():
+        if request.method == 'POST':
+            try:
+                settings.apply(request.get_json() or {})
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        return jsonify(settings.specs)
+
+    @app.route('/_stats', methods=['GET'])
+    def get_stats():
+        with stats_lock:
+            return jsonify({"routes": stats, "renders": len(renders), "voices": len(voices)})
+
+    return app
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fake TTS backend for load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--synth-latency', default='lognormal:0.5,0.3', help="seconds per /translate-tts call")
+    parser.add_argument('--synth-latency-per-char', type=float, default=0.0, help="extra seconds per input character")
+    parser.add_argument('--upload-latency', default='uniform:0.2,0.6')
+    parser.add_argument('--list-latency', default='fixed:0.05')
+    parser.add_argument('--download-latency', default='fixed:0')
+    parser.add_argument('--fail-rate', default='0', help="probability of a failure, or route=p,route=p")
+    parser.add_argument('--fail-status', type=int, default=500)
+    parser.add_argument('--seconds-per-char', type=float, default=0.065, help="audio length per input character")
+    parser.add_argument('--min-seconds', type=float, default=0.5)
+    parser.add_argument('--max-seconds', type=float, default=60)
+    parser.add_argument('--sample-rate', type=int, default=24000)
+    parser.add_argument('--gpu-slots', type=int, default=0, help="concurrent syntheses, 0 = unlimited")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings = Settings(args)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log per request under load
+    print(f"🎙️  Fake TTS backend on http://{args.host}:{args.port}")
+    create_backend(settings).run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the TTS API.
+
+Drives each selected endpoint at a fixed request rate (open loop: requests
+are sent on schedule whether or not earlier ones finished, and latency is
+measured from the scheduled send time so a saturated server cannot hide
+its queueing) and reports p50/p95/p99 latency, throughput, error rate and
+the server's resident memory per endpoint. Results are written as JSON;
+compare two runs with benchmarks/compare_results.py.
+
+By default the fake backend (benchmarks/fake_tts_backend.py) and the app
+(threaded Werkzeug server, throwaway SQLite database) are started as
+subprocesses. --base-url targets a running deployment instead; pass its
+worker pids with --server-pid to record their memory.
+
+Usage:
+  python benchmarks/load_test.py
+  python benchmarks/load_test.py --endpoints generate,available-voices --rps 20 --duration 30
+  python benchmarks/load_test.py --backend-args "--synth-latency lognormal:1.5,0.5 --fail-rate synth=0.05"
+  python benchmarks/load_test.py --base-url http://127.0.0.1:5000 --token $JWT --server-pid 4242
+  python benchmarks/load_test.py --compare benchmarks/results/baseline.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import wave
+import shlex
+import socket
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Please confirm your appointment for Tuesday at three in the afternoon.",
+    "Our quarterly revenue grew by twelve percent compared to last year.",
+    "Turn left at the next intersection, then continue straight for two kilometres.",
+    "Thank you for calling, your request has been forwarded to the support team.",
+    "Rain is expected in the northern regions later tonight.",
+]
+
+# --------------------------
+# Request scenarios
+# --------------------------
+def make_text(chars, seq):
+    """Roughly chars characters of prose, unique per seq so the synthesis cache does not answer"""
+    words, i = [f"Request {seq}."], seq
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(SENTENCES[i % len(SENTENCES)])
+        i += 1
+    return ' '.join(words)[:max(chars, 1)]
+
+def make_sample_wav(seconds=6, sample_rate=44100):
+    """Stereo 16-bit WAV with a voice-like tone, as a cloning upload"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    pcm = (np.stack([tone, tone], axis=1) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+class Scenario:
+    """One endpoint under test; request() returns the response"""
+    name = None
+
+    def prepare(self, run):
+        pass
+
+    def request(self, session, run, seq):
+        raise NotImplementedError
+
+class Generate(Scenario):
+    name = 'generate'
+
+    def request(self, session, run, seq):
+        text = make_text(run.args.text_chars, seq if run.args.unique_texts else 0)
+        return session.post(run.url('/api/voice/generate'), headers=run.headers, timeout=run.args.timeout,
+                            json={"text": text, "language": "en", "voice_model": "default_male_01"})
+
+class GenerateBatch(Scenario):
+    name = 'generate-batch'
+
+    def request(self, session, run, seq):
+        items = [{"text": make_text(run.args.text_chars, (seq * 100 + i) if run.args.unique_texts else i)}
+                 for i in range(run.args.batch_size)]
+        return session.post(run.url('/api/voice/generate-batch'), headers=run.headers,
+                            timeout=run.args.timeout, json={"items": items})
+
+class AvailableVoices(Scenario):
+    name = 'available-voices'
+
+    def request(self, session, run, seq):
+        return session.get(run.url('/api/voice/available-voices'), headers=run.headers, timeout=run.args.timeout)
+
+class CloneVoice(Scenario):
+    name = 'clone-voice'
+
+    def prepare(self, run):
+        self.sample = make_sample_wav()
+
+    def request(self, session, run, seq):
+        return session.post(run.url('/api/voice/clone-voice'), headers=run.headers, timeout=run.args.timeout,
+                            data={"voice_name": f"bench-{seq}"},
+                            files={"voice_file": ("sample.wav", self.sample, "audio/wav")})
+
+class DownloadVoice(Scenario):
+    name = 'download-voice'
+    # Non-ASCII and a quote: the header must fall back to filename* (RFC 5987)
+    voice_name = 'José 声音 "bench"'
+
+    def prepare(self, run):
+        response = requests.post(run.url('/api/voice/clone-voice'), headers=run.headers, timeout=run.args.timeout,
+                                 data={"voice_name": self.voice_name},
+                                 files={"voice_file": ("sample.wav", make_sample_wav(), "audio/wav")})
+        response.raise_for_status()
+        self.voice_id = response.json()['voice_id']
+        check = self.request(requests, run, 0)
+        disposition = check.headers.get('Content-Disposition', '')
+        if check.status_code != 200 or "filename*=UTF-8''Jos%C3%A9" not in disposition:
+            raise RuntimeError(f"download-voice: {check.status_code} {disposition!r}")
+
+    def request(self, session, run, seq):
+        response = session.get(run.url(f'/api/voice/voices/{self.voice_id}/download'), headers=run.headers,
+                               timeout=run.args.timeout)
+        response.content
+        return response
+
+class Stream(Scenario):
+    name = 'stream'
+
+    def prepare(self, run):
+        response = requests.post(run.url('/api/voice/generate'), headers=run.headers, timeout=run.args.timeout,
+                                 json={"text": make_text(run.args.text_chars, 0), "language": "en"})
+        response.raise_for_status()
+        self.audio_id = response.json()['audio_id']
+
+    def request(self, session, run, seq):
+        response = session.get(run.url(f'/api/voice/stream/{self.audio_id}'), headers=run.headers,
+                               timeout=run.args.timeout)
+        response.content  # Time the whole body
+        return response
+
+class History(Scenario):
+    name = 'history'
+
+    def request(self, session, run, seq):
+        return session.get(run.url('/api/voice/history'), headers=run.headers, timeout=run.args.timeout)
+
+SCENARIOS = {cls.name: cls for cls in (Generate, GenerateBatch, AvailableVoices, CloneVoice, DownloadVoice, Stream, History)}
+
+# --------------------------
+# Process memory
+# --------------------------
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+def rss_bytes(pids):
+    """Resident memory of pids and their child processes (Linux /proc), None when unavailable"""
+    total, seen = 0, False
+    pending = list(pids)
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        seen = True
+                        break
+        except OSError:
+            continue
+        pending.extend(_children(pid))
+    return total if seen else None
+
+class RssSampler:
+    """Samples server RSS in the background while an endpoint is under load"""
+    def __init__(self, pids, interval=0.25):
+        self.pids = pids
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            value = rss_bytes(self.pids)
+            if value is not None:
+                self.samples.append(value)
+            if self.stopped.wait(self.interval):
+                return
+
+    def __enter__(self):
+        if self.pids:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        value = rss_bytes(self.pids) if self.pids else None
+        if value is not None:
+            self.samples.append(value)
+
+    def summary(self):
+        if not self.samples:
+            return None
+        mb = 1024 * 1024
+        return {"start": round(self.samples[0] / mb, 1), "peak": round(max(self.samples) / mb, 1),
+                "end": round(self.samples[-1] / mb, 1)}
+
+# --------------------------
+# Load generation
+# --------------------------
+class Run:
+    def __init__(self, args, base_url, headers, pids):
+        self.args = args
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers
+        self.pids = pids
+        self._sessions = threading.local()
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def session(self):
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = self._sessions.session = requests.Session()
+        return session
+
+def _send(run, scenario, seq, scheduled):
+    status, error = None, None
+    try:
+        status = scenario.request(run.session(), run, seq).status_code
+    except requests.RequestException as e:
+        error = type(e).__name__
+    return time.perf_counter() - scheduled, status, error
+
+def drive(run, scenario, rps, duration, seq_start=0):
+    """Send rps * duration requests on a fixed schedule, returns (samples, wall seconds)"""
+    count = max(1, int(rps * duration))
+    interval = 1.0 / rps
+    futures = []
+    with ThreadPoolExecutor(max_workers=run.args.concurrency) as pool:
+        started = time.perf_counter()
+        for i in range(count):
+            scheduled = started + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(_send, run, scenario, seq_start + i, scheduled))
+        samples = [future.result() for future in futures]
+    return samples, time.perf_counter() - started
+
+def summarize(samples, wall_seconds, rss):
+    latencies = np.array([latency for latency, _, _ in samples]) * 1000
+    ok = sum(1 for _, status, _ in samples if status is not None and 200 <= status < 300)
+    statuses = {}
+    for _, status, error in samples:
+        key = str(status) if status is not None else error
+        statuses[key] = statuses.get(key, 0) + 1
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "ok": ok,
+        "errors": len(samples) - ok,
+        "error_rate": round((len(samples) - ok) / len(samples), 4),
+        "statuses": statuses,
+        "throughput_rps": round(ok / wall_seconds, 2),
+        "latency_ms": {
+            "p50": round(float(p50), 1),
+            "p95": round(float(p95), 1),
+            "p99": round(float(p99), 1),
+            "mean": round(float(latencies.mean()), 1),
+            "max": round(float(latencies.max()), 1),
+        },
+        "rss_mb": rss,
+    }
+
+def run_endpoints(run):
+    results = {}
+    seq = 1
+    for name in run.args.endpoints:
+        scenario = SCENARIOS[name]()
+        scenario.prepare(run)
+        if run.args.warmup > 0:
+            drive(run, scenario, run.args.rps, run.args.warmup, seq_start=seq)
+            seq += int(run.args.rps * run.args.warmup)
+
+        print(f"⏱️  {name}: {run.args.rps} req/s for {run.args.duration}s")
+        with RssSampler(run.pids) as sampler:
+            samples, wall = drive(run, scenario, run.args.rps, run.args.duration, seq_start=seq)
+        seq += len(samples)
+        results[name] = summarize(samples, wall, sampler.summary())
+        print_result(name, results[name])
+    return results
+
+def print_result(name, result):
+    latency = result["latency_ms"]
+    rss = result["rss_mb"]
+    print(f"   {result['requests']} requests, {result['throughput_rps']} ok/s, "
+          f"{result['error_rate'] * 100:.1f}% errors {result['statuses']}")
+    print(f"   p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms"
+          + (f"  rss {rss['start']} -> {rss['peak']} MB peak" if rss else ""))
+
+# --------------------------
+# Local stack (fake backend + app)
+# --------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def serve_app(port):
+    """Subprocess entry point: the app on the threaded Werkzeug server, cwd is the work dir"""
+    sys.path.insert(0, REPO_DIR)
+    import logging
+    from werkzeug.serving import run_simple
+    from app import create_app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    run_simple('127.0.0.1', port, create_app(), threaded=True)
+
+def seed_user(work_dir):
+    """Create the benchmark user with an effectively unlimited balance, returns a JWT"""
+    cwd = os.getcwd()
+    os.chdir(work_dir)  # Config resolves uploads/ from the working directory
+    try:
+        sys.path.insert(0, REPO_DIR)
+        from werkzeug.security import generate_password_hash
+        from flask_jwt_extended import create_access_token
+        from app import create_app, db
+        from app.models.user import User
+        from app.models.usage import Usage
+
+        app = create_app()
+        with app.app_context():
+            user = User(email='loadtest@example.com', password=generate_password_hash('loadtest'), user_type='user')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Usage(user_id=user.id, characters_used=0, characters_remaining=10 ** 12))
+            db.session.commit()
+            return create_access_token(identity=str(user.id))
+    finally:
+        os.chdir(cwd)
+
+class LocalStack:
+    """Fake backend and app as subprocesses on free ports"""
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+        self.work_dir = tempfile.mkdtemp(prefix='tts_loadtest_')
+
+    def _start(self, cmd, env, cwd, log_name):
+        log = open(os.path.join(self.work_dir, log_name), 'wb')
+        process = subprocess.Popen(cmd, env=env, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    def __enter__(self):
+        backend_port, app_port = free_port(), free_port()
+        env = dict(os.environ)
+        env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(self.work_dir, 'loadtest.db')}")
+        env['TTS_BASE_URL'] = f"http://127.0.0.1:{backend_port}"
+        env.setdefault('TTS_JOB_WORKERS', '0')
+        env.setdefault('JWT_SECRET', 'loadtest-secret')
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+        os.environ.update({k: env[k] for k in ('DATABASE_URL', 'TTS_BASE_URL', 'TTS_JOB_WORKERS', 'JWT_SECRET')})
+
+        self.backend = self._start(
+            [sys.executable, os.path.join(BENCH_DIR, 'fake_tts_backend.py'), '--port', str(backend_port)]
+            + shlex.split(self.args.backend_args), env, self.work_dir, 'backend.log')
+        wait_for(f"http://127.0.0.1:{backend_port}/_stats")
+
+        self.token = seed_user(self.work_dir)
+        self.app = self._start(
+            [sys.executable, os.path.abspath(__file__), '--serve-app', str(app_port)], env, self.work_dir, 'app.log')
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"{self.base_url}/api/voice/languages")
+        self.backend_url = env['TTS_BASE_URL']
+        print(f"🚀 App {self.base_url} (pid {self.app.pid}), fake backend {self.backend_url}, logs in {self.work_dir}")
+        return self
+
+    def __exit__(self, *exc):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+# --------------------------
+# Entry point
+# --------------------------
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load test the TTS API")
+    parser.add_argument('--endpoints', default='generate,available-voices,clone-voice,download-voice,stream',
+                        help=f"comma separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument('--rps', type=float, default=10, help="target requests per second per endpoint")
+    parser.add_argument('--duration', type=float, default=20, help="seconds of load per endpoint")
+    parser.add_argument('--warmup', type=float, default=2, help="unrecorded seconds before each endpoint")
+    parser.add_argument('--concurrency', type=int, default=64, help="max requests in flight")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--text-chars', type=int, default=200, help="characters per generated text")
+    parser.add_argument('--batch-size', type=int, default=5, help="items per generate-batch request")
+    parser.add_argument('--repeat-texts', dest='unique_texts', action='store_false',
+                        help="send the same text every time (measures the synthesis cache)")
+    parser.add_argument('--backend-args', default='', help="extra arguments for fake_tts_backend.py")
+    parser.add_argument('--base-url', help="test a running app instead of starting one")
+    parser.add_argument('--token', help="JWT for --base-url")
+    parser.add_argument('--server-pid', type=int, action='append', default=[],
+                        help="app process to record memory of (with --base-url), repeatable")
+    parser.add_argument('--output', help="result file, default benchmarks/results/<timestamp>.json")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument('--serve-app', type=int, help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.serve_app:
+        return serve_app(args.serve_app)
+
+    args.endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = [name for name in args.endpoints if name not in SCENARIOS]
+    if unknown:
+        print(f"❌ Unknown endpoints: {', '.join(unknown)} (use {', '.join(SCENARIOS)})")
+        return 2
+    if args.base_url and not args.token:
+        print("❌ --base-url needs --token")
+        return 2
+
+    started_at = datetime.utcnow()
+    if args.base_url:
+        run = Run(args, args.base_url, {'Authorization': f"Bearer {args.token}"}, args.server_pid)
+        results = run_endpoints(run)
+    else:
+        with LocalStack(args) as stack:
+            run = Run(args, stack.base_url, {'Authorization': f"Bearer {stack.token}"}, [stack.app.pid])
+            results = run_endpoints(run)
+
+    report = {
+        "started_at": started_at.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ('token', 'serve_app', 'output', 'compare', 'threshold')},
+        "endpoints": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at.strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        from compare_results import compare
+        return 0 if compare(args.compare, output, args.threshold) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
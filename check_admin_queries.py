@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Query-count check for the admin endpoints.
+
+Seeds a throwaway SQLite database twice (small and larger), calls every
+GET endpoint of the admin blueprint and fails when an endpoint issues more
+statements than its budget, or when its statement count grows with the
+number of rows (an N+1 query).
+
+Usage: python check_admin_queries.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+WORK_DIR = tempfile.mkdtemp(prefix='admin_queries_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'admin.db')}"
+os.environ.setdefault('TTS_JOB_WORKERS', '0')
+os.environ.setdefault('ADMIN_STATS_CACHE_TTL', '0')  # Measure the summary table read, not the cache
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.plan import Plan
+from app.models.usage import Usage
+from app.models.subscription import Subscription
+from app.models.audio_file import AudioFile
+from app.models.contact_message import ContactMessage
+from app.utils.query_counter import count_queries
+
+# Statements allowed per request, including the admin check
+DEFAULT_BUDGET = 3
+BUDGETS = {}
+
+SMALL, LARGE = 5, 60
+
+def seed(users):
+    """Add `users` users, each with usage, a subscription and an audio file"""
+    plans = Plan.query.all()
+    if not plans:
+        plans = [Plan(name=name, character_limit=limit)
+                 for name, limit in [("Basic", 10000), ("Pro", 50000), ("Premium", 100000)]]
+        db.session.add_all(plans)
+        db.session.flush()
+
+    offset = User.query.count()
+    for i in range(users):
+        plan = plans[i % len(plans)]
+        user = User(email=f"user{offset + i}@example.com", password='x', user_type='user', plan_id=plan.id)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Usage(user_id=user.id, characters_used=i, characters_remaining=plan.character_limit - i))
+        db.session.add(Subscription(user_id=user.id, plan_id=plan.id, status='active',
+                                    end_date=datetime.utcnow() + timedelta(days=30)))
+        db.session.add(AudioFile(user_id=user.id, file_path=f"/tmp/{user.id}.wav", characters_used=i))
+        db.session.add(ContactMessage(name=f"User {i}", email=user.email, subject='Hi', message='Hello'))
+    db.session.commit()
+
+def admin_get_endpoints(app):
+    """(endpoint, url) for every argument-free GET route of the admin blueprint"""
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.startswith('admin.') and 'GET' in rule.methods and not rule.arguments:
+            yield rule.endpoint, rule.rule
+
+def measure(app, headers):
+    counts = {}
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    for endpoint, url in sorted(admin_get_endpoints(app)):
+        with app.app_context():
+            with count_queries(engine) as counter:
+                response = client.get(url, headers=headers)
+        counts[endpoint] = (url, response.status_code, counter.count)
+    return counts
+
+def check_admin_queries():
+    app = create_app()
+    with app.app_context():
+        admin = User(email='admin@example.com', password='x', user_type='admin')
+        db.session.add(admin)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(admin.id))}"}
+        seed(SMALL)
+
+    small = measure(app, headers)
+
+    with app.app_context():
+        seed(LARGE - SMALL)
+
+    large = measure(app, headers)
+
+    passed = True
+    print(f"🔍 Statements per admin endpoint ({SMALL} users -> {LARGE} users)\n")
+    for endpoint, (url, status, count) in large.items():
+        budget = BUDGETS.get(endpoint, DEFAULT_BUDGET)
+        small_count = small[endpoint][2]
+        problems = []
+        if count > budget:
+            problems.append(f"over budget of {budget}")
+        if count > small_count:
+            problems.append("grows with row count (N+1)")
+        if status >= 500:
+            problems.append(f"HTTP {status}")
+        passed &= not problems
+        marker = '❌' if problems else '✅'
+        print(f"{marker} {url:40} {small_count:>3} -> {count:>3}  {', '.join(problems)}")
+
+    print("\n🎉 All admin endpoints within their query budget" if passed else "\n🛑 Query budget exceeded")
+    return passed
+
+if __name__ == "__main__":
+    sys.exit(0 if check_admin_queries() else 1)
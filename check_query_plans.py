@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN the hot queries and check that each one uses its index.
+Works against the configured DATABASE_URL (MySQL) or a SQLite file.
+
+Usage: python check_query_plans.py
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('TTS_JOB_WORKERS', '0')
+
+from sqlalchemy import text
+from app import create_app, db
+
+# (description, query, acceptable index names)
+QUERIES = [
+    ("Quota lookup by user",
+     "SELECT * FROM `usage` WHERE user_id = 1",
+     ['uq_usage_user_id', 'sqlite_autoindex_usage_1']),
+    ("Audio history (newest first)",
+     "SELECT id FROM audio_files WHERE user_id = 1 ORDER BY created_at DESC LIMIT 10",
+     ['ix_audio_files_user_id_created_at']),
+    ("Audio history page after a cursor",
+     "SELECT id FROM audio_files WHERE user_id = 1 AND (created_at < '2026-01-01' "
+     "OR (created_at = '2026-01-01' AND id < 500)) ORDER BY created_at DESC, id DESC LIMIT 21",
+     ['ix_audio_files_user_id_created_at']),
+    ("Expired audio cleanup",
+     "SELECT id, file_path, expire_at FROM audio_files WHERE expire_at <= '2026-01-01' "
+     "AND (expire_at > '2025-12-01' OR (expire_at = '2025-12-01' AND id > 500)) ORDER BY expire_at, id LIMIT 500",
+     ['ix_audio_files_expire_at']),
+    ("User storage budget eviction (least recently accessed)",
+     "SELECT id, file_path, size FROM audio_files WHERE user_id = 1 ORDER BY last_accessed_at, id LIMIT 500",
+     ['ix_audio_files_user_id_last_accessed_at']),
+    ("Disk pressure eviction (least recently accessed)",
+     "SELECT id, file_path FROM audio_files ORDER BY last_accessed_at, id LIMIT 500",
+     ['ix_audio_files_last_accessed_at']),
+    ("Cloned voice by speaker_id",
+     "SELECT * FROM cloned_voices WHERE user_id = 1 AND speaker_id = 'user-100-2026'",
+     ['ix_cloned_voices_user_id_speaker_id']),
+    ("Active subscription",
+     "SELECT * FROM subscriptions WHERE user_id = 1 AND status = 'active'",
+     ['ix_subscriptions_user_id_status']),
+    ("Admin user list page after a cursor",
+     "SELECT id FROM users WHERE user_type = 'user' AND (created_at < '2026-01-01' "
+     "OR (created_at = '2026-01-01' AND id < 500)) ORDER BY created_at DESC, id DESC LIMIT 21",
+     ['ix_users_user_type_created_at']),
+    ("Users on a plan",
+     "SELECT COUNT(*) FROM users WHERE plan_id = 1",
+     ['ix_users_plan_id']),
+    ("Latest contact messages",
+     "SELECT * FROM contact_messages ORDER BY created_at DESC LIMIT 10",
+     ['ix_contact_messages_created_at']),
+]
+
+def explain(connection, dialect, query):
+    """Return (index used or None, raw plan text)"""
+    if dialect == 'sqlite':
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {query}")).fetchall()
+        details = [row[-1] for row in rows]
+        for detail in details:
+            if ' INDEX ' in detail:
+                return detail.split(' INDEX ')[1].split(' ')[0], '; '.join(details)
+        return None, '; '.join(details)
+
+    rows = connection.execute(text(f"EXPLAIN {query}")).mappings().fetchall()
+    plan = '; '.join(f"type={r['type']} key={r['key']} possible_keys={r['possible_keys']}" for r in rows)
+    for row in rows:
+        if row['key']:
+            return row['key'], plan
+    return None, plan
+
+def check_query_plans():
+    app = create_app()
+    passed = True
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        print(f"🔍 Checking query plans on {dialect}\n")
+
+        with db.engine.connect() as connection:
+            for description, query, expected in QUERIES:
+                index, plan = explain(connection, dialect, query)
+                if index in expected:
+                    print(f"✅ {description}: {index}")
+                else:
+                    passed = False
+                    print(f"❌ {description}: {'full scan' if not index else index} (expected {expected[0]})")
+                    print(f"   {query}")
+                    print(f"   {plan}")
+
+    if not passed and dialect == 'mysql':
+        print("\n💡 Run add_indexes_migration.py first. On nearly empty tables MySQL may still prefer a scan;")
+        print("   run this against a database with realistic data (or ANALYZE TABLE) before trusting a failure.")
+    return passed
+
+if __name__ == "__main__":
+    sys.exit(0 if check_query_plans() else 1)
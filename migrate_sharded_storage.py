@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Move existing uploads into the sharded layout (folder/ab/cd/<filename>)
+
+Rewrites AudioFile.file_path and ClonedVoice.voice_file_path in batches and
+moves loose files from the top of the uploads folder. Each file is hardlinked
+into its shard, the batch of rows is committed, and only then is the old name
+removed, so every stored path keeps pointing at a readable file while the
+app is running. Interrupted runs can simply be started again.
+
+Usage: python migrate_sharded_storage.py [--batch-size N] [--dry-run]
+"""
+
+import os
+import sys
+import shutil
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('TTS_JOB_WORKERS', '0')
+
+from app import create_app, db
+from app.config import Config
+from app.models.audio_file import AudioFile
+from app.models.cloned_voice import ClonedVoice
+from app.utils.file_utils import sharded_path, is_sharded
+
+# (model, path column)
+TARGETS = [
+    (AudioFile, 'file_path'),
+    (ClonedVoice, 'voice_file_path'),
+]
+
+def link_into_shard(old_path, dry_run):
+    """Return (new path, status) with status 'linked', 'already', 'missing'"""
+    new_path = sharded_path(os.path.dirname(old_path), os.path.basename(old_path), create=not dry_run)
+    if dry_run:
+        return new_path, 'linked' if os.path.exists(old_path) else 'missing'
+    try:
+        os.link(old_path, new_path)
+    except FileExistsError:
+        if not os.path.samefile(old_path, new_path):
+            raise
+    except FileNotFoundError:
+        # Linked and unlinked by an earlier run that stopped before its commit
+        return new_path, 'already' if os.path.exists(new_path) else 'missing'
+    except OSError:
+        shutil.copy2(old_path, new_path)  # Filesystem without hardlinks
+    return new_path, 'linked'
+
+def migrate_rows(model, column, batch_size, dry_run):
+    report = {"rows": 0, "moved": 0, "missing": 0, "skipped": 0}
+    path_column = getattr(model, column)
+    last_id = 0
+    while True:
+        rows = db.session.query(model.id, path_column)\
+            .filter(model.id > last_id)\
+            .order_by(model.id).limit(batch_size).all()
+        if not rows:
+            return report
+        last_id = rows[-1].id
+
+        updates, to_unlink = [], []
+        for row_id, old_path in rows:
+            report["rows"] += 1
+            if not old_path or is_sharded(old_path):
+                report["skipped"] += 1
+                continue
+            new_path, status = link_into_shard(old_path, dry_run)
+            if status == 'missing':
+                report["missing"] += 1  # Nothing on disk, leave the row for the reaper
+                continue
+            updates.append({"id": row_id, column: new_path})
+            if status == 'linked':
+                to_unlink.append(old_path)
+            report["moved"] += 1
+
+        if dry_run or not updates:
+            continue
+        db.session.bulk_update_mappings(model, updates)
+        db.session.commit()
+        for old_path in to_unlink:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+        print(f"   {model.__tablename__}: {report['moved']} moved so far (id <= {last_id})")
+
+def migrate_loose_uploads(folder, dry_run):
+    """Files uploaded through /api/files sit at the top of the uploads folder"""
+    moved = 0
+    if not os.path.isdir(folder):
+        return moved
+    for entry in os.scandir(folder):
+        if not entry.is_file() or is_sharded(entry.path):
+            continue
+        if not dry_run:
+            os.replace(entry.path, sharded_path(folder, entry.name))
+        moved += 1
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description="Move uploads into the sharded layout")
+    parser.add_argument('--batch-size', type=int, default=500, help="rows rewritten per commit")
+    parser.add_argument('--dry-run', action='store_true', help="report what would move, change nothing")
+    args = parser.parse_args()
+
+    if Config.STORAGE_SHARD_LEVELS <= 0:
+        print("STORAGE_SHARD_LEVELS is 0, nothing to do")
+        return True
+
+    app = create_app()
+    with app.app_context():
+        for model, column in TARGETS:
+            print(f"📦 {model.__tablename__}.{column}{' (dry run)' if args.dry_run else ''}")
+            report = migrate_rows(model, column, args.batch_size, args.dry_run)
+            print(f"✅ {report['moved']} moved, {report['skipped']} already sharded, "
+                  f"{report['missing']} missing on disk ({report['rows']} rows)")
+
+    moved = migrate_loose_uploads(Config.UPLOAD_FOLDER, args.dry_run)
+    print(f"✅ {moved} loose uploads moved")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Delete expired generated audio (files and audio_files rows)
+
+The web workers already run the reaper every AUDIO_REAPER_INTERVAL seconds;
+use this script from cron instead when that is disabled (AUDIO_REAPER_INTERVAL=0).
+
+Usage: python reap_expired_audio.py [--batch-size N] [--max-seconds S] [--threads T]
+       (--max-seconds 0 runs until nothing expired is left)
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('TTS_JOB_WORKERS', '0')
+
+from app import create_app
+from app.utils.reaper import reap_expired_audio
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired generated audio")
+    parser.add_argument('--batch-size', type=int, default=None, help="rows deleted per commit")
+    parser.add_argument('--max-seconds', type=float, default=None, help="runtime budget, 0 for no limit")
+    parser.add_argument('--threads', type=int, default=None, help="file deletion threads")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        report = reap_expired_audio(args.batch_size, args.max_seconds, args.threads)
+
+    print(f"🧹 {report['rows']} expired audio rows deleted in {report['batches']} batches")
+    print(f"   {report['files']} files removed, {report['missing']} already gone, "
+          f"{report['bytes'] / (1024 * 1024):.1f} MB reclaimed in {report['seconds']}s")
+    if report['errors']:
+        print(f"⚠️  {report['errors']} files could not be deleted, they are retried on the next run")
+    if not report['complete']:
+        print("⏱  Runtime budget reached, run again to continue")
+    return report['errors'] == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for the character quota ledger.
+
+Fires 100 parallel requests at /api/tokens/consume and 100 parallel
+quota.reserve calls for one user and checks that the user is never
+overdrawn. Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage: python stress_test_quota.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+WORK_DIR = tempfile.mkdtemp(prefix='quota_stress_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(WORK_DIR, 'quota.db')}")
+os.environ.setdefault('TTS_JOB_WORKERS', '0')
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.usage import Usage
+from app.utils import quota
+
+PARALLEL = 100
+
+def run_parallel(target):
+    """Start PARALLEL threads that call target() at the same moment"""
+    barrier = threading.Barrier(PARALLEL)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        result = target()
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(PARALLEL)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def reset_usage(app, user_id, remaining):
+    with app.app_context():
+        usage = Usage.query.filter_by(user_id=user_id).first()
+        usage.characters_used = 0
+        usage.characters_remaining = remaining
+        db.session.commit()
+
+def read_usage(app, user_id):
+    with app.app_context():
+        usage = Usage.query.filter_by(user_id=user_id).first()
+        return usage.characters_used, usage.characters_remaining
+
+def check(name, ok):
+    print(f"{'✅' if ok else '❌'} {name}")
+    return ok
+
+def main():
+    app = create_app()
+
+    with app.app_context():
+        user = User(email='quota-stress@example.com', password='x', user_type='user')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Usage(user_id=user.id, characters_used=0, characters_remaining=0))
+        db.session.commit()
+        user_id = user.id
+        token = create_access_token(identity=str(user_id))
+
+    passed = True
+
+    # 1. HTTP: 100 requests of 1 character against a balance of 50
+    reset_usage(app, user_id, 50)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def consume_one():
+        return app.test_client().post('/api/tokens/consume', json={'characters': 1}, headers=headers).status_code
+
+    statuses = run_parallel(consume_one)
+    used, remaining = read_usage(app, user_id)
+    print(f"\n/api/tokens/consume: {statuses.count(200)} accepted, {statuses.count(400)} rejected, "
+          f"used={used}, remaining={remaining}")
+    passed &= check("exactly 50 requests accepted", statuses.count(200) == 50)
+    passed &= check("no other status codes", statuses.count(200) + statuses.count(400) == PARALLEL)
+    passed &= check("balance never overdrawn", remaining == 0 and used == 50)
+
+    # 2. Ledger: 100 reservations of 3 characters against a balance of 100
+    reset_usage(app, user_id, 100)
+
+    def reserve_three():
+        with app.app_context():
+            return quota.reserve(user_id, 3)
+
+    granted = run_parallel(reserve_three)
+    used, remaining = read_usage(app, user_id)
+    print(f"\nquota.reserve: {granted.count(True)} granted, {granted.count(False)} refused, remaining={remaining}")
+    passed &= check("exactly 33 reservations granted", granted.count(True) == 33)
+    passed &= check("remaining equals 100 - 3 * granted", remaining == 100 - 3 * granted.count(True))
+
+    # 3. Settle half, refund half: totals must add back up
+    def settle_or_refund(index=iter(range(PARALLEL)), lock=threading.Lock()):
+        with lock:
+            i = next(index)
+        if i >= granted.count(True):
+            return None
+        with app.app_context():
+            if i % 2:
+                quota.settle(user_id, 3)
+            else:
+                quota.refund(user_id, 3)
+            db.session.commit()
+        return i
+
+    run_parallel(settle_or_refund)
+    used, remaining = read_usage(app, user_id)
+    print(f"\nsettle/refund: used={used}, remaining={remaining}")
+    passed &= check("used + remaining == 100 after settlement", used + remaining == 100)
+
+    print("\n🎉 Quota ledger holds under concurrency" if passed else "\n🛑 Quota ledger overdraft detected")
+    return passed
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)